@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from utils_bench import random_symptom_sets
+from rutas import MODELOS_DIR
+from motor_ensamble import MODEL_FILES, EnsembleEngine, load_all_models
+from artefactos import compact_path, export_model, load_compact
+from codificador_sintomas import SymptomEncoder
+
+# ================================
+# BENCHMARK: PICKLE DE PYCARET VS. ARTEFACTO COMPACTO
+# ================================
+#
+# Para cada modelo compara el tamaño en disco y el tiempo de carga del .pkl contra
+# la carpeta compacta (exportándola si no existe), y verifica que ambos den las
+# mismas probabilidades sobre pacientes sintéticos.
+
+parser = argparse.ArgumentParser(description="Compara tamaño y tiempo de carga de los artefactos de modelos")
+parser.add_argument('--repeats', type=int, default=5, help="Cargas por modelo y formato")
+parser.add_argument('--n', type=int, default=500, help="Pacientes sintéticos para verificar predicciones")
+args = parser.parse_args()
+
+from pycaret.classification import load_model
+
+pipelines = load_all_models()
+for file, pipeline in zip(MODEL_FILES, pipelines):
+    if not os.path.exists(os.path.join(compact_path(file), 'meta.json')):
+        export_model(pipeline, compact_path(file))
+
+
+def folder_mb(folder):
+    return sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)) / 1e6
+
+
+def median_load_s(fn):
+    times = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+print(f"{'Modelo':<16}{'pkl MB':>9}{'compacto MB':>13}{'carga pkl (s)':>15}{'carga compacto (s)':>20}{'x':>7}")
+for file in MODEL_FILES:
+    path = os.path.join(MODELOS_DIR, file)
+    pkl_s = median_load_s(lambda: load_model(path, verbose=False))
+    compact_s = median_load_s(lambda: load_compact(compact_path(file)))
+    print(f"{file:<16}{os.path.getsize(path + '.pkl') / 1e6:>9.1f}{folder_mb(compact_path(file)):>13.1f}"
+          f"{pkl_s:>15.3f}{compact_s:>20.4f}{pkl_s / compact_s:>7.0f}")
+
+# Las probabilidades deben coincidir con las del pipeline original
+compact_models = [load_compact(compact_path(file)) for file in MODEL_FILES]
+original = EnsembleEngine(pipelines)
+compact = EnsembleEngine(compact_models)
+encoder = SymptomEncoder(original.feature_names)
+X, _ = encoder.encode(random_symptom_sets(original.feature_names, args.n))
+for name, p_orig, p_comp in zip(MODEL_FILES, original.predict_proba_models(X), compact.predict_proba_models(X)):
+    same_label = (p_orig.argmax(axis=1) == p_comp.argmax(axis=1)).mean()
+    print(f"{name:<16} máx |Δp| = {np.abs(p_orig - p_comp).max():.2e}   misma etiqueta = {same_label:.2%}")
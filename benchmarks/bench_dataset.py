@@ -0,0 +1,63 @@
+import argparse
+import time
+
+import pandas as pd
+
+from utils_bench import PARENT_DIR  # noqa: F401  (agrega interfaz al path)
+from rutas import DATASET_FILE
+from codificador_sintomas import TARGET_COLUMN, read_symptom_dataset
+from preparar_dataset import CACHE_DIR, open_cache
+
+# ================================
+# BENCHMARK: CARGA DEL DATASET DE ENTRENAMIENTO
+# ================================
+#
+# Compara lo que hacían los notebooks (read_csv con int64 y filtro con value_counts/isin
+# antes del train_test_split) con la caché tipada de preparar_dataset.py, en tiempo de
+# carga y memoria de la partición de entrenamiento.
+
+parser = argparse.ArgumentParser(description="Carga del dataset: CSV vs. caché tipada")
+parser.add_argument('--dataset', default=DATASET_FILE)
+parser.add_argument('--cache-dir', default=CACHE_DIR)
+parser.add_argument('--min-count', type=int, default=100)
+args = parser.parse_args()
+
+
+def measure(name, fn):
+    start = time.perf_counter()
+    frame = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<38}{elapsed:>8.2f} s{frame.memory_usage(deep=True).sum() / 1e6:>10.1f} MB  {frame.shape}")
+    return frame
+
+
+def notebook():
+    from sklearn.model_selection import train_test_split
+    df = pd.read_csv(args.dataset)
+    counts = df[TARGET_COLUMN].value_counts()
+    df = df[df[TARGET_COLUMN].isin(counts[counts >= args.min_count].index)]
+    train, _ = train_test_split(df, test_size=0.2, random_state=42, stratify=df[TARGET_COLUMN])
+    return train
+
+
+def sparse_reader():
+    from codificador_sintomas import to_training_frame
+    X, y, symptoms = read_symptom_dataset(args.dataset)
+    return to_training_frame(X, y, symptoms)
+
+
+def cached():
+    data = open_cache(args.dataset, args.cache_dir)
+    train, _ = data.split(args.min_count)
+    return data.frame(train)
+
+
+# La primera llamada a la caché la construye (una sola vez por CSV)
+start = time.perf_counter()
+open_cache(args.dataset, args.cache_dir, rebuild=True).split(args.min_count)
+print(f"Construcción de la caché: {time.perf_counter() - start:.2f} s")
+
+reference = measure("Notebook (read_csv int64 + filtro)", notebook)
+measure("read_symptom_dataset (uint8, completo)", sparse_reader)
+train = measure("Caché tipada (partición)", cached)
+print(f"Mismas filas que el notebook: {reference.index.equals(train.index)}")
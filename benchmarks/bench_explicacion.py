@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import numpy as np
+
+from utils_bench import random_symptom_sets, report, time_calls
+from registro_modelos import ModelRegistry
+from cache_predicciones import predict_board
+from codificador_sintomas import SymptomEncoder
+from consenso import load_rule, min_votes_for
+
+# ================================
+# BENCHMARK: EXPLICACIÓN DE LOS VOTOS
+# ================================
+#
+# Uso:
+#   python bench_explicacion.py --n 2000
+#
+# Mide lo que cuesta armar las tablas de explicación de un motor (una vez) y lo que
+# agrega cada explicación (explicacion.py) frente a la predicción de la junta para el
+# mismo paciente. La explicación usa el voto ya calculado: no vuelve a llamar a los modelos.
+
+parser = argparse.ArgumentParser(description="Costo de explicar los votos de la junta")
+parser.add_argument('--n', type=int, default=2000, help="Pacientes sintéticos")
+args = parser.parse_args()
+
+registry = ModelRegistry().start()
+registry.wait()
+engine = registry.engine()
+rule = load_rule()
+min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size'])
+encoder = SymptomEncoder(engine.feature_names)
+patients = random_symptom_sets(engine.feature_names, args.n)
+
+start = time.perf_counter()
+explainer = engine.explainer
+print(f"Tablas de explicación: {(time.perf_counter() - start) * 1e3:.1f} ms "
+      f"({sum(e is not None for e in explainer.explainers)} de {engine.n_models} especialistas)\n")
+
+# Voto de cada paciente calculado antes, como lo tiene la interfaz al explicar
+cases = []
+for symptoms in patients:
+    ids, _ = encoder.indices(symptoms)
+    board = predict_board(engine, encoder.encode_one(symptoms), min_votes, rule['threshold'])
+    cases.append((symptoms, ids, board['labels']))
+
+predict_ms = report("predicción de la junta", time_calls(
+    lambda case: predict_board(engine, encoder.encode_one(case[0]), min_votes, rule['threshold']), cases))[0]
+explain_ms = report("explicación", time_calls(lambda case: explainer.explain(case[1], case[2]), cases))[0]
+for k, name in enumerate(engine.names):
+    if explainer.explainers[k] is None:
+        continue
+    single = explainer.explainers[k]
+    report(f"  {name}", time_calls(
+        lambda case: single.explain(case[1], explainer.class_index[k][str(case[2][k])]),
+        [(s, np.unique(ids), labels) for s, ids, labels in cases]))
+print(f"\nLa explicación agrega {explain_ms / predict_ms:.1%} a la predicción (p50)")
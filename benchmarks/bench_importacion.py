@@ -0,0 +1,100 @@
+import argparse
+import ast
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+from utils_bench import PARENT_DIR
+
+# ================================
+# BENCHMARK: TIEMPO DE IMPORTACIÓN DE LA INTERFAZ
+# ================================
+#
+# Uso:
+#   python bench_importacion.py
+#   python bench_importacion.py --script interfaz_final_2.py --top 25
+#
+# Ejecuta en un proceso nuevo (con -X importtime) las importaciones de nivel superior
+# del script de la interfaz, es decir, lo que se paga antes de dibujar el formulario.
+# Reporta el tiempo total, el tiempo propio por paquete de primer nivel, los módulos más
+# lentos y cuáles de las librerías pesadas quedaron cargadas. Streamlit se omite si
+# no está instalado.
+
+HEAVY = ['pycaret', 'sklearn', 'xgboost', 'plotly', 'fpdf', 'pandas', 'scipy', 'pyarrow']
+INTERFAZ_DIR = os.path.join(PARENT_DIR, 'interfaz')
+
+
+def top_level_imports(script):
+    # Sentencias import del nivel superior del script, en orden
+    with open(script, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def root_module(statement):
+    node = ast.parse(statement).body[0]
+    name = node.module if isinstance(node, ast.ImportFrom) else node.names[0].name
+    return name.split('.')[0]
+
+
+def profile(statements, repeats):
+    # Mejor de `repeats` procesos: (segundos de pared, [(módulo, propio µs, acumulado µs)], pesadas cargadas)
+    code = '\n'.join(statements) + (
+        f"\nimport sys\nprint(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=INTERFAZ_DIR,
+                                capture_output=True, text=True, env=dict(os.environ, PYTHONWARNINGS='ignore'))
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise SystemExit(result.stderr[-2000:])
+        if best is None or elapsed < best[0]:
+            rows = []
+            for line in result.stderr.splitlines():
+                if not line.startswith('import time:') or 'self [us]' in line:
+                    continue
+                self_us, cumulative_us, name = line[len('import time:'):].split('|')
+                rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+            loaded = result.stdout.strip().splitlines()[-1]
+            best = (elapsed, rows, [m for m in loaded.split(',') if m])
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de importación del script de la interfaz")
+    parser.add_argument('--script', default='interfaz_final_2.py')
+    parser.add_argument('--repeats', type=int, default=3, help="Procesos a medir (se toma el más rápido)")
+    parser.add_argument('--top', type=int, default=15, help="Módulos más lentos a mostrar")
+    args = parser.parse_args()
+
+    statements = top_level_imports(os.path.join(INTERFAZ_DIR, args.script))
+    skipped = [s for s in statements if importlib.util.find_spec(root_module(s)) is None
+               and not os.path.exists(os.path.join(INTERFAZ_DIR, f'{root_module(s)}.py'))]
+    if skipped:
+        print(f"⚠️ Sin instalar, se omiten: {skipped}")
+    statements = [s for s in statements if s not in skipped]
+
+    elapsed, rows, loaded = profile(statements, args.repeats)
+    # Tiempo propio sumado por paquete de primer nivel (pandas, scipy, fpdf, ...)
+    packages = {}
+    for name, self_us, _ in rows:
+        top = name.strip().split('.')[0]
+        packages[top] = packages.get(top, 0) + self_us
+
+    print(f"{args.script}: {len(statements)} importaciones en {elapsed * 1e3:.0f} ms (proceso completo, mejor de {args.repeats})")
+    print(f"Suma de -X importtime: {sum(self_us for _, self_us, _ in rows) / 1e3:.0f} ms\n")
+    print("Tiempo por paquete:")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28}{us / 1e3:>9.1f} ms")
+    print("\nMódulos más lentos (tiempo propio):")
+    for name, self_us, _ in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"  {name.strip():<50}{self_us / 1e3:>9.1f} ms")
+    print(f"\nLibrerías pesadas cargadas al importar: {', '.join(loaded) or 'ninguna'}")
+
+
+if __name__ == '__main__':
+    main()
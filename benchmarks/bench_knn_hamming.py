@@ -0,0 +1,65 @@
+import argparse
+import os
+
+import numpy as np
+
+from utils_bench import report, time_calls
+from rutas import DATASET_FILE, MODELOS_DIR
+from motor_ensamble import feature_names, split_pipeline
+from preparar_dataset import CACHE_DIR, open_cache
+from knn_hamming import HammingKNN
+
+# ================================
+# BENCHMARK: KNN DE SKLEARN VS. KNN DE HAMMING
+# ================================
+#
+# Reconstruye la partición de prueba del notebook de entrenamiento (diagnósticos
+# con al menos 100 registros, 80/20 estratificado, random_state=42), verifica que
+# HammingKNN (índice invertido y popcount) dé las mismas probabilidades que el
+# KNeighborsClassifier del pipeline y compara la latencia por paciente.
+
+parser = argparse.ArgumentParser(description="Compara el KNN de sklearn con el KNN sobre bitsets")
+parser.add_argument('--dataset', default=DATASET_FILE, help="CSV aumentado de síntomas y diagnósticos")
+parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset (preparar_dataset.py)")
+parser.add_argument('--min-count', type=int, default=100, help="Registros mínimos por diagnóstico")
+parser.add_argument('--n', type=int, default=2000, help="Pacientes de prueba a comparar (0 = todos)")
+parser.add_argument('--latency-n', type=int, default=200, help="Consultas individuales para medir latencia")
+args = parser.parse_args()
+
+from pycaret.classification import load_model
+
+pipeline = load_model(os.path.join(MODELOS_DIR, 'modelo_knn'), verbose=False)
+_, knn, labels = split_pipeline(pipeline)
+features = feature_names(pipeline)
+
+data = open_cache(args.dataset, args.cache_dir)
+_, test_rows = data.split(args.min_count)
+# Mismo orden de columnas que el modelo
+column = {s: i for i, s in enumerate(data.symptoms)}
+X_test = data.matrix(test_rows)[:, [column[f] for f in features]].tocsr()
+if args.n:
+    X_test = X_test[:args.n]
+X_dense = X_test.toarray().astype(np.float64)
+print(f"Partición de prueba: {X_test.shape[0]} pacientes, {X_test.shape[1]} síntomas, "
+      f"{knn._fit_X.shape[0]} filas de entrenamiento")
+
+backends = {method: HammingKNN.from_estimator(knn, labels, features, method) for method in ('index', 'popcount')}
+hamming = backends['index']
+print(f"Entrenamiento float64: {knn._fit_X.nbytes / 1e6:.1f} MB   bitsets: {hamming.fit_bits.nbytes / 1e6:.1f} MB   "
+      f"índice invertido: {hamming.postings_rows.nbytes / 1e6:.1f} MB")
+
+# ---- concordancia ----
+p_sklearn = knn.predict_proba(X_dense)
+for method, model in backends.items():
+    p_hamming = model.predict_proba(X_test)
+    same_label = (p_sklearn.argmax(axis=1) == p_hamming.argmax(axis=1)).mean()
+    print(f"{method:<10} máx |Δp| = {np.abs(p_sklearn - p_hamming).max():.2e}   misma etiqueta = {same_label:.2%}")
+
+# ---- latencia por paciente ----
+rows = min(args.latency_n, X_test.shape[0])
+dense_rows = [X_dense[i:i + 1] for i in range(rows)]
+sparse_rows = [X_test[i] for i in range(rows)]
+base = report('sklearn KNeighbors', time_calls(knn.predict_proba, dense_rows))[0]
+for method, model in backends.items():
+    p50 = report(f'Hamming ({method})', time_calls(model.predict_proba, sparse_rows))[0]
+    print(f"{'':<28} aceleración p50 = {base / p50:.1f}x")
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import psutil
+
+from utils_bench import PARENT_DIR, random_symptom_sets
+from vocabulario import load_vocabulary
+
+# ================================
+# BENCHMARK: MEMORIA CON VARIOS PROCESOS DEL SERVICIO
+# ================================
+#
+# Uso:
+#   python bench_memoria_workers.py --workers 1 4 8
+#
+# Para cada número de procesos compara dos despliegues del servicio HTTP:
+#   - independiente: N servicios separados (uno por puerto), cada uno carga sus modelos;
+#   - compartido:    un servicio con --processes N; el padre carga los modelos una vez
+#                    y los hijos los heredan con fork.
+# Después de enviar pacientes a cada proceso se mide la memoria de todos ellos (incluido
+# el padre) con psutil: PSS (memoria real, con las páginas compartidas repartidas entre
+# quienes las usan), USS (páginas privadas) y RSS. La RSS cuenta las páginas compartidas
+# en cada proceso, por eso el costo de un proceso adicional se lee en la PSS total.
+
+SERVICE = os.path.join(PARENT_DIR, 'interfaz', 'servicio_diagnostico.py')
+READY_TIMEOUT_S = 180.0
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def wait_ready(port):
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        try:
+            if get_json(f'http://127.0.0.1:{port}/health')['status'] == 'ok':
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"❌ El servicio en el puerto {port} no quedó listo")
+
+
+def diagnose(port, symptoms):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/diagnose', data=json.dumps({'symptoms': symptoms}).encode(),
+                                     headers={'Content-Type': 'application/json', 'Connection': 'close'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+
+
+def start(args, port, processes):
+    command = [sys.executable, SERVICE, '--port', str(port), '--workers', str(args.threads),
+               '--processes', str(processes)]
+    return subprocess.Popen(command, cwd=os.path.dirname(SERVICE), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def memory(parents):
+    # Totales en MB sobre los procesos lanzados y sus hijos
+    processes = []
+    for parent in parents:
+        p = psutil.Process(parent.pid)
+        processes += [p, *p.children(recursive=True)]
+    infos = [p.memory_full_info() for p in processes]
+    return {
+        'processes': len(processes),
+        'pss': sum(i.pss for i in infos) / 1e6,
+        'uss': sum(i.uss for i in infos) / 1e6,
+        'rss': sum(i.rss for i in infos) / 1e6,
+    }
+
+
+def run(args, mode, n, patients):
+    if mode == 'independiente':
+        ports = [args.port + i for i in range(n)]
+        parents = [start(args, port, 1) for port in ports]
+    else:
+        ports = [args.port]
+        parents = [start(args, args.port, n)]
+    try:
+        for port in ports:
+            wait_ready(port)
+        # Conexiones nuevas en cada petición: el kernel las reparte entre los hijos
+        for i, symptoms in enumerate(patients[:args.requests * n]):
+            diagnose(ports[i % len(ports)], symptoms)
+        time.sleep(0.5)
+        return memory(parents)
+    finally:
+        for parent in parents:
+            os.killpg(parent.pid, signal.SIGTERM)
+            parent.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria del servicio con N procesos: independientes contra compartidos")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help="Procesos que atienden peticiones")
+    parser.add_argument('--port', type=int, default=8800, help="Primer puerto a usar")
+    parser.add_argument('--threads', type=int, default=2, help="Hilos de predicción por proceso")
+    parser.add_argument('--requests', type=int, default=20, help="Pacientes enviados por proceso antes de medir")
+    args = parser.parse_args()
+
+    patients = random_symptom_sets(load_vocabulary().symptoms, args.requests * max(args.workers))
+    print(f"{'modo':<15}{'procesos':>9}{'PSS total MB':>14}{'USS total MB':>14}{'RSS total MB':>14}{'PSS por proceso extra':>23}")
+    for mode in ('independiente', 'compartido'):
+        base = None
+        for n in args.workers:
+            m = run(args, mode, n, patients)
+            base = (n, m['pss']) if base is None else base
+            extra = (m['pss'] - base[1]) / (n - base[0]) if n > base[0] else float('nan')
+            print(f"{mode:<15}{m['processes']:>9}{m['pss']:>14.1f}{m['uss']:>14.1f}{m['rss']:>14.1f}{extra:>23.1f}")
+
+
+if __name__ == '__main__':
+    main()
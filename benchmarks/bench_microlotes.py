@@ -0,0 +1,90 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from utils_bench import random_symptom_sets
+from registro_modelos import ModelRegistry
+from cache_predicciones import predict_board
+from codificador_sintomas import SymptomEncoder
+from consenso import load_rule, min_votes_for
+from microlotes import MicroBatcher
+
+# ================================
+# BENCHMARK: MICROLOTES CONTRA UN PREDICT POR SOLICITUD
+# ================================
+#
+# Uso:
+#   python bench_microlotes.py --concurrency 1 8 32 64 --wait-ms 0.5 2 5
+#
+# N clientes (hilos) envían pacientes de uno en uno, cada uno esperando su resultado
+# antes del siguiente, como las solicitudes concurrentes del servicio. Se compara
+# llamar predict_board por solicitud contra MicroBatcher con distintas esperas
+# máximas, y se reporta rendimiento, latencia p50/p99 y filas promedio por lote.
+# Antes se verifica que ambos caminos den exactamente el mismo resultado.
+
+parser = argparse.ArgumentParser(description="Microlotes contra un predict por solicitud")
+parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+parser.add_argument('--requests', type=int, default=1000, help="Solicitudes por prueba")
+parser.add_argument('--max-batch', type=int, default=64)
+parser.add_argument('--wait-ms', type=float, nargs='+', default=[0.5, 2.0, 5.0], help="Esperas máximas a probar")
+parser.add_argument('--top-k', type=int, default=5, help="Diagnóstico diferencial (0 = sin diferencial)")
+args = parser.parse_args()
+
+registry = ModelRegistry().start()
+registry.wait()
+engine = registry.engine()
+rule = load_rule()
+min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size'])
+encoder = SymptomEncoder(engine.feature_names)
+patients = [encoder.encode_one(p) for p in random_symptom_sets(engine.feature_names, args.requests)]
+
+
+def direct(x):
+    return predict_board(engine, x, min_votes, rule['threshold'], top_k=args.top_k)
+
+
+def run(call, concurrency):
+    # Devuelve (solicitudes por segundo, latencias en ms)
+    latencies = []
+    lock = threading.Lock()
+
+    def client(items):
+        local = []
+        for x in items:
+            start = time.perf_counter()
+            call(x)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(patients[i::concurrency],)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(patients) / (time.perf_counter() - start), np.array(latencies)
+
+
+# Mismo resultado por ambos caminos
+check = MicroBatcher(args.max_batch, 2.0)
+futures = [check.submit(engine, x, min_votes, rule['threshold'], args.top_k) for x in patients[:200]]
+assert all(f.result()[0] == direct(x) for f, x in zip(futures, patients[:200])), "Los microlotes cambian el resultado"
+check.close()
+
+print(f"{len(patients)} solicitudes, {engine.n_models} especialistas, diferencial top {args.top_k}\n")
+print(f"{'modo':<26}{'clientes':>9}{'sol/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'filas/lote':>12}")
+for concurrency in args.concurrency:
+    throughput, latencies = run(direct, concurrency)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{'por solicitud':<26}{concurrency:>9}{throughput:>9.0f}{p50:>9.2f}{p99:>9.2f}{1:>12.1f}")
+    for wait_ms in args.wait_ms:
+        batcher = MicroBatcher(args.max_batch, wait_ms)
+        throughput, latencies = run(lambda x: batcher.predict_board(engine, x, min_votes, rule['threshold'], args.top_k),
+                                    concurrency)
+        batcher.close()
+        p50, p99 = np.percentile(latencies, [50, 99])
+        label = f"microlotes ({args.max_batch}, {wait_ms:g} ms)"
+        print(f"{label:<26}{concurrency:>9}{throughput:>9.0f}{p50:>9.2f}{p99:>9.2f}{batcher.stats()['mean_rows']:>12.1f}")
@@ -0,0 +1,61 @@
+import argparse
+import ast
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils_bench import random_symptom_sets, report, time_calls
+from rutas import INSUMOS_DIR
+from motor_ensamble import EnsembleEngine, load_all_models
+
+# ================================
+# BENCHMARK: predict_model x5 VS. MOTOR FUSIONADO
+# ================================
+
+parser = argparse.ArgumentParser(description="Compara la latencia del ciclo predict_model contra EnsembleEngine")
+parser.add_argument('--n', type=int, default=200, help="Número de pacientes sintéticos")
+args = parser.parse_args()
+
+with open(os.path.join(INSUMOS_DIR, 'lista_sintomas.txt'), 'r') as f:
+    symptoms_list = ast.literal_eval(f.read())
+
+from pycaret.classification import predict_model
+
+models = load_all_models()
+engine = EnsembleEngine(models)
+
+
+def to_frame(selected):
+    input_vector = [1 if symptom in selected else 0 for symptom in symptoms_list]
+    return pd.DataFrame([input_vector], columns=symptoms_list)
+
+
+def loop_predict_model(input_df):
+    # Ciclo original de interfaz_final_2.py
+    predictions, confidences = [], []
+    for model in models:
+        result = predict_model(model, data=input_df, verbose=False)
+        predictions.append(result.loc[0, 'prediction_label'])
+        confidences.append(result.loc[0, 'prediction_score'])
+    return predictions, confidences
+
+
+def fused(input_df):
+    labels, scores = engine.predict(input_df)
+    return list(labels[:, 0]), list(scores[:, 0])
+
+
+inputs = [to_frame(s) for s in random_symptom_sets(symptoms_list, args.n)]
+
+# Las dos rutas deben producir exactamente las mismas etiquetas y confianzas
+def same_result(a, b):
+    return a[0] == b[0] and np.allclose(a[1], b[1], atol=1e-4)
+
+
+mismatches = sum(not same_result(loop_predict_model(x), fused(x)) for x in inputs[:50])
+print(f"Diferencias en las primeras 50 predicciones: {mismatches}")
+
+p50_loop, p99_loop = report("predict_model x5", time_calls(loop_predict_model, inputs))
+p50_fused, p99_fused = report("EnsembleEngine.predict", time_calls(fused, inputs))
+print(f"Aceleración: p50 x{p50_loop / p50_fused:.1f}   p99 x{p99_loop / p99_fused:.1f}")
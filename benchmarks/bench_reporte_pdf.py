@@ -0,0 +1,105 @@
+import argparse
+import io
+import os
+import time
+import warnings
+
+from fpdf import FPDF
+
+from utils_bench import random_symptom_sets
+from vocabulario import load_vocabulary
+from reporte_pdf import ReportTemplate, report_data, write_zip
+
+# ================================
+# BENCHMARK: GENERACIÓN DE REPORTES PDF
+# ================================
+#
+# Compara el PDF armado dentro de la interfaz (clase definida en cada envío) con la
+# plantilla de reporte_pdf.py, y mide el rendimiento de la generación en bloque:
+# PDF de varias páginas y zip con un PDF por paciente (secuencial y en procesos).
+
+parser = argparse.ArgumentParser(description="Rendimiento de la generación de reportes PDF")
+parser.add_argument('--n', type=int, default=500, help="Reportes por medición")
+parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Procesos para el zip en paralelo")
+args = parser.parse_args()
+
+vocabulary = load_vocabulary()
+symptom_translation = vocabulary.symptom_translation()
+names = ['Regresión', 'Gaussiano', 'XGBoost', 'KNN', 'Árbol']
+reports = []
+for i, symptoms in enumerate(random_symptom_sets(vocabulary.symptoms, args.n)):
+    diagnoses = vocabulary.diagnoses[i % 700:i % 700 + len(names)]
+    reports.append(report_data(
+        {'name': f'Paciente {i}', 'id': str(i), 'age': 40, 'sex': 'Femenino', 'urgency': 'Medio'},
+        [symptom_translation.get(s, s) for s in symptoms],
+        vocabulary.diagnosis_es(diagnoses[0]),
+        vocabulary.description_es(diagnoses[0]),
+        [(n, vocabulary.diagnosis_es(d), 0.2 * (k + 1)) for k, (n, d) in enumerate(zip(names, diagnoses))],
+    ))
+
+
+def legacy_render(data):
+    # Réplica del código que estaba en interfaz_final_2.py
+    class PDF(FPDF):
+        def header(self):
+            self.set_font("Arial", 'B', 16)
+            self.cell(0, 10, "Reporte de Diagnóstico", ln=True, align="C")
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font("Arial", 'I', 8)
+            self.cell(0, 10, f"Página {self.page_no()}", 0, 0, 'C')
+
+    patient = data['patient']
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, f"Nombre: {patient['name']}", ln=True)
+    pdf.cell(0, 10, f"ID: {patient['id']}", ln=True)
+    pdf.cell(0, 10, f"Edad: {patient['age']}   Sexo: {patient['sex']}", ln=True)
+    pdf.cell(0, 10, f"Nivel de urgencia: {patient['urgency']}", ln=True)
+    pdf.ln(5)
+    pdf.cell(0, 10, f"Diagnóstico final: {data['diagnosis']}", ln=True)
+    pdf.multi_cell(0, 10, f"Descripción: {data['description']}".encode('latin-1', 'replace').decode('latin-1'))
+    pdf.ln(5)
+    pdf.cell(0, 10, "Síntomas seleccionados:", ln=True)
+    for symptom in data['symptoms']:
+        pdf.cell(0, 8, f"- {symptom}", ln=True)
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Diagnósticos por Especialista:", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.set_fill_color(220, 220, 220)
+    pdf.cell(60, 10, "Especialista", border=1, fill=True)
+    pdf.cell(70, 10, "Diagnóstico", border=1, fill=True)
+    pdf.cell(40, 10, "Confianza (%)", border=1, ln=True, fill=True)
+    for name, diagnosis, confidence in data['specialists']:
+        pdf.cell(60, 10, name, border=1)
+        pdf.cell(70, 10, diagnosis, border=1)
+        pdf.cell(40, 10, f"{round(confidence * 100)}%", border=1, ln=True)
+    return bytes(pdf.output(dest='S'))
+
+
+def measure(name, fn, n):
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34}{n / elapsed:>10.0f} reportes/s{elapsed / n * 1000:>10.2f} ms/reporte{size / 1e6:>10.1f} MB")
+
+
+template = ReportTemplate()
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    measure("Interfaz (clase por envío)", lambda: sum(len(legacy_render(d)) for d in reports), args.n)
+measure("Plantilla, un PDF por reporte", lambda: sum(len(template.render(d)) for d in reports), args.n)
+measure("Plantilla, PDF de varias páginas", lambda: len(template.render_many(reports)), args.n)
+
+
+def zip_size(workers):
+    buffer = io.BytesIO()
+    write_zip(reports, buffer, template, workers=workers)
+    return buffer.getbuffer().nbytes
+
+
+measure("Zip, 1 proceso", lambda: zip_size(1), args.n)
+measure(f"Zip, {args.workers} procesos", lambda: zip_size(args.workers), args.n)
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from utils_bench import random_symptom_sets
+from vocabulario import load_vocabulary
+
+# ================================
+# PRUEBA DE CARGA DEL SERVICIO DE DIAGNÓSTICO
+# ================================
+#
+# Uso (con el servicio ya levantado):
+#   python carga_servicio.py --url 127.0.0.1:8000 --concurrency 1 4 16 64
+#
+# Cada nivel de concurrencia abre N conexiones keep-alive que envían pacientes
+# sintéticos a /diagnose (o lotes a /diagnose/batch) y reporta rendimiento y latencia
+# de cola. Los pacientes son distintos entre sí para no medir solo la caché, salvo
+# que se pida --repeat-share.
+
+parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP de diagnóstico")
+parser.add_argument('--url', default='127.0.0.1:8000', help="host:puerto del servicio")
+parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+parser.add_argument('--requests', type=int, default=500, help="Solicitudes por nivel de concurrencia")
+parser.add_argument('--batch', type=int, default=0, help="Pacientes por solicitud a /diagnose/batch (0 = /diagnose)")
+parser.add_argument('--repeat-share', type=float, default=0.0, help="Fracción de pacientes repetidos (aciertos de caché)")
+args = parser.parse_args()
+
+host, port = args.url.rsplit(':', 1)
+
+
+async def post(reader, writer, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = next(int(line.split(b':', 1)[1]) for line in head.split(b'\r\n') if line.lower().startswith(b'content-length'))
+    await reader.readexactly(length)
+    return status
+
+
+async def client(queue, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, int(port))
+    try:
+        while True:
+            try:
+                path, payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status = await post(reader, writer, path, payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def build_requests(symptoms, n, seed):
+    rng = np.random.default_rng(seed)
+    patients = random_symptom_sets(symptoms, n * max(args.batch, 1), seed=seed)
+    if args.repeat_share:
+        repeated = rng.random(len(patients)) < args.repeat_share
+        patients = [patients[0] if r else p for p, r in zip(patients, repeated)]
+    if not args.batch:
+        return [('/diagnose', {'symptoms': p}) for p in patients]
+    return [('/diagnose/batch', {'patients': [{'id': str(j), 'symptoms': p}
+                                             for j, p in enumerate(patients[i:i + args.batch])]})
+            for i in range(0, len(patients), args.batch)]
+
+
+async def run_level(concurrency, requests):
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(queue, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    patients = len(requests) * max(args.batch, 1)
+    print(f"{concurrency:>12}{len(requests) / elapsed:>12.1f}{patients / elapsed:>14.1f}"
+          f"{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{len(errors):>9}")
+
+
+async def main():
+    symptoms = load_vocabulary().symptoms
+    print(f"{'concurrencia':>12}{'sol/s':>12}{'pacientes/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for level, concurrency in enumerate(args.concurrency):
+        # Semilla distinta por nivel: los niveles no se benefician de la caché del anterior
+        await run_level(concurrency, build_requests(symptoms, args.requests, seed=1000 + level))
+
+
+asyncio.run(main())
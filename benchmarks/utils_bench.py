@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import numpy as np
+
+# Los módulos de la interfaz se importan como scripts hermanos, igual que en Streamlit
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'interfaz'))
+
+
+def random_symptom_sets(symptoms_list, n, min_size=3, max_size=8, seed=42):
+    # Pacientes sintéticos con 3-8 síntomas activos, como en los ingresos reales
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min_size, max_size + 1, size=n)
+    return [list(rng.choice(symptoms_list, size=k, replace=False)) for k in sizes]
+
+
+def time_calls(fn, inputs, warmup=3):
+    # Ejecuta fn sobre cada entrada y devuelve las latencias en milisegundos
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(name, latencies_ms):
+    p50, p99 = np.percentile(latencies_ms, [50, 99])
+    print(f"{name:<28} p50={p50:8.2f} ms   p99={p99:8.2f} ms   media={latencies_ms.mean():8.2f} ms   n={len(latencies_ms)}")
+    return p50, p99
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import random
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils_bench import PARENT_DIR
+
+# ================================
+# SERVIDOR LOCAL QUE SIMULA EL ENDPOINT page/summary DE WIKIPEDIA
+# ================================
+#
+# Uso:
+#   python wikipedia_simulada.py --port 8081 --latency 0.05 --error-rate 0.1
+#   python ../interfaz/cargar_diagnosticos.py --backend rest --base-url http://127.0.0.1:8081 \
+#       --output /tmp/descripciones.json --journal /tmp/descripciones.jsonl
+#
+# Responde con las descripciones de un JSON (por defecto las de insumos), 404 para
+# los diagnósticos que no están y 429/503 aleatorios para ejercitar los reintentos.
+
+parser = argparse.ArgumentParser(description="Servidor de prueba del endpoint page/summary de Wikipedia")
+parser.add_argument('--port', type=int, default=8081)
+parser.add_argument('--fixture', default=os.path.join(PARENT_DIR, 'insumos', 'descripcion_diagnosticos.json'))
+parser.add_argument('--latency', type=float, default=0.05, help="Segundos por respuesta")
+parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de respuestas 429/503")
+args = parser.parse_args()
+
+with open(args.fixture, 'r', encoding='utf-8') as f:
+    summaries = {k.lower(): v for k, v in json.load(f).items() if not v.startswith(('Descripción', 'Error'))}
+served = {'requests': 0, 'errors': 0}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        served['requests'] += 1
+        time.sleep(args.latency)
+        prefix = '/page/summary/'
+        if random.random() < args.error_rate:
+            served['errors'] += 1
+            self._send(random.choice([429, 503]), {'title': 'Error simulado'})
+        elif not self.path.startswith(prefix):
+            self._send(404, {'title': 'Not found'})
+        else:
+            title = urllib.parse.unquote(self.path[len(prefix):]).replace('_', ' ').lower()
+            extract = summaries.get(title)
+            self._send(200, {'title': title, 'extract': extract}) if extract else self._send(404, {'title': 'Not found'})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+print(f"Wikipedia simulada en http://127.0.0.1:{args.port} ({len(summaries)} resúmenes)")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    print(f"\nSolicitudes: {served['requests']}, errores simulados: {served['errors']}")
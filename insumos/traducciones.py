@@ -1,13 +1,14 @@
+import ast
 import json
 from deep_translator import GoogleTranslator
 
 # Leemos los síntomas
 with open('lista_sintomas.txt', 'r') as f:
-    symptoms_list = eval(f.read())
+    symptoms_list = ast.literal_eval(f.read())
 
 # Leemos los diagnósticos (solo primeros 400)
 with open('diagnosticos.txt', 'r') as f:
-    diagnosis_list = eval(f.read())
+    diagnosis_list = ast.literal_eval(f.read())
 #diagnosis_list = diagnosis_list[:400]
 
 # Leemos las descripciones originales de Wikipedia (en inglés)
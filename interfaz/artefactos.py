@@ -0,0 +1,356 @@
+import functools
+import json
+import os
+import numpy as np
+from scipy import sparse
+from scipy.special import expit, logsumexp, softmax
+
+from rutas import MODELOS_DIR
+from motor_ensamble import MODEL_FILES, PASSTHROUGH_STEPS, load_all_models, split_pipeline
+
+# ================================
+# ARTEFACTOS COMPACTOS DE LOS MODELOS
+# ================================
+#
+# En lugar del pipeline completo de PyCaret (pickle gzip nivel 9), cada modelo se
+# exporta como una carpeta modelos/compacto/<modelo>/ con:
+#   meta.json  -> tipo de estimador, hiperparámetros y clases originales
+#   *.npy      -> estado numérico sin comprimir (se abre con mmap)
+# El cargador reconstruye un objeto que solo sabe hacer predict_proba con NumPy,
+# compatible con EnsembleEngine. El preprocesamiento de PyCaret no se exporta:
+# solo se aceptan pipelines cuyos pasos no alteran una matriz binaria sin nulos.
+
+COMPACT_DIR = 'compacto'
+FORMAT_VERSION = 1
+
+
+def compact_path(model_file, models_dir=MODELOS_DIR):
+    return os.path.join(models_dir, COMPACT_DIR, model_file)
+
+
+def has_compact(model_file, models_dir=MODELOS_DIR):
+    return os.path.exists(os.path.join(compact_path(model_file, models_dir), 'meta.json'))
+
+
+# ================================
+# MODELOS DE SOLO PREDICCIÓN
+# ================================
+
+class CompactModel:
+    accepts_sparse = False
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.labels = np.asarray(meta['labels'], dtype=object)
+        self.classes_ = np.arange(len(self.labels))
+        self.feature_names = meta['feature_names']
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def predict(self, X):
+        return self.labels[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompactLogisticRegression(CompactModel):
+    accepts_sparse = True
+
+    def predict_proba(self, X):
+        decision = np.asarray(X @ self.coef.T) + self.intercept
+        if decision.shape[1] == 1:
+            decision = decision.ravel()
+            if self.meta['ovr']:
+                p = expit(decision)
+                return np.column_stack([1 - p, p])
+            decision = np.column_stack([-decision, decision])
+        if self.meta['ovr']:
+            p = expit(decision)
+            return p / p.sum(axis=1, keepdims=True)
+        return softmax(decision, axis=1)
+
+
+class CompactGaussianNB(CompactModel):
+    accepts_sparse = True
+
+    @functools.cached_property
+    def _terms(self):
+        # Términos que no dependen de X: 1/var, theta/var y la constante por clase
+        inv_var = 1.0 / self.var
+        const = (self.log_prior - 0.5 * np.log(2.0 * np.pi * self.var).sum(axis=1)
+                 - 0.5 * (self.theta ** 2 * inv_var).sum(axis=1))
+        return np.ascontiguousarray(inv_var.T), np.ascontiguousarray((self.theta * inv_var).T), const
+
+    def predict_proba(self, X):
+        # -0.5 * sum((x - theta)^2 / var) expandido en productos matriciales. Con
+        # var_smoothing, 1/var llega a ~1e10 y el orden de las sumas de BLAS (distinto
+        # para 1 fila que para un lote) movía las probabilidades ~1e-6; el producto CSR
+        # suma cada fila siempre en el mismo orden, así que el resultado de un paciente
+        # no depende de con quién se prediga.
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        inv_var_t, theta_inv_var_t, const = self._terms
+        jll = const - 0.5 * (X.power(2) @ inv_var_t - 2.0 * (X @ theta_inv_var_t))
+        return np.exp(jll - logsumexp(jll, axis=1, keepdims=True))
+
+
+class CompactDecisionTree(CompactModel):
+    def apply(self, X):
+        # Recorre el árbol para todas las filas a la vez, un nivel por iteración
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.int64)
+        active = self.left[node] != -1
+        while active.any():
+            r, n = rows[active], node[active]
+            go_left = X[r, self.feature[n]] <= self.threshold[n]
+            node[r] = np.where(go_left, self.left[n], self.right[n])
+            active = self.left[node] != -1
+        return node
+
+    def predict_proba(self, X):
+        # Probabilidades por hoja guardadas como CSR (la mayoría de hojas son puras)
+        leaf_proba = sparse.csr_matrix((self.leaf_data, self.leaf_indices, self.leaf_indptr),
+                                       shape=(len(self.leaf_indptr) - 1, len(self.labels)))
+        return leaf_proba[self.leaf_of_node[self.apply(X)]].toarray()
+
+
+def _heap_push(values, indices, val, val_idx):
+    # Misma inserción en max-heap que sklearn.utils._heap.heap_push
+    size = len(values)
+    current = 0
+    while True:
+        left = 2 * current + 1
+        right = left + 1
+        if left >= size:
+            break
+        elif right >= size:
+            if values[left] > val:
+                swap = left
+            else:
+                break
+        elif values[left] >= values[right]:
+            if val < values[left]:
+                swap = left
+            else:
+                break
+        else:
+            if val < values[right]:
+                swap = right
+            else:
+                break
+        values[current] = values[swap]
+        indices[current] = indices[swap]
+        current = swap
+    values[current] = val
+    indices[current] = val_idx
+
+
+def heap_argkmin(dist, k, block=4096):
+    # Réplica de la búsqueda ArgKmin de sklearn: recorre las filas de entrenamiento en
+    # orden con un max-heap de tamaño k; un candidato entra solo si es estrictamente
+    # menor que la raíz. Así los empates se resuelven igual que en KNeighborsClassifier
+    # (con un hilo o la estrategia parallel_on_X). Solo se visitan en Python los
+    # candidatos que entran al heap; el resto se descarta por bloques vectorizados.
+    values = [np.inf] * k
+    indices = [-1] * k
+    n = len(dist)
+    pos = 0
+    while pos < n:
+        hits = np.flatnonzero(dist[pos:pos + block] < values[0])
+        if hits.size == 0:
+            pos += block
+            continue
+        j = pos + int(hits[0])
+        _heap_push(values, indices, dist[j], j)
+        pos = j + 1
+    return indices
+
+
+class CompactKNN(CompactModel):
+    accepts_sparse = False
+    block_rows = 32_768
+
+    def kneighbors(self, X):
+        # Distancias euclidianas al cuadrado por bloques del conjunto de entrenamiento;
+        # los vecinos se eligen con heap_argkmin para desempatar igual que sklearn.
+        X = np.asarray(X, dtype=np.float32)
+        n_train = self.fit_X.shape[0]
+        query_rows = max(1, 2 ** 25 // n_train)
+        distances, neighbors = [], []
+        for start in range(0, X.shape[0], query_rows):
+            d, n = self._kneighbors_block(X[start:start + query_rows], n_train)
+            distances.append(d)
+            neighbors.append(n)
+        return np.vstack(distances), np.vstack(neighbors)
+
+    def _kneighbors_block(self, X, n_train):
+        k = self.meta['n_neighbors']
+        x_sq = (X.astype(np.float64) ** 2).sum(axis=1, keepdims=True)
+        dist = np.empty((X.shape[0], n_train), dtype=np.float64)
+        for start in range(0, n_train, self.block_rows):
+            block = np.asarray(self.fit_X[start:start + self.block_rows], dtype=np.float32)
+            dot = (X @ block.T).astype(np.float64)
+            dist[:, start:start + len(block)] = x_sq - 2.0 * dot + self.fit_sq[start:start + len(block)]
+        np.maximum(dist, 0.0, out=dist)
+
+        neighbors = np.array([heap_argkmin(row, k) for row in dist], dtype=np.int64).reshape(-1, k)
+        return np.sqrt(np.take_along_axis(dist, neighbors, axis=1)), neighbors
+
+    def predict_proba(self, X):
+        distances, neighbors = self.kneighbors(X)
+        if self.meta['weights'] == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / distances
+            exact = np.isinf(weights)
+            weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+        else:
+            weights = np.ones_like(distances)
+        proba = np.zeros((X.shape[0], len(self.labels)))
+        np.add.at(proba, (np.arange(X.shape[0])[:, None], self.y[neighbors]), weights)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+class CompactXGBoost(CompactModel):
+    def __init__(self, meta, arrays, booster):
+        super().__init__(meta, arrays)
+        self.booster = booster
+
+    def predict_proba(self, X):
+        proba = self.booster.inplace_predict(np.asarray(X, dtype=np.float32), iteration_range=tuple(self.meta['iteration_range']),
+                                             missing=np.nan, validate_features=False)
+        if proba.ndim == 1:
+            proba = np.column_stack([1 - proba, proba])
+        return proba
+
+
+COMPACT_CLASSES = {
+    'LogisticRegression': CompactLogisticRegression,
+    'GaussianNB': CompactGaussianNB,
+    'DecisionTreeClassifier': CompactDecisionTree,
+    'KNeighborsClassifier': CompactKNN,
+    'XGBClassifier': CompactXGBoost,
+}
+
+
+# ================================
+# EXPORTACIÓN
+# ================================
+
+def _tree_state(tree):
+    t = tree.tree_
+    is_leaf = t.children_left == -1
+    leaf_of_node = np.full(t.node_count, -1, dtype=np.int64)
+    leaf_of_node[is_leaf] = np.arange(is_leaf.sum())
+    value = t.value[is_leaf, 0, :]
+    normalizer = value.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    leaf_proba = sparse.csr_matrix(value / normalizer)
+    return {
+        'left': t.children_left.astype(np.int64), 'right': t.children_right.astype(np.int64),
+        'feature': t.feature.astype(np.int64), 'threshold': t.threshold.astype(np.float64),
+        'leaf_of_node': leaf_of_node, 'leaf_data': leaf_proba.data,
+        'leaf_indices': leaf_proba.indices, 'leaf_indptr': leaf_proba.indptr,
+    }
+
+
+def estimator_state(estimator):
+    # Devuelve (meta, arreglos, datos binarios extra) del estimador ajustado
+    kind = type(estimator).__name__
+    if kind == 'LogisticRegression':
+        multi_class = getattr(estimator, 'multi_class', 'auto')
+        ovr = multi_class == 'ovr' or (multi_class in ('auto', 'deprecated')
+                                       and (len(estimator.classes_) <= 2 or estimator.solver == 'liblinear'))
+        return {'ovr': bool(ovr)}, {'coef': estimator.coef_, 'intercept': estimator.intercept_}, None
+    if kind == 'GaussianNB':
+        return {}, {'theta': estimator.theta_, 'var': estimator.var_,
+                    'log_prior': np.log(estimator.class_prior_)}, None
+    if kind == 'DecisionTreeClassifier':
+        return {}, _tree_state(estimator), None
+    if kind == 'KNeighborsClassifier':
+        if estimator.effective_metric_ != 'euclidean':
+            raise ValueError(f"Métrica KNN no soportada: {estimator.effective_metric_}")
+        fit_X = np.asarray(estimator._fit_X)
+        meta = {'n_neighbors': int(estimator.n_neighbors), 'weights': estimator.weights,
+                'n_features': int(fit_X.shape[1])}
+        y = estimator._y.astype(np.int64)
+        from knn_hamming import hamming_arrays, is_binary
+        if is_binary(fit_X):
+            # Síntomas binarios: bitsets + índice invertido, consultados sin recorrer la matriz
+            meta['backend'] = 'hamming'
+            return meta, dict(hamming_arrays(fit_X.astype(np.uint8)), y=y), None
+        fit_sq = (fit_X.astype(np.float64) ** 2).sum(axis=1)
+        return meta, {'fit_X': fit_X, 'fit_sq': fit_sq, 'y': y}, None
+    if kind == 'XGBClassifier':
+        booster = estimator.get_booster()
+        try:
+            best = estimator.best_iteration  # solo existe si se entrenó con early stopping
+        except AttributeError:
+            best = None
+        meta = {'iteration_range': [0, int(best) + 1] if best is not None else [0, 0]}
+        return meta, {}, bytes(booster.save_raw('ubj'))
+    raise ValueError(f"Estimador no soportado: {kind}")
+
+
+def export_model(pipeline, output_dir):
+    transformers, estimator, labels = split_pipeline(pipeline)
+    unsupported = {name for name, _ in transformers} - PASSTHROUGH_STEPS
+    if unsupported:
+        raise ValueError(f"El pipeline tiene pasos que no se pueden omitir: {sorted(unsupported)}")
+    if not np.array_equal(estimator.classes_, np.arange(len(labels))):
+        raise ValueError("Las clases del estimador no son índices consecutivos")
+
+    target = getattr(dict(pipeline.steps).get('label_encoding'), 'target_name_', None)
+    return export_estimator(estimator, labels, [c for c in pipeline.feature_names_in_ if c != target], output_dir)
+
+
+def export_estimator(estimator, labels, feature_names, output_dir, **extra):
+    # Estimador ya ajustado sobre las columnas feature_names; extra se agrega a meta.json
+    meta, arrays, raw = estimator_state(estimator)
+    meta.update({
+        'version': FORMAT_VERSION,
+        'estimator': type(estimator).__name__,
+        'labels': [str(label) for label in labels],
+        'feature_names': list(feature_names),
+        'arrays': sorted(arrays),
+        **extra,
+    })
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f'{name}.npy'), np.ascontiguousarray(array))
+    if raw is not None:
+        with open(os.path.join(output_dir, 'booster.ubj'), 'wb') as f:
+            f.write(raw)
+    with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return output_dir
+
+
+def export_all(models_dir=MODELOS_DIR):
+    for file, pipeline in zip(MODEL_FILES, load_all_models(models_dir)):
+        output = export_model(pipeline, compact_path(file, models_dir))
+        print(f"✅ {file} -> {output}")
+
+
+# ================================
+# CARGA
+# ================================
+
+def load_compact(path, mmap_mode='r'):
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError(f"Versión de artefacto no soportada: {meta['version']}")
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in meta['arrays']}
+
+    cls = COMPACT_CLASSES[meta['estimator']]
+    if meta.get('backend') == 'hamming':
+        from knn_hamming import HammingKNN
+        cls = HammingKNN
+    if cls is CompactXGBoost:
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=os.path.join(path, 'booster.ubj'))
+        return cls(meta, arrays, booster)
+    return cls(meta, arrays)
+
+
+if __name__ == '__main__':
+    export_all()
@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from rutas import DATASET_FILE, MODELOS_DIR
+from registro_modelos import ModelRegistry
+from consenso import RULE_FILE, load_rule, min_votes_for, write_rule
+from preparar_dataset import CACHE_DIR, MIN_COUNT, SEED, TEST_SIZE, open_cache
+
+# ================================
+# BARRIDO DEL UMBRAL DE CONFIANZA Y DE LOS VOTOS MÍNIMOS
+# ================================
+#
+# Uso:
+#   python barrido_umbral.py --output barrido.csv
+#   python barrido_umbral.py --min-consensus-accuracy 0.99 --write-rule   # actualiza modelos/regla_junta.json
+#
+# Las probabilidades de los especialistas sobre la partición de prueba se calculan
+# una sola vez y se guardan como tensor (modelos x filas x diagnósticos) float32 en
+# datasets/cache/, identificado por la versión de los modelos y la partición. El
+# barrido de umbrales y votos mínimos recorre ese tensor con mmap por bloques, sin
+# volver a ejecutar los modelos: cada combinación da la cobertura (filas decididas por
+# consenso), la accuracy de la junta y la accuracy de las filas con consenso.
+
+CHUNKSIZE = 10_000
+THRESHOLDS = np.round(np.arange(0.0, 1.0, 0.02), 2)
+
+
+# ================================
+# TENSOR DE PROBABILIDADES
+# ================================
+
+def tensor_key(engine, data, min_count, n_rows):
+    identity = [engine.version, list(engine.names), data.meta['source'], min_count, n_rows]
+    return hashlib.blake2b(json.dumps(identity).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def build_tensor(engine, data, rows, path, chunksize=CHUNKSIZE):
+    column = {s: i for i, s in enumerate(data.symptoms)}
+    columns = [column[f] for f in engine.feature_names]
+    tmp = f'{path}.tmp.npy'
+    tensor = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32,
+                                       shape=(engine.n_models, len(rows), len(engine.classes)))
+    for start in range(0, len(rows), chunksize):
+        block = rows[start:start + chunksize]
+        X = data.matrix(block)[:, columns].tocsr()
+        tensor[:, start:start + len(block)] = engine.stack_probas(engine.predict_proba_models(X))
+    tensor.flush()
+    del tensor
+    os.replace(tmp, path)
+
+
+def load_tensor(engine, data, rows, min_count, cache_dir=CACHE_DIR, chunksize=CHUNKSIZE, rebuild=False):
+    # Devuelve (tensor con mmap, índice del diagnóstico real en engine.classes o -1)
+    path = os.path.join(cache_dir, f'probas_{tensor_key(engine, data, min_count, len(rows))}.npy')
+    if rebuild or not os.path.exists(path):
+        started = time.perf_counter()
+        build_tensor(engine, data, rows, path, chunksize)
+        print(f"Tensor de probabilidades calculado en {time.perf_counter() - started:.1f} s: {path}")
+    true = pd.Index(engine.classes).get_indexer(np.asarray(data.classes, dtype=object)[np.asarray(data.codes[rows])])
+    return np.load(path, mmap_mode='r'), true
+
+
+# ================================
+# BARRIDO
+# ================================
+
+def sweep(tensor, true, thresholds=THRESHOLDS, votes=None, chunksize=CHUNKSIZE):
+    # Misma regla que consenso.board_decision, evaluada para todas las combinaciones
+    # (votos mínimos x umbral) a la vez sobre cada bloque de filas
+    n_models, n_rows, _ = tensor.shape
+    votes = list(range(1, n_models + 1)) if votes is None else list(votes)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    shape = (len(votes), len(thresholds))
+    n_consensus, consensus_hits, hits = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+
+    for start in range(0, n_rows, chunksize):
+        probas = np.asarray(tensor[:, start:start + chunksize])
+        y = true[start:start + chunksize]
+        rows = np.arange(probas.shape[1])
+        labels = probas.argmax(axis=2)                                   # modelos x filas
+        scores = np.round(probas.max(axis=2).astype(np.float64), 4)      # como prediction_score
+
+        agree_count = (labels[:, None, :] == labels[None, :, :]).sum(axis=1)
+        top = agree_count.argmax(axis=0)                                 # primero más votado
+        top_label = labels[top, rows]
+        top_votes = agree_count[top, rows]
+        agree_scores = np.where(labels == top_label, scores, -np.inf)
+        support = (agree_scores[None, :, :] > thresholds[:, None, None]).sum(axis=1)   # umbrales x filas
+        top_hit = top_label == y
+        best_hit = labels[scores.argmax(axis=0), rows] == y
+
+        for v, min_votes in enumerate(votes):
+            consensus = (top_votes >= min_votes) & (support >= min_votes)
+            n_consensus[v] += consensus.sum(axis=1)
+            consensus_hits[v] += (consensus & top_hit).sum(axis=1)
+            hits[v] += np.where(consensus, top_hit, best_hit).sum(axis=1)
+
+    grid_votes, grid_thresholds = np.meshgrid(votes, thresholds, indexing='ij')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consensus_accuracy = np.where(n_consensus > 0, consensus_hits / n_consensus, np.nan)
+    return pd.DataFrame({
+        'min_votes': grid_votes.ravel(),
+        'threshold': grid_thresholds.ravel(),
+        'coverage': (n_consensus / n_rows).ravel(),
+        'accuracy': (hits / n_rows).ravel(),
+        'consensus_accuracy': consensus_accuracy.ravel(),
+    })
+
+
+def choose(curve, min_consensus_accuracy=None):
+    # Con objetivo de accuracy en el consenso: la combinación de mayor cobertura que lo
+    # cumple. Sin objetivo: la de mayor accuracy de la junta (a igualdad, mayor cobertura).
+    # Los empates se resuelven hacia la regla más exigente (más votos, umbral más alto).
+    order = ['accuracy', 'coverage', 'min_votes', 'threshold']
+    if min_consensus_accuracy is not None:
+        curve = curve[curve['consensus_accuracy'] >= min_consensus_accuracy]
+        order = ['coverage', 'accuracy', 'min_votes', 'threshold']
+    if curve.empty:
+        return None
+    return curve.sort_values(order, ascending=False, kind='stable').iloc[0]
+
+
+def print_curve(curve, current):
+    table = curve.pivot(index='threshold', columns='min_votes', values='accuracy')
+    coverage = curve.pivot(index='threshold', columns='min_votes', values='coverage')
+    shown = table.index[::5]
+    print("Accuracy de la junta / cobertura del consenso por umbral (filas) y votos mínimos (columnas):")
+    print(f"{'umbral':>8}" + ''.join(f"{v:>16}" for v in table.columns))
+    for t in shown:
+        print(f"{t:>8.2f}" + ''.join(f"{table.at[t, v]:>9.4f}/{coverage.at[t, v]:<6.1%}" for v in table.columns))
+    row = curve[(curve['min_votes'] == current['min_votes']) & np.isclose(curve['threshold'], current['threshold'])]
+    if not row.empty:
+        row = row.iloc[0]
+        print(f"\nRegla vigente ({current['min_votes']} votos, > {current['threshold']:.0%}): accuracy "
+              f"{row['accuracy']:.4f}, cobertura {row['coverage']:.2%}, accuracy del consenso {row['consensus_accuracy']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido del umbral de confianza y los votos mínimos de la junta")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset y del tensor")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--models-dir', default=MODELOS_DIR)
+    parser.add_argument('--limit', type=int, default=None, help="Usar solo las primeras N filas de prueba")
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--rebuild', action='store_true', help="Recalcular el tensor de probabilidades")
+    parser.add_argument('--output', default=None, help="CSV con la curva completa")
+    parser.add_argument('--min-consensus-accuracy', type=float, default=None,
+                        help="Accuracy mínima de las filas con consenso para elegir la regla")
+    parser.add_argument('--write-rule', action='store_true', help="Guardar la regla elegida para la interfaz")
+    parser.add_argument('--rule-file', default=RULE_FILE)
+    args = parser.parse_args()
+
+    data = open_cache(args.dataset, args.cache_dir)
+    _, test_rows = data.split(args.min_count, TEST_SIZE, SEED)
+    test_rows = test_rows[:args.limit]
+
+    registry = ModelRegistry(models_dir=args.models_dir).start()
+    registry.wait()
+    engine = registry.engine()
+    if engine is None:
+        raise SystemExit("❌ No fue posible cargar los modelos de la junta médica.")
+
+    tensor, true = load_tensor(engine, data, test_rows, args.min_count, args.cache_dir, args.chunksize, args.rebuild)
+    started = time.perf_counter()
+    curve = sweep(tensor, true, chunksize=args.chunksize)
+    print(f"Barrido de {len(curve)} combinaciones sobre {tensor.shape[1]} filas en {time.perf_counter() - started:.2f} s\n")
+
+    current = load_rule(args.rule_file)
+    current = dict(current, min_votes=min_votes_for(engine.n_models, current['min_votes'], current['board_size']))
+    print_curve(curve, current)
+    if args.output:
+        curve.to_csv(args.output, index=False)
+        print(f"Curva completa en: {args.output}")
+
+    best = choose(curve, args.min_consensus_accuracy)
+    if best is None:
+        print("⚠️ Ninguna combinación alcanza la accuracy de consenso pedida.")
+        return
+    print(f"Regla sugerida: {int(best['min_votes'])} votos, confianza > {best['threshold']:.0%} "
+          f"(accuracy {best['accuracy']:.4f}, cobertura {best['coverage']:.2%})")
+    if args.write_rule:
+        write_rule(args.rule_file, int(best['min_votes']), float(best['threshold']), engine.n_models,
+                   accuracy=round(float(best['accuracy']), 4), coverage=round(float(best['coverage']), 4),
+                   rows=int(tensor.shape[1]), models_version=engine.version)
+        print(f"✅ Regla guardada en {args.rule_file}; la interfaz la lee al iniciar.")
+
+
+if __name__ == '__main__':
+    main()
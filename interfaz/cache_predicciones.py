@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from consenso import CONFIDENCE_THRESHOLD, board_decision
+from diferencial import differential_from_tensor
+
+# ================================
+# CACHÉ DE PREDICCIONES POR CONJUNTO DE SÍNTOMAS
+# ================================
+#
+# Muchos ingresos repiten la misma combinación de síntomas. El resultado de la junta
+# (etiqueta y confianza de cada especialista y diagnóstico final) se guarda bajo un
+# hash de los IDs de síntomas ordenados, la versión del conjunto de modelos y los
+# parámetros de la votación. Hay dos niveles:
+#   - memoria: LRU con TTL y un presupuesto de bytes fijo por proceso;
+#   - disco (opcional): SQLite compartido entre los procesos de Streamlit, que además
+#     sobrevive a los reinicios.
+
+# Ruta del nivel en disco; sin definir, la caché solo vive en memoria
+CACHE_DB = os.environ.get('CACHE_PREDICCIONES_DB')
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_TTL_S = 24 * 3600
+ENTRY_OVERHEAD = 200        # bytes aproximados del nodo del OrderedDict, la clave y la tupla
+PRUNE_EVERY = 256           # escrituras en disco entre cada limpieza
+
+
+def prediction_key(symptom_ids, version, *params):
+    # Clave canónica: el orden en que se eligieron los síntomas no importa
+    canonical = json.dumps([sorted({int(i) for i in symptom_ids}), version, list(params)])
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def predict_boards(engine, X, min_votes, threshold=CONFIDENCE_THRESHOLD, top_k=0, voting='mean', weights=None):
+    # Resultado de la junta para cada fila de X, en tipos nativos para serializarlo.
+    # Con top_k > 0 incluye el diagnóstico diferencial, calculado con las mismas probabilidades.
+    probas = engine.predict_proba_models(X)
+    labels, scores = engine.labels_scores(probas)
+    final, by_consensus = board_decision(labels, scores, min_votes=min_votes, threshold=threshold)
+    boards = [{
+        'names': list(engine.names),
+        'labels': [str(label) for label in labels[:, i]],
+        'scores': [float(score) for score in scores[:, i]],
+        'final': str(final[i]),
+        'consensus': bool(by_consensus[i]),
+    } for i in range(len(final))]
+    if top_k:
+        diff_labels, diff_scores = differential_from_tensor(engine.stack_probas(probas), engine.classes,
+                                                            engine.names, top_k, voting, weights)
+        for board, row_labels, row_scores in zip(boards, diff_labels, diff_scores):
+            board['differential'] = [[str(label), float(score)] for label, score in zip(row_labels, row_scores)]
+    return boards
+
+
+def predict_board(engine, X, min_votes, threshold=CONFIDENCE_THRESHOLD, top_k=0, voting='mean', weights=None):
+    # Un solo paciente
+    return predict_boards(engine, X, min_votes, threshold, top_k, voting, weights)[0]
+
+
+class PredictionCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl_s=DEFAULT_TTL_S, db_path=None, max_disk_entries=100_000):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # clave -> (vence, JSON codificado)
+        self._bytes = 0
+        self._writes = 0
+        self.counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'disk_evictions': 0}
+
+        self._db = None
+        if db_path is not None:
+            # Una conexión por proceso protegida por el lock; WAL permite lectores concurrentes
+            self._db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions "
+                             "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_expires ON predictions (expires_at)")
+
+    # ---- memoria ----
+
+    def _store(self, key, expires_at, payload):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[1]) + ENTRY_OVERHEAD
+        self._entries[key] = (expires_at, payload)
+        self._bytes += len(payload) + ENTRY_OVERHEAD
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted) + ENTRY_OVERHEAD
+            self.counters['evictions'] += 1
+
+    def _drop(self, key):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload) + ENTRY_OVERHEAD
+
+    # ---- API ----
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return json.loads(entry[1])
+                self._drop(key)
+                self.counters['expired'] += 1
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at FROM predictions WHERE key = ? AND expires_at > ?",
+                                       (key, now)).fetchone()
+                if row is not None:
+                    payload = row[0].encode('utf-8')
+                    self._store(key, row[1], payload)
+                    self.counters['disk_hits'] += 1
+                    return json.loads(payload)
+
+            self.counters['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._store(key, expires_at, payload)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO predictions (key, value, expires_at) VALUES (?, ?, ?)",
+                                 (key, payload.decode('utf-8'), expires_at))
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune_disk()
+
+    def _prune_disk(self):
+        # Borra vencidos y, si se supera el tope, las entradas que vencen primero
+        deleted = self._db.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),)).rowcount
+        (count,) = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        if count > self.max_disk_entries:
+            deleted += self._db.execute(
+                "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY expires_at LIMIT ?)",
+                (count - self.max_disk_entries,)).rowcount
+        self.counters['disk_evictions'] += deleted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['disk_hits'] + self.counters['misses']
+            hits = self.counters['hits'] + self.counters['disk_hits']
+            return dict(self.counters, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes,
+                        hit_rate=hits / lookups if lookups else None, disk=self.db_path)
@@ -1,64 +1,266 @@
-import wikipediaapi
+import argparse
 import json
-import time
 import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from tqdm import tqdm
 
+from rutas import INSUMOS_DIR
+from vocabulario import read_list
+
+# ================================
+# DESCRIPCIONES DE DIAGNÓSTICOS DESDE WIKIPEDIA
+# ================================
+#
+# Uso:
+#   python cargar_diagnosticos.py --workers 8 --rate 5
+#   python cargar_diagnosticos.py --backend rest --base-url http://127.0.0.1:8081   # servidor de prueba
+#
+# Descarga el resumen (dos primeras oraciones) de todos los diagnósticos en un pool de
+# hilos limitado por un token bucket, reintenta los errores transitorios con backoff
+# exponencial y registra cada resultado en un journal JSONL de solo anexado. Al
+# reanudar se omiten los diagnósticos ya registrados; el JSON final se escribe una
+# sola vez al terminar.
+
 # === Parámetros de ejecución ===
-INPUT_FILE = 'diagnosticos.txt'
-OUTPUT_FILE = 'descripcion_diagnosticos.json'
-LIMIT_DIAGNOSIS = 400
-SLEEP_TIME = 0.1  # segundos entre requests
-
-# === Inicializamos Wikipedia API ===
-wiki_en = wikipediaapi.Wikipedia(language = 'en', user_agent='proyectointegrador2/1.0 (gustavojerezt@gmail.com)')
-
-# === Función para obtener resumen desde Wikipedia ===
-def get_summary(term):
-    # Buscar en inglés
-    page_en = wiki_en.page(term)
-    if page_en.exists():
-        summary = page_en.summary.split('. ')
-        short = '. '.join(summary[:2]).strip()
-        if not short.endswith('.'):
-            short += '.'
-        return short
-
-    # No encontrado
-    return None
-
-# === Leer la lista de diagnósticos ===
-with open(INPUT_FILE, 'r') as f:
-    diagnosticos = eval(f.read())
-
-diagnosticos = diagnosticos[:LIMIT_DIAGNOSIS]
-
-# === Cargar progreso previo si existe ===
-if os.path.exists(OUTPUT_FILE):
-    with open(OUTPUT_FILE, 'r') as f:
-        descriptions = json.load(f)
-else:
+INPUT_FILE = os.path.join(INSUMOS_DIR, 'diagnosticos.txt')
+OUTPUT_FILE = os.path.join(INSUMOS_DIR, 'descripcion_diagnosticos.json')
+JOURNAL_FILE = os.path.join(INSUMOS_DIR, 'descripcion_diagnosticos.jsonl')
+USER_AGENT = 'proyectointegrador2/1.0 (gustavojerezt@gmail.com)'
+REST_URL = 'https://en.wikipedia.org/api/rest_v1'
+
+WORKERS = 8
+RATE = 5.0          # solicitudes por segundo (el script original dormía 0.1 s entre llamadas)
+MAX_RETRIES = 4
+BACKOFF_S = 0.5
+
+NOT_AVAILABLE = "Descripción no disponible."
+FETCH_ERROR = "Error al buscar descripción."
+OK, MISSING, ERROR = 'ok', 'missing', 'error'
+
+
+class TransientError(Exception):
+    # Error que vale la pena reintentar (límite de tasa, 5xx, red)
+    pass
+
+
+def short_summary(text):
+    # Dos primeras oraciones del resumen, terminadas en punto
+    short = '. '.join(text.split('. ')[:2]).strip()
+    if not short.endswith('.'):
+        short += '.'
+    return short
+
+
+# ================================
+# BACKENDS
+# ================================
+# Un backend expone fetch(término) -> resumen completo, o None si la página no existe.
+
+class WikipediaApiBackend:
+    # Biblioteca wikipedia-api, como el script original
+    def __init__(self, language='en', user_agent=USER_AGENT):
+        import wikipediaapi
+        self.wiki = wikipediaapi.Wikipedia(language=language, user_agent=user_agent)
+
+    def fetch(self, term):
+        try:
+            page = self.wiki.page(term)
+            return page.summary if page.exists() else None
+        except Exception as e:
+            raise TransientError(str(e)) from e
+
+
+class RestBackend:
+    # Endpoint REST page/summary; con base_url apunta a un servidor local de prueba
+    def __init__(self, base_url=REST_URL, user_agent=USER_AGENT, timeout=10.0):
+        self.base_url = base_url.rstrip('/')
+        self.user_agent = user_agent
+        self.timeout = timeout
+
+    def fetch(self, term):
+        url = f"{self.base_url}/page/summary/{urllib.parse.quote(term.replace(' ', '_'), safe='')}"
+        request = urllib.request.Request(url, headers={'User-Agent': self.user_agent, 'Accept': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response).get('extract') or None
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            if e.code == 429 or e.code >= 500:
+                raise TransientError(f"HTTP {e.code}") from e
+            raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise TransientError(str(e)) from e
+
+
+BACKENDS = {'wikipediaapi': WikipediaApiBackend, 'rest': RestBackend}
+
+
+# ================================
+# CONTROL DE TASA Y REINTENTOS
+# ================================
+
+class TokenBucket:
+    # `rate` solicitudes por segundo con ráfagas de hasta `capacity`; seguro entre hilos
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_with_retries(backend, bucket, term, max_retries=MAX_RETRIES, backoff_s=BACKOFF_S):
+    # Devuelve (estado, descripción, intentos)
+    for attempt in range(1, max_retries + 2):
+        bucket.acquire()
+        try:
+            summary = backend.fetch(term)
+            return (OK, short_summary(summary), attempt) if summary else (MISSING, None, attempt)
+        except TransientError as e:
+            if attempt > max_retries:
+                return ERROR, str(e), attempt
+            # Backoff exponencial con jitter para no sincronizar los hilos
+            time.sleep(backoff_s * 2 ** (attempt - 1) * (0.5 + random.random()))
+        except Exception as e:
+            return ERROR, f"{type(e).__name__}: {e}", attempt
+
+
+# ================================
+# JOURNAL
+# ================================
+
+class Journal:
+    # Un registro JSON por línea; el último registro de cada diagnóstico es el vigente
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def read(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # última línea truncada por una interrupción
+                records[record['diagnosis']] = record
+        return records
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def seed_from_output(output_file):
+    # Descripciones ya presentes en el JSON de una ejecución anterior (sin journal)
+    if not os.path.exists(output_file):
+        return {}
+    with open(output_file, 'r', encoding='utf-8') as f:
+        existing = json.load(f)
+    records = {}
+    for diagnosis, text in existing.items():
+        if text == FETCH_ERROR:
+            continue
+        status = MISSING if text == NOT_AVAILABLE else OK
+        records[diagnosis] = {'diagnosis': diagnosis, 'status': status, 'description': text if status == OK else None}
+    return records
+
+
+def write_output(diagnoses, records, output_file):
+    # JSON final en el orden de diagnosticos.txt, con los textos del script original
     descriptions = {}
+    for diagnosis in diagnoses:
+        record = records.get(diagnosis)
+        if record is None:
+            continue
+        descriptions[diagnosis] = {OK: record.get('description'), MISSING: NOT_AVAILABLE}.get(record['status'], FETCH_ERROR)
+    tmp = f'{output_file}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(descriptions, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, output_file)
+    return descriptions
+
+
+def harvest(diagnoses, backend, journal, workers=WORKERS, rate=RATE, max_retries=MAX_RETRIES,
+            known=None, progress=True):
+    # Descarga los diagnósticos pendientes; devuelve los registros vigentes de todos
+    records = dict(known or {})
+    records.update(journal.read())
+    pending = [d for d in dict.fromkeys(diagnoses) if records.get(d, {}).get('status') not in (OK, MISSING)]
+    bucket = TokenBucket(rate)
 
-# === Iterar sobre los diagnósticos ===
-for diag in tqdm(diagnosticos, desc="Procesando diagnósticos"):
-    if diag in descriptions:
-        continue  # ya procesado
+    def task(diagnosis):
+        status, description, attempts = fetch_with_retries(backend, bucket, diagnosis, max_retries)
+        record = {'diagnosis': diagnosis, 'status': status, 'description': description,
+                  'attempts': attempts, 'ts': time.time()}
+        journal.append(record)
+        return record
 
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wikipedia')
     try:
-        desc = get_summary(diag)
-        if desc:
-            descriptions[diag] = desc
-        else:
-            descriptions[diag] = "Descripción no disponible."
-    except Exception as e:
-        descriptions[diag] = "Error al buscar descripción."
-        print(f"Error en diagnóstico: {diag} -> {e}")
-
-    # Guardado parcial tras cada diagnóstico
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(descriptions, f, indent=2, ensure_ascii=False)
+        futures = [executor.submit(task, d) for d in pending]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Procesando diagnósticos", disable=not progress):
+            record = future.result()
+            records[record['diagnosis']] = record
+    finally:
+        # Con Ctrl+C se descartan los pendientes; lo ya registrado queda en el journal
+        executor.shutdown(wait=True, cancel_futures=True)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga las descripciones de los diagnósticos desde Wikipedia")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='wikipediaapi')
+    parser.add_argument('--base-url', default=REST_URL, help="URL base del backend rest")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--rate', type=float, default=RATE, help="Solicitudes por segundo")
+    parser.add_argument('--retries', type=int, default=MAX_RETRIES)
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Descargar solo los primeros N diagnósticos (el JSON conserva todos los demás)")
+    parser.add_argument('--input', default=INPUT_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--journal', default=JOURNAL_FILE)
+    args = parser.parse_args()
+
+    diagnoses = read_list(args.input)
+    backend = RestBackend(args.base_url) if args.backend == 'rest' else WikipediaApiBackend()
+    started = time.perf_counter()
+    # --limit solo restringe lo que se descarga; el JSON se arma con todos los diagnósticos
+    # (registros anteriores del JSON y del journal incluidos)
+    records = harvest(diagnoses[:args.limit], backend, Journal(args.journal), args.workers, args.rate, args.retries,
+                      known=seed_from_output(args.output))
+    write_output(diagnoses, records, args.output)
+
+    counts = {status: sum(records.get(d, {}).get('status') == status for d in diagnoses) for status in (OK, MISSING, ERROR)}
+    print(f"\n✅ Proceso finalizado en {time.perf_counter() - started:.1f} s: {counts[OK]} descripciones, "
+          f"{counts[MISSING]} sin página, {counts[ERROR]} con error (se reintentan en la próxima ejecución).")
+    print("Descripciones almacenadas en:", args.output)
 
-    time.sleep(SLEEP_TIME)
 
-print("\n✅ Proceso finalizado. Descripciones almacenadas en:", OUTPUT_FILE)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from metricas import timed
+
+# ================================
+# CODIFICADOR DE SÍNTOMAS
+# ================================
+#
+# Un paciente tiene entre 3 y 8 de los 377 síntomas activos, por lo que la matriz
+# de síntomas se guarda como CSR (uint8) o como bitset empaquetado de 48 bytes por
+# fila en lugar de DataFrames densos int64. Lo usan la interfaz, el diagnóstico por
+# lotes y el notebook de entrenamiento.
+
+TARGET_COLUMN = 'diseases'
+
+
+class SymptomEncoder:
+    def __init__(self, symptoms_list, symptom_translation=None):
+        self.symptoms = list(symptoms_list)
+        # Índice precalculado nombre -> columna (inglés y, si se entrega, español)
+        self.index = {s.strip().lower(): i for i, s in enumerate(self.symptoms)}
+        for en, es in (symptom_translation or {}).items():
+            col = self.index.get(en.strip().lower())
+            if col is not None:
+                self.index.setdefault(es.strip().lower(), col)
+
+    @property
+    def n_symptoms(self):
+        return len(self.symptoms)
+
+    def indices(self, selected):
+        # Columnas activas de un paciente y síntomas no reconocidos
+        cols = set()
+        unknown = []
+        for item in selected:
+            key = item.strip().lower()
+            if not key:
+                continue
+            col = self.index.get(key)
+            if col is None:
+                unknown.append(item.strip())
+            else:
+                cols.add(col)
+        return sorted(cols), unknown
+
+    @timed('encoding')
+    def encode(self, patients, sep=';'):
+        # patients: iterable de listas de síntomas (o cadenas separadas por `sep`).
+        # Devuelve (matriz CSR pacientes x síntomas, síntomas no reconocidos).
+        indptr = [0]
+        indices = []
+        unknown = set()
+        for selected in patients:
+            if isinstance(selected, str):
+                selected = selected.split(sep)
+            elif selected is None:
+                selected = []
+            cols, missing = self.indices(selected)
+            indices.extend(cols)
+            unknown.update(missing)
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.uint8)
+        X = sparse.csr_matrix((data, np.asarray(indices, dtype=np.int32), indptr),
+                              shape=(len(indptr) - 1, self.n_symptoms))
+        return X, unknown
+
+    def encode_one(self, selected):
+        return self.encode([selected])[0]
+
+    def decode(self, X):
+        # Lista de síntomas activos por fila
+        X = sparse.csr_matrix(X)
+        return [[self.symptoms[c] for c in X.indices[X.indptr[r]:X.indptr[r + 1]]] for r in range(X.shape[0])]
+
+    def to_frame(self, X):
+        # DataFrame denso uint8 con las columnas del modelo (lo que espera PyCaret)
+        return pd.DataFrame(sparse.csr_matrix(X).toarray().astype(np.uint8), columns=self.symptoms)
+
+
+# ================================
+# BITSETS EMPAQUETADOS
+# ================================
+
+def to_bitset(X):
+    # CSR -> matriz uint8 (filas x ceil(n/8)), mismo orden de bits que np.packbits
+    X = sparse.csr_matrix(X)
+    n_rows, n_cols = X.shape
+    bits = np.zeros((n_rows, (n_cols + 7) // 8), dtype=np.uint8)
+    rows = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+    cols = X.indices[X.data != 0]
+    rows = rows[X.data != 0]
+    np.bitwise_or.at(bits, (rows, cols >> 3), (128 >> (cols & 7)).astype(np.uint8))
+    return bits
+
+
+def from_bitset(bits, n_cols):
+    dense = np.unpackbits(bits, axis=1, count=n_cols)
+    return sparse.csr_matrix(dense)
+
+
+# ================================
+# LECTURA DEL DATASET DE ENTRENAMIENTO
+# ================================
+
+def read_symptom_dataset(path, target=TARGET_COLUMN, chunksize=20_000):
+    # Lee el CSV aumentado por bloques con columnas uint8 y acumula una CSR.
+    # Devuelve (X CSR uint8, y categórica, lista de síntomas en orden de columnas).
+    header = pd.read_csv(path, nrows=0).columns
+    symptoms = [c for c in header if c != target]
+    dtypes = {c: np.uint8 for c in symptoms}
+    dtypes[target] = str
+
+    blocks, labels = [], []
+    for chunk in pd.read_csv(path, dtype=dtypes, chunksize=chunksize):
+        blocks.append(sparse.csr_matrix(chunk[symptoms].to_numpy()))
+        labels.append(chunk[target])
+
+    X = sparse.vstack(blocks, format='csr')
+    y = pd.concat(labels, ignore_index=True).astype('category')
+    return X, y, symptoms
+
+
+def to_training_frame(X, y, symptoms, target=TARGET_COLUMN):
+    # DataFrame uint8 para PyCaret: ocupa 1/8 del int64 que infiere read_csv.
+    # El objetivo vuelve a texto para que value_counts no liste categorías vacías.
+    df = pd.DataFrame(sparse.csr_matrix(X).toarray(), columns=symptoms)
+    df[target] = np.asarray(y, dtype=object)
+    return df
@@ -0,0 +1,76 @@
+import json
+import math
+import os
+import numpy as np
+
+from rutas import MODELOS_DIR
+from metricas import timed
+
+# ================================
+# REGLA DE VOTACIÓN DE LA JUNTA MÉDICA
+# ================================
+
+# Mínimo de especialistas que deben coincidir y confianza mínima de cada uno
+MIN_VOTES = 3
+CONFIDENCE_THRESHOLD = 0.6
+BOARD_SIZE = 5
+
+# La regla vigente se puede ajustar sin tocar el código (ver barrido_umbral.py); si el
+# archivo no existe se usan los valores anteriores
+RULE_FILE = os.environ.get('REGLA_JUNTA', os.path.join(MODELOS_DIR, 'regla_junta.json'))
+DEFAULT_RULE = {'min_votes': MIN_VOTES, 'threshold': CONFIDENCE_THRESHOLD, 'board_size': BOARD_SIZE}
+
+
+def load_rule(path=RULE_FILE):
+    rule = dict(DEFAULT_RULE)
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        rule.update({key: stored[key] for key in DEFAULT_RULE if key in stored})
+    rule['min_votes'] = int(rule['min_votes'])
+    rule['threshold'] = float(rule['threshold'])
+    rule['board_size'] = int(rule['board_size'])
+    if not 1 <= rule['min_votes'] <= rule['board_size'] or not 0.0 <= rule['threshold'] < 1.0:
+        raise ValueError(f"Regla de la junta inválida en {path}: {rule}")
+    return rule
+
+
+def write_rule(path, min_votes, threshold, board_size=BOARD_SIZE, **details):
+    # details: métricas del barrido que la respaldan (solo informativas)
+    rule = {'min_votes': int(min_votes), 'threshold': float(threshold), 'board_size': int(board_size), **details}
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(rule, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return rule
+
+
+def min_votes_for(n_models, min_votes=MIN_VOTES, board_size=BOARD_SIZE):
+    # Junta incompleta (modelos aún cargando): se conserva la proporción 3 de 5
+    return max(1, math.ceil(min_votes * n_models / board_size))
+
+
+@timed('voting')
+def board_decision(labels, scores, min_votes=MIN_VOTES, threshold=CONFIDENCE_THRESHOLD):
+    # labels y scores tienen forma (modelos x filas). Para cada fila (paciente):
+    #   - si el diagnóstico más votado tiene al menos `min_votes` votos con confianza
+    #     mayor a `threshold`, se adopta por consenso;
+    #   - si no, se adopta el diagnóstico del modelo con mayor confianza.
+    # Devuelve (diagnóstico final, fila decidida por consenso) como arreglos por fila.
+    labels = np.asarray(labels, dtype=object)
+    scores = np.asarray(scores, dtype=np.float64)
+    n_rows = labels.shape[1]
+    rows = np.arange(n_rows)
+
+    # same[k, j, r]: los modelos k y j coinciden en la fila r
+    same = labels[:, None, :] == labels[None, :, :]
+    votes = same.sum(axis=1)
+    support = (same & (scores > threshold)[None, :, :]).sum(axis=1)
+
+    # Igual que Counter.most_common: ante empate gana el diagnóstico que aparece primero
+    top = votes.argmax(axis=0)
+    by_consensus = (votes[top, rows] >= min_votes) & (support[top, rows] >= min_votes)
+
+    best = scores.argmax(axis=0)
+    winner = np.where(by_consensus, top, best)
+    return labels[winner, rows], by_consensus
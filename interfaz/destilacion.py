@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from rutas import DATASET_FILE, MODELOS_DIR
+from registro_modelos import ModelRegistry
+from motor_ensamble import check_columns
+from consenso import board_decision, load_rule, min_votes_for
+from cache_predicciones import predict_board
+from diferencial import TOP_K, aggregate, top_k
+from artefactos import compact_path, export_estimator, has_compact, load_compact
+from preparar_dataset import CACHE_DIR, MIN_COUNT, SEED, TEST_SIZE, open_cache
+
+# ================================
+# MODELO ESTUDIANTE (DESTILACIÓN DE LA JUNTA)
+# ================================
+#
+# Uso:
+#   python destilacion.py                           # entrena, calibra y reporta en la partición de prueba
+#   python destilacion.py --target-agreement 0.995
+#
+# Una regresión logística multinomial sobre los 377 síntomas binarios aprende a
+# reproducir la junta: el diagnóstico final (regla de consenso) y las probabilidades
+# promedio de los cinco especialistas. Cada fila de entrenamiento se repite para el
+# diagnóstico final y los más probables de la junta, con pesos que mezclan ambas
+# señales. Se exporta como artefacto compacto (modelos/compacto/modelo_estudiante/)
+# junto con el umbral de confianza por encima del cual su respuesta coincide con la
+# junta al menos en target_agreement de los casos; por debajo, la interfaz consulta
+# la junta completa ("modo rápido").
+
+STUDENT_FILE = 'modelo_estudiante'
+STUDENT_NAME = 'Estudiante'
+TARGET_AGREEMENT = 0.99
+SOFT_TOP = 3            # diagnósticos de la junta que entran como etiqueta blanda
+HARD_WEIGHT = 0.5       # peso del diagnóstico final frente a las probabilidades promedio
+MIN_CONFIDENCE = 0.5    # piso del umbral: la calibración usa pacientes del dataset y
+                        # no ve combinaciones de síntomas atípicas
+CALIBRATION = 0.1       # fracción del entrenamiento reservada para calibrar el umbral
+CHUNKSIZE = 10_000
+CONFIDENCE_GRID = np.round(np.arange(0.0, 1.0, 0.01), 2)
+
+
+# ================================
+# USO EN LA INTERFAZ
+# ================================
+
+class StudentModel:
+    def __init__(self, model):
+        self.model = model
+        info = model.meta['student']
+        self.confidence = info['confidence']
+        self.version = info['version']
+        self.info = info
+
+    def is_current(self, models_version, rule):
+        # El estudiante imita a una junta concreta: mismos artefactos y misma regla
+        return self.info.get('models_version') == models_version and self.info.get('rule') == rule
+
+    def predict_board(self, X, k=0):
+        # Resultado con la forma de cache_predicciones.predict_board, o None si la
+        # confianza no alcanza el umbral calibrado (se debe consultar la junta)
+        proba = self.model.predict_proba(X)
+        best = int(proba[0].argmax())
+        score = float(proba[0, best])
+        if score < self.confidence:
+            return None
+        label = str(self.model.labels[best])
+        board = {
+            'names': [STUDENT_NAME],
+            'labels': [label],
+            'scores': [round(score, 4)],
+            'final': label,
+            'consensus': None,
+            'student': True,
+        }
+        if k:
+            index, scores = top_k(proba, k)
+            board['differential'] = [[str(self.model.labels[i]), float(p)] for i, p in zip(index[0], scores[0])]
+        return board
+
+
+def load_student(models_dir=MODELOS_DIR, models_version=None, rule=None, columns=None):
+    # Con models_version y rule, devuelve None si el estudiante se destiló con otros
+    # modelos (reentrenados o reexportados) o con otra regla de la junta (barrido_umbral.py).
+    # Con columns (síntomas del codificador) exige que sean sus columnas y en el mismo orden.
+    if not has_compact(STUDENT_FILE, models_dir):
+        return None
+    student = StudentModel(load_compact(compact_path(STUDENT_FILE, models_dir)))
+    if columns is not None:
+        check_columns(columns, student.model.feature_names)
+    if models_version is not None and rule is not None and not student.is_current(models_version, rule):
+        print("⚠️ El modelo estudiante es de otra versión de la junta o de otra regla; "
+              "se desactiva el modo rápido hasta volver a ejecutar destilacion.py")
+        return None
+    return student
+
+
+# ================================
+# OBJETIVOS DE LA JUNTA
+# ================================
+
+def teacher_targets(engine, data, rows, rule, chunksize=CHUNKSIZE):
+    # Para cada fila: índice del diagnóstico final (en engine.classes) y las
+    # probabilidades promedio de la junta restringidas a sus SOFT_TOP más altas
+    column = {s: i for i, s in enumerate(data.symptoms)}
+    columns = [column[f] for f in engine.feature_names]
+    class_index = pd.Index(engine.classes)
+    min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size'])
+    finals, soft_index, soft_scores, final_mean = [], [], [], []
+    for start in range(0, len(rows), chunksize):
+        X = data.matrix(rows[start:start + chunksize])[:, columns].tocsr()
+        probas = engine.predict_proba_models(X)
+        labels, scores = engine.labels_scores(probas)
+        final, _ = board_decision(labels, scores, min_votes, rule['threshold'])
+        final = class_index.get_indexer(final)
+        mean = aggregate(engine.stack_probas(probas))
+        index, top_scores = top_k(mean, SOFT_TOP)
+        finals.append(final)
+        soft_index.append(index)
+        soft_scores.append(top_scores)
+        final_mean.append(mean[np.arange(len(final)), final])
+    return (np.concatenate(finals), np.concatenate(soft_index), np.concatenate(soft_scores),
+            np.concatenate(final_mean))
+
+
+def expand_targets(X, finals, soft_index, soft_scores):
+    # Filas repetidas por etiqueta con su peso: HARD_WEIGHT para el diagnóstico final y
+    # el resto repartido según las probabilidades promedio de la junta
+    n_rows, k = soft_index.shape
+    soft = soft_scores / soft_scores.sum(axis=1, keepdims=True)
+    rows = np.concatenate([np.arange(n_rows), np.repeat(np.arange(n_rows), k)])
+    labels = np.concatenate([finals, soft_index.ravel()])
+    weights = np.concatenate([np.full(n_rows, HARD_WEIGHT), (1 - HARD_WEIGHT) * soft.ravel()])
+    return X[rows], labels, weights
+
+
+def calibrate(confidence, agree, target=TARGET_AGREEMENT):
+    # Menor umbral cuyo subconjunto aceptado coincide con la junta al menos en `target`
+    for threshold in CONFIDENCE_GRID[CONFIDENCE_GRID >= MIN_CONFIDENCE]:
+        accepted = confidence >= threshold
+        if accepted.any() and agree[accepted].mean() >= target:
+            return float(threshold)
+    return 1.0
+
+
+# ================================
+# ENTRENAMIENTO Y REPORTE
+# ================================
+
+def train_student(engine, data, rows, rule, C=1.0, target=TARGET_AGREEMENT, chunksize=CHUNKSIZE, seed=SEED):
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(rows)
+    n_calibration = max(1, int(len(rows) * CALIBRATION))
+    fit_rows, calibration_rows = shuffled[n_calibration:], shuffled[:n_calibration]
+
+    column = {s: i for i, s in enumerate(data.symptoms)}
+    columns = [column[f] for f in engine.feature_names]
+    finals, soft_index, soft_scores, _ = teacher_targets(engine, data, fit_rows, rule, chunksize)
+    X = data.matrix(fit_rows)[:, columns].tocsr().astype(np.float64)
+    X, labels, weights = expand_targets(X, finals, soft_index, soft_scores)
+
+    # Clases consecutivas: el artefacto compacto guarda las etiquetas en ese orden
+    present, codes = np.unique(labels, return_inverse=True)
+    student = LogisticRegression(C=C, max_iter=500)
+    student.fit(X, codes, sample_weight=weights)
+    student_labels = np.asarray(engine.classes, dtype=object)[present]
+
+    # Umbral de confianza sobre filas que el estudiante no vio
+    cal_finals, _, _, _ = teacher_targets(engine, data, calibration_rows, rule, chunksize)
+    proba = student.predict_proba(data.matrix(calibration_rows)[:, columns].tocsr().astype(np.float64))
+    agree = present[proba.argmax(axis=1)] == cal_finals
+    return student, student_labels, calibrate(proba.max(axis=1), agree, target)
+
+
+def report(engine, student, data, rows, rule, chunksize=CHUNKSIZE, latency_n=200):
+    column = {s: i for i, s in enumerate(data.symptoms)}
+    columns = [column[f] for f in engine.feature_names]
+    finals, _, _, final_mean = teacher_targets(engine, data, rows, rule, chunksize)
+    class_index = pd.Index(engine.classes)
+
+    X = data.matrix(rows)[:, columns].tocsr()
+    started = time.perf_counter()
+    proba = student.model.predict_proba(X)
+    student_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for start in range(0, len(rows), chunksize):
+        block = X[start:start + chunksize]
+        labels, scores = engine.labels_scores(engine.predict_proba_models(block))
+        board_decision(labels, scores, min_votes_for(engine.n_models, rule['min_votes'], rule['board_size']),
+                       rule['threshold'])
+    board_s = time.perf_counter() - started
+
+    predicted = class_index.get_indexer(student.model.labels[proba.argmax(axis=1)])
+    confidence = proba.max(axis=1)
+    agree = predicted == finals
+    accepted = confidence >= student.confidence
+    final_column = pd.Index(student.model.labels).get_indexer(engine.classes[finals])
+    student_final = np.where(final_column >= 0, proba[np.arange(len(rows)), np.maximum(final_column, 0)], 0.0)
+
+    # Latencia por paciente: junta completa frente al modo rápido (con respaldo)
+    min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size'])
+    sample = [X[i] for i in range(min(latency_n, X.shape[0]))]
+
+    def timed(fn):
+        for x in sample[:3]:
+            fn(x)
+        latencies = []
+        for x in sample:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return float(np.percentile(latencies, 50))
+
+    def board_call(x):
+        return predict_board(engine, x, min_votes, rule['threshold'], top_k=TOP_K)
+
+    def fast_call(x):
+        return student.predict_board(x, TOP_K) or board_call(x)
+
+    board_p50, fast_p50 = timed(board_call), timed(fast_call)
+    return {
+        'rows': int(len(rows)),
+        'agreement': float(agree.mean()),
+        'coverage': float(accepted.mean()),
+        'agreement_accepted': float(agree[accepted].mean()) if accepted.any() else None,
+        # Modo rápido: el estudiante responde si está seguro; si no, responde la junta
+        'fast_mode_agreement': float(np.where(accepted, agree, True).mean()),
+        'soft_score_mae': float(np.abs(student_final - final_mean).mean()),
+        'batch_ms_per_1k': {'board': board_s / len(rows) * 1e6, 'student': student_s / len(rows) * 1e6},
+        'patient_p50_ms': {'board': board_p50, 'fast_mode': fast_p50},
+        'speedup_batch': board_s / student_s if student_s else None,
+        'speedup_patient': board_p50 / fast_p50 if fast_p50 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Destila la junta médica en un modelo estudiante")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset (preparar_dataset.py)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--models-dir', default=MODELOS_DIR)
+    parser.add_argument('--target-agreement', type=float, default=TARGET_AGREEMENT,
+                        help="Coincidencia mínima con la junta por encima del umbral de confianza")
+    parser.add_argument('--C', type=float, default=1.0, help="Regularización de la regresión logística")
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--report', default=None, help="JSON con el reporte en la partición de prueba")
+    args = parser.parse_args()
+
+    data = open_cache(args.dataset, args.cache_dir)
+    train_rows, test_rows = data.split(args.min_count, TEST_SIZE, SEED)
+    registry = ModelRegistry(models_dir=args.models_dir).start()
+    registry.wait()
+    engine = registry.engine()
+    if engine is None or engine.n_models < len(registry.names):
+        raise SystemExit("❌ La destilación necesita la junta completa.")
+    rule = load_rule()
+
+    started = time.perf_counter()
+    estimator, labels, confidence = train_student(engine, data, train_rows, rule, args.C, args.target_agreement,
+                                                  args.chunksize)
+    identity = [engine.version, rule, confidence, time.time()]
+    info = {
+        'confidence': confidence,
+        'target_agreement': args.target_agreement,
+        'models_version': engine.version,
+        'rule': rule,
+        'version': hashlib.blake2b(json.dumps(identity).encode('utf-8'), digest_size=8).hexdigest(),
+    }
+    output = export_estimator(estimator, labels, engine.feature_names, compact_path(STUDENT_FILE, args.models_dir),
+                              student=info)
+    print(f"Estudiante entrenado en {time.perf_counter() - started:.1f} s: {output} "
+          f"(umbral de confianza {confidence:.2f})")
+
+    result = report(engine, load_student(args.models_dir), data, test_rows, rule, args.chunksize)
+    print(f"\nPartición de prueba ({result['rows']} filas):")
+    print(f"  coincidencia con la junta: {result['agreement']:.2%}")
+    print(f"  cobertura del estudiante (confianza ≥ {confidence:.2f}): {result['coverage']:.2%}, "
+          f"coincidencia en esas filas: {result['agreement_accepted'] or 0:.2%}")
+    print(f"  modo rápido (con respaldo de la junta): {result['fast_mode_agreement']:.2%}")
+    print(f"  error absoluto medio de la probabilidad del diagnóstico final: {result['soft_score_mae']:.4f}")
+    batch, patient = result['batch_ms_per_1k'], result['patient_p50_ms']
+    print(f"  lote: junta {batch['board']:.1f} ms / estudiante {batch['student']:.1f} ms por 1k filas "
+          f"({result['speedup_batch']:.1f}x)")
+    print(f"  por paciente (p50): junta {patient['board']:.2f} ms / modo rápido {patient['fast_mode']:.2f} ms "
+          f"({result['speedup_patient']:.1f}x)")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(dict(result, student=info), f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
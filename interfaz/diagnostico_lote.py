@@ -0,0 +1,194 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from registro_modelos import ModelRegistry
+from motor_ensamble import check_columns
+from consenso import board_decision, load_rule, min_votes_for
+from codificador_sintomas import SymptomEncoder
+from vocabulario import load_vocabulary
+from reporte_pdf import ReportArchive, report_data
+from explicacion import translated
+from metricas import METRICS, METRICS_FILE
+
+# ================================
+# DIAGNÓSTICO POR LOTES
+# ================================
+#
+# Uso:
+#   python diagnostico_lote.py ingresos.csv resultados.csv
+#   python diagnostico_lote.py ingresos.parquet resultados.parquet --chunksize 20000
+#   python diagnostico_lote.py ingresos.csv resultados.csv --reports reportes.zip   # o reportes.pdf
+#
+# El archivo de entrada tiene una columna con la identificación del paciente y otra
+# con sus síntomas separados por ';' (en inglés o con las etiquetas en español de la
+# interfaz). En Parquet la columna de síntomas también puede ser una lista.
+#
+# Un paciente sin ningún síntoma reconocido no pasa por la junta: su fila sale sin
+# diagnóstico, con el motivo en la columna 'error', y no tiene reporte PDF.
+
+ID_COLUMN = 'patient_id'
+SYMPTOMS_COLUMN = 'symptoms'
+SEPARATOR = ';'
+CHUNKSIZE = 10_000
+NO_SYMPTOMS = "Ningún síntoma reconocido"
+
+
+def load_encoder(vocabulary):
+    # Acepta los síntomas en inglés y con las etiquetas en español de la interfaz
+    return SymptomEncoder(vocabulary.symptoms, vocabulary.symptom_translation())
+
+
+def read_chunks(path, chunksize=CHUNKSIZE):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+
+def diagnose_matrix(engine, X, diagnosis_translation=None, rule=None):
+    # Un predict_proba por especialista sobre las filas con síntomas y votación vectorizada;
+    # las filas vacías (sin síntomas reconocidos) quedan sin diagnóstico
+    rule = rule or load_rule()
+    X = X.tocsr()
+    valid = X.getnnz(axis=1) > 0
+    n_rows = X.shape[0]
+    labels = np.full((engine.n_models, n_rows), '', dtype=object)
+    scores = np.full((engine.n_models, n_rows), np.nan)
+    final = np.full(n_rows, '', dtype=object)
+    by_consensus = np.zeros(n_rows, dtype=bool)
+    if valid.any():
+        labels[:, valid], scores[:, valid] = engine.predict(X[valid])
+        final[valid], by_consensus[valid] = board_decision(
+            labels[:, valid], scores[:, valid],
+            min_votes_for(engine.n_models, rule['min_votes'], rule['board_size']), rule['threshold'])
+
+    result = {}
+    for k, name in enumerate(engine.names):
+        result[f'diagnostico_{name}'] = labels[k]
+        result[f'confianza_{name}'] = scores[k]
+    result['diagnostico_final'] = final
+    if diagnosis_translation is not None:
+        result['diagnostico_final_es'] = [diagnosis_translation.get(d, d) if d else '' for d in final]
+    result['consenso'] = by_consensus
+    result['error'] = np.where(valid, '', NO_SYMPTOMS).astype(object)
+    return pd.DataFrame(result)
+
+
+class ResultWriter:
+    # Escribe los resultados por bloques, sin acumular el lote completo en memoria
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            header = self._writer is None
+            frame.to_csv(self.path, mode='w' if header else 'a', header=header, index=False)
+            self._writer = True
+
+    def close(self):
+        if self.parquet and self._writer is not None:
+            self._writer.close()
+
+
+def chunk_reports(result, X, engine, encoder, vocabulary, id_column):
+    # Datos de reporte de cada paciente del bloque (solo identificación y síntomas)
+    symptom_translation = vocabulary.symptom_translation()
+    diagnosis_translation = vocabulary.diagnosis_translation()
+    X = X.tocsr()
+    reports = []
+    for i, (record, symptoms) in enumerate(zip(result.to_dict('records'), encoder.decode(X))):
+        if record['error']:
+            continue
+        labels = [record[f'diagnostico_{name}'] for name in engine.names]
+        specialists = [(name, vocabulary.diagnosis_es(label), record[f'confianza_{name}'])
+                       for name, label in zip(engine.names, labels)]
+        explanation = engine.explainer.explain(X.indices[X.indptr[i]:X.indptr[i + 1]], labels)
+        reports.append(report_data(
+            {'id': record[id_column]},
+            [symptom_translation.get(s, s) for s in symptoms],
+            vocabulary.diagnosis_es(record['diagnostico_final']),
+            vocabulary.description_es(record['diagnostico_final']),
+            specialists,
+            consensus=bool(record['consenso']),
+            explanation=translated(explanation, symptom_translation, diagnosis_translation),
+        ))
+    return reports
+
+
+def run_batch(input_path, output_path, engine, id_column=ID_COLUMN, symptoms_column=SYMPTOMS_COLUMN,
+              sep=SEPARATOR, chunksize=CHUNKSIZE, reports_path=None):
+    vocabulary = load_vocabulary()
+    encoder = load_encoder(vocabulary)
+    check_columns(encoder.symptoms, engine.feature_names)
+    diagnosis_translation = vocabulary.diagnosis_translation()
+    rule = load_rule()
+
+    writer = ResultWriter(output_path)
+    archive = ReportArchive(reports_path) if reports_path else None
+    n_rows = 0
+    n_empty = 0
+    unknown = set()
+    start = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunksize):
+            X, chunk_unknown = encoder.encode(chunk[symptoms_column], sep)
+            unknown |= chunk_unknown
+            result = diagnose_matrix(engine, X, diagnosis_translation, rule)
+            result.insert(0, id_column, chunk[id_column].to_numpy())
+            writer.write(result)
+            n_empty += int((result['error'] != '').sum())
+            if archive is not None:
+                archive.add(chunk_reports(result, X, engine, encoder, vocabulary, id_column))
+            n_rows += len(result)
+    finally:
+        writer.close()
+        if archive is not None:
+            archive.close()
+
+    elapsed = time.perf_counter() - start
+    if unknown:
+        print(f"⚠️ Síntomas no reconocidos (ignorados): {sorted(unknown)}")
+    if n_empty:
+        print(f"⚠️ {n_empty} pacientes sin síntomas reconocidos quedaron sin diagnóstico (columna 'error')")
+    print(f"✅ {n_rows - n_empty} pacientes diagnosticados en {elapsed:.1f} s. Resultados en: {output_path}")
+    if archive is not None:
+        print(f"📄 {archive.count} reportes PDF en: {reports_path}")
+    return n_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Diagnóstico de la junta médica para un archivo de ingresos")
+    parser.add_argument('input', help="Archivo CSV o Parquet con los ingresos")
+    parser.add_argument('output', help="Archivo CSV o Parquet de salida")
+    parser.add_argument('--id-column', default=ID_COLUMN)
+    parser.add_argument('--symptoms-column', default=SYMPTOMS_COLUMN)
+    parser.add_argument('--sep', default=SEPARATOR, help="Separador de síntomas en archivos CSV")
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--reports', default=None, help="Reportes PDF: .zip (uno por paciente) o .pdf (varias páginas)")
+    parser.add_argument('--metrics', default=METRICS_FILE, help="Archivo de métricas (formato Prometheus) al terminar")
+    args = parser.parse_args()
+
+    # Artefactos compactos si fueron exportados (sin importar PyCaret); si no, los .pkl
+    registry = ModelRegistry().start()
+    registry.wait()
+    engine = registry.engine()
+    if engine is None or len(engine.names) < len(registry.names):
+        raise SystemExit(f"❌ No fue posible cargar todos los modelos de la junta: {registry.status()}")
+    run_batch(args.input, args.output, engine, args.id_column, args.symptoms_column, args.sep, args.chunksize,
+              args.reports)
+    if args.metrics:
+        METRICS.write(args.metrics)
+        print(f"📈 Métricas por etapa en: {args.metrics}")
@@ -0,0 +1,86 @@
+import json
+import os
+import numpy as np
+
+from rutas import MANIFEST_FILE, MODELOS_DIR
+
+# ================================
+# DIAGNÓSTICO DIFERENCIAL (TOP-K)
+# ================================
+#
+# La junta solo conserva la etiqueta y la confianza de cada especialista. Para un
+# diagnóstico diferencial se combinan las probabilidades completas de los modelos
+# (tensor modelos x pacientes x clases de EnsembleEngine.predict_proba) con votación
+# suave y se eligen los k diagnósticos más probables con argpartition, sin ordenar
+# las ~770 clases.
+#
+# Votaciones:
+#   - mean: promedio de las probabilidades;
+#   - weighted: promedio ponderado por especialista (p. ej. por su F1 de validación
+#     cruzada, ver validation_weights);
+#   - geometric: media geométrica renormalizada; premia los diagnósticos en los que
+#     todos los especialistas coinciden y castiga a los que alguno descarta.
+
+VOTING_METHODS = ('mean', 'weighted', 'geometric')
+TOP_K = 5
+GEOMETRIC_FLOOR = 1e-6     # evita log(0) cuando un modelo no conoce la clase
+
+
+def model_weights(names, weights=None):
+    # Pesos por especialista normalizados a suma 1; acepta dict nombre -> peso o secuencia
+    if weights is None:
+        w = np.ones(len(names))
+    elif isinstance(weights, dict):
+        w = np.array([float(weights.get(name, 0.0)) for name in names])
+    else:
+        w = np.asarray(weights, dtype=np.float64)
+    if w.shape != (len(names),) or (w < 0).any() or w.sum() <= 0:
+        raise ValueError(f"Pesos inválidos para los especialistas {list(names)}: {weights}")
+    return w / w.sum()
+
+
+def validation_weights(names, models_dir=MODELOS_DIR, metric='F1'):
+    # Pesos {especialista: métrica de validación cruzada} del manifiesto que escribe
+    # entrenar_modelos.py. None si no hay manifiesto o si no cubre a todos los especialistas.
+    path = os.path.join(models_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    scores = {model['name']: model.get('cv', {}).get(metric) for model in manifest.get('models', [])}
+    weights = {name: scores.get(name) for name in names}
+    if any(not isinstance(w, (int, float)) or w <= 0 for w in weights.values()):
+        return None
+    return weights
+
+
+def aggregate(tensor, method='mean', weights=None):
+    # (modelos x filas x clases) -> (filas x clases) con la votación suave elegida
+    if method not in VOTING_METHODS:
+        raise ValueError(f"Votación no soportada: {method}. Opciones: {VOTING_METHODS}")
+    w = np.full(tensor.shape[0], 1.0 / tensor.shape[0]) if weights is None else np.asarray(weights)
+    if method == 'geometric':
+        log_p = np.log(np.maximum(tensor, GEOMETRIC_FLOOR))
+        combined = np.exp(np.tensordot(w, log_p, axes=1))
+        return combined / combined.sum(axis=1, keepdims=True)
+    return np.tensordot(w, tensor, axes=1)
+
+
+def top_k(scores, k=TOP_K):
+    # Índices y puntajes de las k clases más probables por fila, de mayor a menor
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def differential_from_tensor(tensor, classes, names, k=TOP_K, method='mean', weights=None):
+    # Devuelve (etiquetas, puntajes) de forma (filas x k)
+    w = model_weights(names, weights if method == 'weighted' else None)
+    index, scores = top_k(aggregate(tensor, method, w), k)
+    return np.asarray(classes, dtype=object)[index], scores.astype(np.float64)
+
+
+def differential(engine, X, k=TOP_K, method='mean', weights=None):
+    return differential_from_tensor(engine.predict_proba(X), engine.classes, engine.names, k, method, weights)
@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+from rutas import DATASET_FILE, DATASETS_DIR, MANIFEST_FILE, MODELOS_DIR
+from motor_ensamble import MODEL_FILES, MODELS_NAMES, split_pipeline
+from codificador_sintomas import TARGET_COLUMN
+from preparar_dataset import CACHE_DIR, MIN_COUNT, SEED, TEST_SIZE, dataset_fingerprint, open_cache
+from artefactos import compact_path, export_model, has_compact
+
+# ================================
+# ENTRENAMIENTO DE LA JUNTA MÉDICA
+# ================================
+#
+# Uso:
+#   python entrenar_modelos.py                                   # los cinco especialistas
+#   python entrenar_modelos.py --include lr knn nb dt qda lda et xgboost --select 5 --workers 4
+#   python entrenar_modelos.py --no-tune --models-dir /tmp/modelos
+#
+# Reemplaza el ciclo setup / compare_models / tune_model del notebook
+# entrenamiento_modelos_diagnostico.ipynb:
+#   1. La partición (diagnósticos con al menos 100 registros, 80/20 estratificado,
+#      random_state=42) sale de la caché de preparar_dataset.py y se guarda una vez en
+#      datasets/particion/ como .npy uint8; solo se rehace si cambia el CSV o los parámetros.
+#   2. Cada proceso del pool lee la partición y ejecuta setup de PyCaret una única vez.
+#      setup copia los datos (y sus transformaciones), así que cada proceso tiene su
+#      propia copia: la memoria crece con --workers (ver MEMORIA más abajo).
+#   3. Los candidatos se comparan por validación cruzada en paralelo, los mejores se
+#      ajustan con tune_model (también en paralelo) y se evalúan en la partición de prueba.
+#      Cada proceso guarda sus modelos en disco y devuelve solo la ruta y las métricas.
+#   4. Los ganadores se escriben en modelos/ con los nombres que usa la interfaz, junto
+#      con manifiesto_entrenamiento.json (métricas, hiperparámetros y partición).
+
+# MEMORIA: setup de PyCaret copia y transforma la partición en cada proceso. Con 60.000
+# filas x 377 síntomas (23 MB de X_train + X_test en uint8) cada proceso sumó ~150 MB,
+# unas 6,5 veces la partición, más lo que ocupe el modelo que entrena (KNN guarda el
+# entrenamiento completo). La memoria total crece con --workers; con poca RAM se reduce.
+
+SPLIT_DIR = os.path.join(DATASETS_DIR, 'particion')
+
+FOLD = 5
+N_ITER = 10
+OPTIMIZE = 'F1'
+
+# Identificador de PyCaret -> archivo y nombre del especialista en la interfaz
+SPECIALISTS = dict(zip(['lr', 'nb', 'xgboost', 'knn', 'dt'], zip(MODEL_FILES, MODELS_NAMES)))
+
+
+def model_file(model_id):
+    return SPECIALISTS[model_id][0] if model_id in SPECIALISTS else f'modelo_{model_id}'
+
+
+# ================================
+# PARTICIÓN CACHEADA
+# ================================
+
+def split_params(dataset, min_count, test_size, seed):
+    return {'dataset': dataset_fingerprint(dataset), 'min_count': min_count, 'test_size': test_size, 'seed': seed}
+
+
+def prepare_split(dataset=DATASET_FILE, split_dir=SPLIT_DIR, min_count=MIN_COUNT, test_size=TEST_SIZE,
+                  seed=SEED, force=False, cache_dir=CACHE_DIR):
+    # Devuelve el meta.json de la partición; las matrices quedan en split_dir. El filtro
+    # de diagnósticos y las filas de cada lado vienen de la caché de preparar_dataset.py.
+    params = split_params(dataset, min_count, test_size, seed)
+    meta_file = os.path.join(split_dir, 'meta.json')
+    if not force and os.path.exists(meta_file):
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('params') == params:
+            return meta
+
+    data = open_cache(dataset, cache_dir)
+    train_rows, test_rows = data.split(min_count, test_size, seed)
+    # Códigos de los diagnósticos que pasan el filtro, en su mismo orden alfabético
+    valid = np.flatnonzero(data.counts >= min_count)
+    recode = np.full(len(data.classes), -1, dtype=np.int32)
+    recode[valid] = np.arange(len(valid))
+
+    os.makedirs(split_dir, exist_ok=True)
+    for name, rows in (('train', train_rows), ('test', test_rows)):
+        np.save(os.path.join(split_dir, f'X_{name}.npy'), data.dense(rows))
+        np.save(os.path.join(split_dir, f'y_{name}.npy'), recode[data.codes[rows]])
+        np.save(os.path.join(split_dir, f'rows_{name}.npy'), rows)
+    meta = {
+        'params': params,
+        'symptoms': list(data.symptoms),
+        'classes': [data.classes[c] for c in valid],
+        'n_train': int(len(train_rows)),
+        'n_test': int(len(test_rows)),
+    }
+    tmp = f'{meta_file}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, meta_file)
+    return meta
+
+
+def load_split(split_dir, meta, name):
+    # DataFrame sobre la matriz mapeada en memoria (uint8) y las etiquetas. El DataFrame
+    # no copia, pero setup de PyCaret sí: ver MEMORIA.
+    X = np.load(os.path.join(split_dir, f'X_{name}.npy'), mmap_mode='r')
+    y = np.load(os.path.join(split_dir, f'y_{name}.npy'))
+    rows = np.load(os.path.join(split_dir, f'rows_{name}.npy'))
+    frame = pd.DataFrame(X, columns=meta['symptoms'], index=rows, copy=False)
+    labels = np.asarray(meta['classes'], dtype=object)[y]
+    return frame, labels
+
+
+# ================================
+# TRABAJO DE CADA PROCESO
+# ================================
+
+_worker = {}
+
+
+def _init_worker(split_dir, meta, fold, seed):
+    # setup de PyCaret una vez por proceso (en el notebook se repetía en cada ciclo);
+    # cada proceso queda con su propia copia de la partición
+    from pycaret.classification import setup
+
+    X_train, y_train = load_split(split_dir, meta, 'train')
+    X_test, y_test = load_split(split_dir, meta, 'test')
+    setup(data=X_train.assign(**{TARGET_COLUMN: y_train}), test_data=X_test.assign(**{TARGET_COLUMN: y_test}),
+          target=TARGET_COLUMN, session_id=seed, fold=fold, n_jobs=1, verbose=False, html=False)
+    _worker.update(X_test=X_test, y_test=y_test)
+
+
+def _cv_metrics():
+    from pycaret.classification import pull
+    mean = pull().loc['Mean']
+    return {k: round(float(v), 4) for k, v in mean.items()}
+
+
+def compare_candidate(model_id, candidates_dir):
+    # El modelo se guarda en disco: al proceso principal solo vuelven la ruta y las métricas
+    from pycaret.classification import create_model, save_model
+
+    started = time.perf_counter()
+    model = create_model(model_id, verbose=False)
+    cv = _cv_metrics()
+    path = os.path.join(candidates_dir, model_file(model_id))
+    save_model(model, path, verbose=False)
+    return {'id': model_id, 'path': path, 'cv': cv, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+def load_candidate(path):
+    # Estimador ajustado de un candidato guardado por compare_candidate
+    from pycaret.classification import load_model
+    return load_model(path, verbose=False).steps[-1][1]
+
+
+def fit_candidate(model_id, compared, tune, n_iter, optimize, staging_dir):
+    # Ajusta (y opcionalmente busca hiperparámetros), guarda el pipeline en staging_dir y
+    # evalúa en la partición de prueba. compared: resultado de compare_candidate o None.
+    from pycaret.classification import create_model, save_model, tune_model
+
+    started = time.perf_counter()
+    if compared is None:
+        model = create_model(model_id, verbose=False)
+        cv = _cv_metrics()
+    else:
+        model, cv = load_candidate(compared['path']), compared['cv']
+    if tune:
+        model = tune_model(model, optimize=optimize, n_iter=n_iter, choose_better=True, verbose=False)
+        tuned_cv = _cv_metrics()
+        # Con choose_better se conserva el modelo original si la búsqueda no lo mejora
+        if tuned_cv[optimize] >= cv[optimize]:
+            cv = tuned_cv
+    pipeline, _ = save_model(model, os.path.join(staging_dir, model_file(model_id)), verbose=False)
+
+    _, estimator, labels = split_pipeline(pipeline)
+    probas = pipeline.predict_proba(_worker['X_test'])
+    predicted = labels[probas.argmax(axis=1)]
+    y_test = _worker['y_test']
+    holdout = {
+        'Accuracy': round(float(accuracy_score(y_test, predicted)), 4),
+        'F1': round(float(f1_score(y_test, predicted, average='weighted')), 4),
+        'F1_macro': round(float(f1_score(y_test, predicted, average='macro')), 4),
+    }
+    params = {k: v if isinstance(v, (bool, int, float, str, type(None))) else repr(v)
+              for k, v in estimator.get_params().items()}
+    return {'id': model_id, 'estimator': type(estimator).__name__, 'cv': cv, 'holdout': holdout,
+            'params': params, 'tuned': tune, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+# ================================
+# ORQUESTACIÓN
+# ================================
+
+def run_pool(workers, split_dir, meta, fold, seed, tasks):
+    # tasks: [(función, args)]; devuelve los resultados a medida que terminan
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(split_dir, meta, fold, seed)) as executor:
+        futures = [executor.submit(fn, *args) for fn, args in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def publish(results, staging_dir, models_dir):
+    # Mueve los pipelines ganadores a modelos/ y reexporta los artefactos compactos
+    # existentes para que no sigan sirviendo el modelo anterior
+    for result in results:
+        file = model_file(result['id'])
+        os.replace(os.path.join(staging_dir, f'{file}.pkl'), os.path.join(models_dir, f'{file}.pkl'))
+        if has_compact(file, models_dir):
+            from pycaret.classification import load_model
+            try:
+                export_model(load_model(os.path.join(models_dir, file), verbose=False), compact_path(file, models_dir))
+                result['compact'] = True
+            except ValueError as e:
+                shutil.rmtree(compact_path(file, models_dir))
+                print(f"⚠️ {file}: se eliminó el artefacto compacto anterior ({e})")
+                result['compact'] = False
+
+
+def write_manifest(path, manifest):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def train(include, select, tune=True, workers=1, models_dir=MODELOS_DIR, dataset=DATASET_FILE,
+          split_dir=SPLIT_DIR, fold=FOLD, n_iter=N_ITER, optimize=OPTIMIZE, seed=SEED, min_count=MIN_COUNT,
+          force_split=False, cache_dir=CACHE_DIR):
+    started = time.perf_counter()
+    meta = prepare_split(dataset, split_dir, min_count, TEST_SIZE, seed, force=force_split, cache_dir=cache_dir)
+    print(f"Partición: {meta['n_train']} entrenamiento / {meta['n_test']} prueba, "
+          f"{len(meta['classes'])} diagnósticos, {len(meta['symptoms'])} síntomas")
+
+    os.makedirs(models_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix='.entrenamiento-', dir=models_dir)
+    try:
+        # 1. Comparación por validación cruzada (solo si hay más candidatos que cupos)
+        compared = {}
+        if len(include) > select:
+            candidates_dir = os.path.join(staging_dir, 'candidatos')
+            os.makedirs(candidates_dir)
+            tasks = [(compare_candidate, (m, candidates_dir)) for m in include]
+            for result in run_pool(workers, split_dir, meta, fold, seed, tasks):
+                compared[result['id']] = result
+                print(f"  {result['id']:<10} {optimize} CV = {result['cv'][optimize]:.4f}  ({result['seconds']} s)")
+            selected = sorted(compared, key=lambda m: -compared[m]['cv'][optimize])[:select]
+        else:
+            selected = list(include)
+        print(f"Seleccionados: {', '.join(selected)}")
+
+        # 2. Ajuste de hiperparámetros y evaluación de los seleccionados
+        tasks = [(fit_candidate, (m, compared.get(m), tune, n_iter, optimize, staging_dir)) for m in selected]
+        results = {}
+        for result in run_pool(workers, split_dir, meta, fold, seed, tasks):
+            results[result['id']] = result
+            print(f"  {result['id']:<10} {optimize} CV = {result['cv'][optimize]:.4f}  "
+                  f"prueba = {result['holdout']['F1']:.4f}  ({result['seconds']} s)")
+        ordered = [results[m] for m in selected]
+        publish(ordered, staging_dir, models_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    manifest = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'split': meta['params'] | {'n_train': meta['n_train'], 'n_test': meta['n_test'],
+                                   'n_classes': len(meta['classes'])},
+        'setup': {'fold': fold, 'optimize': optimize, 'n_iter': n_iter if tune else 0, 'session_id': seed},
+        'candidates': {m: {'cv': r['cv'], 'seconds': r['seconds']} for m, r in compared.items()},
+        'models': [{'file': model_file(r['id']), 'name': SPECIALISTS.get(r['id'], (None, r['id']))[1], **r}
+                   for r in ordered],
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    write_manifest(os.path.join(models_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena los modelos de la junta médica con PyCaret")
+    parser.add_argument('--include', nargs='+', default=list(SPECIALISTS),
+                        help="Identificadores de PyCaret de los candidatos")
+    parser.add_argument('--select', type=int, default=len(SPECIALISTS), help="Modelos que se guardan")
+    parser.add_argument('--no-tune', dest='tune', action='store_false', help="Omitir tune_model")
+    parser.add_argument('--n-iter', type=int, default=N_ITER, help="Iteraciones de la búsqueda de tune_model")
+    parser.add_argument('--fold', type=int, default=FOLD)
+    parser.add_argument('--optimize', default=OPTIMIZE, help="Métrica de comparación y ajuste")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Procesos del pool")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset (preparar_dataset.py)")
+    parser.add_argument('--split-dir', default=SPLIT_DIR, help="Carpeta de la partición cacheada")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--force-split', action='store_true', help="Rehacer la partición aunque esté cacheada")
+    parser.add_argument('--models-dir', default=MODELOS_DIR)
+    args = parser.parse_args()
+
+    manifest = train(args.include, args.select, args.tune, args.workers, args.models_dir, args.dataset,
+                     args.split_dir, args.fold, args.n_iter, args.optimize, SEED, args.min_count, args.force_split,
+                     args.cache_dir)
+    print(f"\n✅ {len(manifest['models'])} modelos guardados en {args.models_dir} en {manifest['seconds']} s "
+          f"(manifiesto: {MANIFEST_FILE}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from rutas import DATASET_FILE, MODELOS_DIR
+from registro_modelos import ModelRegistry
+from consenso import board_decision, load_rule, min_votes_for
+from preparar_dataset import CACHE_DIR, MIN_COUNT, SEED, TEST_SIZE, open_cache
+
+# ================================
+# EVALUACIÓN FUERA DE LÍNEA DE LA JUNTA MÉDICA
+# ================================
+#
+# Uso:
+#   python evaluar_junta.py
+#   python evaluar_junta.py --chunksize 20000 --per-class evaluacion_clases.csv --report evaluacion.json
+#
+# Evalúa los cinco especialistas y la regla vigente de la junta (por defecto 3 de 5
+# con confianza > 60%, consenso.py) sobre la partición de prueba de preparar_dataset.py. Cada bloque de
+# filas se predice en lote con EnsembleEngine y la regla se aplica vectorizada; solo
+# se acumulan conteos por diagnóstico, así que la memoria no crece con el tamaño de
+# la partición.
+
+CHUNKSIZE = 10_000
+BOARD = 'Junta'
+
+
+class Scorer:
+    # Conteos de aciertos y errores por diagnóstico de un predictor
+    def __init__(self, n_classes):
+        self.tp = np.zeros(n_classes, dtype=np.int64)
+        self.fp = np.zeros(n_classes, dtype=np.int64)
+        self.fn = np.zeros(n_classes, dtype=np.int64)
+
+    def update(self, true, predicted):
+        n = len(self.tp)
+        hit = true == predicted
+        self.tp += np.bincount(true[hit], minlength=n)
+        self.fp += np.bincount(predicted[~hit], minlength=n)
+        self.fn += np.bincount(true[~hit], minlength=n)
+
+    @property
+    def support(self):
+        return self.tp + self.fn
+
+    @property
+    def seen(self):
+        # Diagnósticos reales o predichos: las clases que promedia f1_score(average='macro')
+        return (self.tp + self.fp + self.fn) > 0
+
+    def per_class(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.nan_to_num(self.tp / (self.tp + self.fp))
+            recall = np.nan_to_num(self.tp / self.support)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        return precision, recall, f1
+
+    def summary(self):
+        _, _, f1 = self.per_class()
+        support = self.support
+        seen = self.seen
+        n = support.sum()
+        return {
+            'accuracy': float(self.tp.sum() / n) if n else 0.0,
+            'f1_macro': float(f1[seen].mean()) if seen.any() else 0.0,
+            'f1_weighted': float((f1 * support).sum() / n) if n else 0.0,
+        }
+
+
+def evaluate(engine, data, rows, chunksize=CHUNKSIZE, min_votes=None, threshold=None):
+    rule = load_rule()
+    min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size']) if min_votes is None else min_votes
+    threshold = rule['threshold'] if threshold is None else threshold
+    # Vocabulario común: diagnósticos del dataset más los que conocen los modelos
+    vocabulary = pd.Index(sorted(set(data.classes) | set(engine.classes)))
+    true_index = vocabulary.get_indexer(data.classes)
+    column = {s: i for i, s in enumerate(data.symptoms)}
+    columns = [column[f] for f in engine.feature_names]
+
+    scorers = {name: Scorer(len(vocabulary)) for name in [*engine.names, BOARD]}
+    by_rule = {True: Scorer(len(vocabulary)), False: Scorer(len(vocabulary))}
+    timings = {'predict_s': 0.0, 'board_s': 0.0}
+
+    for start in range(0, len(rows), chunksize):
+        block = rows[start:start + chunksize]
+        X = data.matrix(block)[:, columns].tocsr()
+        true = true_index[np.asarray(data.codes[block])]
+
+        started = time.perf_counter()
+        labels, scores = engine.labels_scores(engine.predict_proba_models(X))
+        timings['predict_s'] += time.perf_counter() - started
+        started = time.perf_counter()
+        final, consensus = board_decision(labels, scores, min_votes, threshold)
+        timings['board_s'] += time.perf_counter() - started
+
+        for k, name in enumerate(engine.names):
+            scorers[name].update(true, vocabulary.get_indexer(labels[k]))
+        final = vocabulary.get_indexer(final)
+        scorers[BOARD].update(true, final)
+        for flag in (True, False):
+            mask = consensus == flag
+            by_rule[flag].update(true[mask], final[mask])
+
+    n_rows = len(rows)
+    n_consensus = int(by_rule[True].support.sum())
+    summary = {
+        'rows': n_rows,
+        'models': list(engine.names),
+        'min_votes': min_votes,
+        'threshold': threshold,
+        'metrics': {name: scorer.summary() for name, scorer in scorers.items()},
+        'consensus_rate': n_consensus / n_rows if n_rows else 0.0,
+        # None si ninguna fila se decidió por esa vía
+        'accuracy_consensus': by_rule[True].summary()['accuracy'] if n_consensus else None,
+        'accuracy_fallback': by_rule[False].summary()['accuracy'] if n_consensus < n_rows else None,
+        'ms_per_1k_rows': {k.replace('_s', ''): v / n_rows * 1e6 if n_rows else 0.0 for k, v in timings.items()},
+    }
+
+    # Tabla por diagnóstico: los que entran en algún F1 macro (reales o predichos en la partición)
+    present = np.logical_or.reduce([scorer.seen for scorer in scorers.values()])
+    table = {'diagnostico': vocabulary[present], 'soporte': scorers[BOARD].support[present]}
+    precision, recall, f1 = scorers[BOARD].per_class()
+    table.update({'precision_junta': precision[present], 'recall_junta': recall[present], 'f1_junta': f1[present]})
+    for name in engine.names:
+        table[f'f1_{name}'] = scorers[name].per_class()[2][present]
+    return summary, pd.DataFrame(table)
+
+
+def print_summary(summary):
+    print(f"{'Predictor':<14}{'accuracy':>10}{'F1 macro':>10}{'F1 pond.':>10}")
+    for name, metrics in summary['metrics'].items():
+        print(f"{name:<14}{metrics['accuracy']:>10.4f}{metrics['f1_macro']:>10.4f}{metrics['f1_weighted']:>10.4f}")
+
+    def accuracy(value):
+        return '-' if value is None else f"{value:.4f}"
+
+    print(f"\nConsenso ({summary['min_votes']} votos, confianza > {summary['threshold']:.0%}): "
+          f"{summary['consensus_rate']:.2%} de las filas, accuracy {accuracy(summary['accuracy_consensus'])}; "
+          f"mayor confianza: accuracy {accuracy(summary['accuracy_fallback'])}")
+    latency = summary['ms_per_1k_rows']
+    print(f"Latencia por 1k filas: modelos {latency['predict']:.1f} ms, regla de la junta {latency['board']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evalúa los especialistas y la regla de la junta en la partición de prueba")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset (preparar_dataset.py)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--models-dir', default=MODELOS_DIR)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--limit', type=int, default=None, help="Evaluar solo las primeras N filas de prueba")
+    parser.add_argument('--per-class', default=None, help="CSV con las métricas por diagnóstico")
+    parser.add_argument('--report', default=None, help="JSON con el resumen")
+    args = parser.parse_args()
+
+    data = open_cache(args.dataset, args.cache_dir)
+    _, test_rows = data.split(args.min_count, TEST_SIZE, SEED)
+    test_rows = test_rows[:args.limit]
+
+    registry = ModelRegistry(models_dir=args.models_dir).start()
+    registry.wait()
+    engine = registry.engine()
+    if engine is None:
+        raise SystemExit("❌ No fue posible cargar los modelos de la junta médica.")
+    if len(engine.names) < len(registry.names):
+        print(f"⚠️ Junta parcial: {', '.join(engine.names)}")
+
+    print(f"Evaluando {len(test_rows)} filas de prueba en bloques de {args.chunksize}...")
+    summary, per_class = evaluate(engine, data, test_rows, args.chunksize)
+    print_summary(summary)
+    if args.per_class:
+        per_class.to_csv(args.per_class, index=False)
+        print(f"Métricas por diagnóstico en: {args.per_class}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"Resumen en: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import numpy as np
+
+from metricas import timed
+
+# ================================
+# EXPLICACIÓN DEL VOTO DE CADA ESPECIALISTA
+# ================================
+#
+# Para cada especialista devuelve los síntomas del paciente que más empujaron su voto
+# (la clase que predijo), sin volver a llamar a los modelos:
+#   Regresión  -> tabla de coeficientes (síntomas x clases). Con softmax se centran por
+#                 síntoma entre clases: aporte al log-odds contra la clase promedio.
+#   Gaussiano  -> tabla de log-odds por clase, log(P(síntoma | clase) / P(síntoma | resto)),
+#                 con las medias theta del modelo (frecuencia del síntoma en la clase) y
+#                 sus priors. La verosimilitud gaussiana exacta no sirve para leer pesos:
+#                 var_smoothing deja varianzas de ~1e-10 y aportes de ~1e9.
+#   Árbol      -> ruta de decisión del paciente. Cada síntoma presente evaluado en la ruta
+#                 pesa lo que cae la probabilidad de la clase si ese síntoma faltara
+#                 (se sigue la otra rama desde ese nodo).
+# Las tablas se arman una vez por motor (EnsembleEngine.explainer) y cada explicación
+# solo indexa filas por los IDs de los síntomas activos: unos microsegundos por
+# especialista. KNN y XGBoost no tienen explicación (None).
+
+TOP = 5
+NB_MIN_FREQUENCY = 1e-3     # frecuencias 0 o 1 se recortan antes del logaritmo
+
+METHODS = {
+    'coefficients': "coeficientes",
+    'log_odds': "log-odds por clase",
+    'path': "ruta de decisión",
+}
+
+
+def model_state(estimator):
+    # (tipo, meta, arreglos) de un modelo compacto o de un estimador de sklearn
+    if hasattr(estimator, 'meta'):
+        meta = estimator.meta
+        return meta['estimator'], meta, {name: getattr(estimator, name) for name in meta['arrays']}
+    kind = type(estimator).__name__
+    if kind not in EXPLAINERS:
+        return kind, None, None
+    from artefactos import estimator_state     # solo con los pipelines de PyCaret
+    meta, arrays, _ = estimator_state(estimator)
+    return kind, meta, arrays
+
+
+def _top(symptom_ids, weights, top):
+    order = np.argsort(-weights, kind='stable')[:top]
+    return [(int(symptom_ids[i]), float(weights[i])) for i in order if weights[i] > 0]
+
+
+class TableExplainer:
+    # Aporte precalculado de cada síntoma presente a cada clase: tabla (síntomas x clases)
+    def __init__(self, table, method):
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+        self.method = method
+
+    @classmethod
+    def logistic(cls, meta, arrays):
+        coef = np.asarray(arrays['coef'], dtype=np.float64)
+        if coef.shape[0] == 1:
+            coef = np.vstack([-coef[0], coef[0]])       # binaria: la clase 0 es el negativo
+        elif not meta['ovr']:
+            coef = coef - coef.mean(axis=0)             # softmax: invariante a un desplazamiento por síntoma
+        return cls(coef.T, 'coefficients')
+
+    @classmethod
+    def naive_bayes(cls, meta, arrays):
+        theta = np.clip(np.asarray(arrays['theta'], dtype=np.float64), NB_MIN_FREQUENCY, 1 - NB_MIN_FREQUENCY)
+        prior = np.exp(np.asarray(arrays['log_prior'], dtype=np.float64))[:, None]
+        # Frecuencia del síntoma en el resto de clases, ponderada por sus priors
+        rest = ((prior * theta).sum(axis=0) - prior * theta) / (prior.sum() - prior)
+        return cls(np.log(theta / rest).T, 'log_odds')
+
+    def explain(self, symptom_ids, label_index, top=TOP):
+        return _top(symptom_ids, self.table[symptom_ids, label_index], top)
+
+
+class PathExplainer:
+    # Ruta de decisión del árbol; los arreglos se pasan a listas para recorrerlos en Python
+    method = 'path'
+
+    def __init__(self, meta, arrays):
+        self.feature = np.asarray(arrays['feature']).tolist()
+        self.threshold = np.asarray(arrays['threshold']).tolist()
+        self.left = np.asarray(arrays['left']).tolist()
+        self.right = np.asarray(arrays['right']).tolist()
+        self.leaf_of_node = np.asarray(arrays['leaf_of_node']).tolist()
+        self.leaf_indptr = np.asarray(arrays['leaf_indptr']).tolist()
+        self.leaf_indices = np.asarray(arrays['leaf_indices']).tolist()
+        self.leaf_data = np.asarray(arrays['leaf_data']).tolist()
+
+    def _walk(self, node, active, nodes=None):
+        # Baja desde `node` hasta una hoja con los síntomas `active` (0/1); anota la ruta en `nodes`
+        left, right, feature, threshold = self.left, self.right, self.feature, self.threshold
+        while left[node] != -1:
+            if nodes is not None:
+                nodes.append(node)
+            x = 1.0 if feature[node] in active else 0.0
+            node = left[node] if x <= threshold[node] else right[node]
+        return node
+
+    def _proba(self, node, label_index):
+        leaf = self.leaf_of_node[node]
+        for i in range(self.leaf_indptr[leaf], self.leaf_indptr[leaf + 1]):
+            if self.leaf_indices[i] == label_index:
+                return self.leaf_data[i]
+        return 0.0
+
+    def explain(self, symptom_ids, label_index, top=TOP):
+        active = set(symptom_ids.tolist())
+        nodes = []
+        proba = self._proba(self._walk(0, active, nodes), label_index)
+        ids, weights = [], []
+        for node in nodes:
+            symptom = self.feature[node]
+            if symptom not in active or symptom in ids:
+                continue
+            # Sin el síntoma: se vuelve a bajar desde este nodo con el resto de síntomas igual
+            ids.append(symptom)
+            weights.append(proba - self._proba(self._walk(node, active - {symptom}), label_index))
+        return _top(np.asarray(ids, dtype=np.int64), np.asarray(weights, dtype=np.float64), top)
+
+
+EXPLAINERS = {
+    'LogisticRegression': TableExplainer.logistic,
+    'GaussianNB': TableExplainer.naive_bayes,
+    'DecisionTreeClassifier': PathExplainer,
+}
+
+
+class BoardExplainer:
+    """Síntomas que más pesaron en el voto de cada especialista de un EnsembleEngine."""
+
+    def __init__(self, engine):
+        self.names = list(engine.names)
+        self.feature_names = list(engine.feature_names)
+        self.class_index = [{str(c): i for i, c in enumerate(classes)} for classes in engine.model_classes]
+        self.explainers = []
+        for estimator in engine.estimators:
+            kind, meta, arrays = model_state(estimator)
+            build = EXPLAINERS.get(kind)
+            self.explainers.append(build(meta, arrays) if build is not None else None)
+
+    @timed('explanation')
+    def explain(self, symptom_ids, labels, top=TOP):
+        # symptom_ids: columnas activas del paciente (SymptomEncoder.indices); labels: voto
+        # de cada especialista (board['labels']). Devuelve una entrada por especialista:
+        # {'name', 'label', 'method', 'symptoms': [[síntoma, peso], ...]} o None.
+        symptom_ids = np.unique(np.asarray(symptom_ids, dtype=np.int64))
+        explanation = []
+        for k, (name, label) in enumerate(zip(self.names, labels)):
+            explainer = self.explainers[k]
+            label_index = self.class_index[k].get(str(label))
+            if explainer is None or label_index is None or not len(symptom_ids):
+                explanation.append(None)
+                continue
+            explanation.append({
+                'name': name,
+                'label': str(label),
+                'method': explainer.method,
+                'symptoms': [[self.feature_names[j], w] for j, w in explainer.explain(symptom_ids, label_index, top)],
+            })
+        return explanation
+
+
+def translated(explanation, symptom_translation, diagnosis_translation):
+    # [(especialista, diagnóstico, [síntomas])] en español para reporte_pdf.report_data
+    return [(entry['name'], diagnosis_translation.get(entry['label'], entry['label']),
+             [symptom_translation.get(s, s) for s, _ in entry['symptoms']])
+            for entry in explanation if entry is not None]
@@ -0,0 +1,244 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+from rutas import DATASET_FILE, MODELOS_DIR
+from preparar_dataset import CACHE_DIR, MIN_COUNT, SEED, TEST_SIZE, open_cache
+
+# ================================
+# ÍNDICE INVERTIDO SÍNTOMA -> DIAGNÓSTICOS
+# ================================
+#
+# Uso:
+#   python indice_sintomas.py                     # escribe modelos/indice_sintomas.npz
+#   python indice_sintomas.py --min-support 20
+#
+# Sugerencias mientras se eligen los síntomas, sin ejecutar ningún modelo. Sobre las
+# filas de entrenamiento de preparar_dataset.py se precalculan, para cada síntoma y
+# para cada par de síntomas con al menos min_support pacientes, los diagnósticos más
+# frecuentes y los síntomas que más los acompañan. Con 1 o 2 síntomas la consulta es
+# una lectura de tabla; con 3 o más (o un par poco frecuente) se intersectan las
+# listas de pacientes de cada síntoma, que para entonces son cortas, y se cuentan
+# directamente. Todo queda en un único .npz sin pickle que la interfaz carga una vez.
+
+INDEX_FILE = os.path.join(MODELOS_DIR, 'indice_sintomas.npz')
+FORMAT_VERSION = 1
+
+TOP = 5             # diagnósticos y síntomas sugeridos por consulta
+MIN_SUPPORT = 10    # pacientes mínimos para precalcular un par de síntomas
+# Las tablas guardan 2 síntomas extra: al consultar se descartan los ya elegidos
+STORED_NEXT = TOP + 2
+
+
+def csr_top_k(M, k):
+    # Las k columnas de mayor valor de cada fila de una CSR -> (índices, valores)
+    # de forma (filas x k), rellenas con -1 / 0 cuando la fila tiene menos entradas
+    M = sparse.csr_matrix(M)
+    M.eliminate_zeros()
+    rows = np.repeat(np.arange(M.shape[0]), np.diff(M.indptr))
+    order = np.lexsort((M.indices, -M.data, rows))
+    rank = np.arange(len(order)) - M.indptr[rows[order]]
+    keep = order[rank < k]
+    index = np.full((M.shape[0], k), -1, dtype=np.int32)
+    value = np.zeros((M.shape[0], k), dtype=np.int32)
+    index[rows[keep], rank[rank < k]] = M.indices[keep]
+    value[rows[keep], rank[rank < k]] = M.data[keep]
+    return index, value
+
+
+def symptom_pairs(X):
+    # Pares (a < b) de síntomas activos en cada fila -> (fila, clave a * n + b)
+    X = sparse.csr_matrix(X)
+    X.sort_indices()
+    n_cols = X.shape[1]
+    lengths = np.diff(X.indptr)
+    row_of = np.repeat(np.arange(X.shape[0]), lengths)
+    end = X.indptr[1:][row_of]
+    rows, keys = [], []
+    for offset in range(1, int(lengths.max(initial=0))):
+        p = np.flatnonzero(np.arange(len(X.indices)) + offset < end)
+        rows.append(row_of[p])
+        keys.append(X.indices[p].astype(np.int64) * n_cols + X.indices[p + offset])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(keys)
+
+
+def build_index(X, codes, symptoms, classes, min_support=MIN_SUPPORT):
+    # X: CSR (pacientes x síntomas) binaria; codes: diagnóstico de cada fila
+    X = sparse.csr_matrix(X, dtype=np.int32)
+    X.sort_indices()
+    n_rows, n_cols = X.shape
+    codes = np.asarray(codes)
+    Y = sparse.csr_matrix((np.ones(n_rows, dtype=np.int32), (np.arange(n_rows), codes)),
+                          shape=(n_rows, len(classes)))
+    Xt = X.T.tocsr()
+
+    # Un síntoma
+    single_diag, single_diag_count = csr_top_k(Xt @ Y, TOP)
+    single_next, single_next_count = csr_top_k(Xt @ X, STORED_NEXT)
+
+    # Pares frecuentes
+    pair_rows, pair_keys = symptom_pairs(X)
+    keys, pair_id, support = np.unique(pair_keys, return_inverse=True, return_counts=True)
+    kept = support >= min_support
+    remap = np.cumsum(kept) - 1
+    mask = kept[pair_id]
+    P = sparse.csr_matrix((np.ones(mask.sum(), dtype=np.int32), (remap[pair_id[mask]], pair_rows[mask])),
+                          shape=(int(kept.sum()), n_rows))
+    pair_diag, pair_diag_count = csr_top_k(P @ Y, TOP)
+    pair_next, pair_next_count = csr_top_k(P @ X, STORED_NEXT)
+
+    return {
+        'version': np.array(FORMAT_VERSION),
+        'symptoms': np.array(symptoms, dtype=str),
+        'classes': np.array(classes, dtype=str),
+        'min_support': np.array(min_support),
+        # Pacientes de entrenamiento (para las intersecciones de 3+ síntomas)
+        'rows_indptr': X.indptr.astype(np.int64),
+        'rows_symptoms': X.indices.astype(np.int16),
+        'codes': codes.astype(np.int16),
+        'single_support': np.diff(Xt.indptr).astype(np.int32),
+        'single_diag': single_diag.astype(np.int16),
+        'single_diag_count': single_diag_count,
+        'single_next': single_next.astype(np.int16),
+        'single_next_count': single_next_count,
+        'pair_keys': keys[kept],
+        'pair_support': support[kept].astype(np.int32),
+        'pair_diag': pair_diag.astype(np.int16),
+        'pair_diag_count': pair_diag_count,
+        'pair_next': pair_next.astype(np.int16),
+        'pair_next_count': pair_next_count,
+    }
+
+
+# ================================
+# CONSULTA
+# ================================
+
+class SymptomIndex:
+    def __init__(self, arrays):
+        if int(arrays['version']) != FORMAT_VERSION:
+            raise ValueError(f"Versión de índice no soportada: {int(arrays['version'])}")
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.symptoms = [str(s) for s in self.symptoms]
+        self.classes = [str(c) for c in self.classes]
+        self.column = {s: i for i, s in enumerate(self.symptoms)}
+        n_rows = len(self.codes)
+        self.X = sparse.csr_matrix((np.ones(len(self.rows_symptoms), dtype=np.int32), self.rows_symptoms, self.rows_indptr),
+                                   shape=(n_rows, len(self.symptoms)))
+        csc = self.X.tocsc()
+        csc.sort_indices()
+        self.postings_indptr, self.postings_rows = csc.indptr, csc.indices
+
+    @property
+    def n_rows(self):
+        return len(self.codes)
+
+    def postings(self, col):
+        return self.postings_rows[self.postings_indptr[col]:self.postings_indptr[col + 1]]
+
+    def _table(self, cols):
+        # (soporte, diagnósticos, conteos, síntomas, conteos) precalculados o None
+        if len(cols) == 1:
+            c = cols[0]
+            return (int(self.single_support[c]), self.single_diag[c], self.single_diag_count[c],
+                    self.single_next[c], self.single_next_count[c])
+        if len(cols) == 2:
+            key = cols[0] * len(self.symptoms) + cols[1]
+            pos = np.searchsorted(self.pair_keys, key)
+            if pos < len(self.pair_keys) and self.pair_keys[pos] == key:
+                return (int(self.pair_support[pos]), self.pair_diag[pos], self.pair_diag_count[pos],
+                        self.pair_next[pos], self.pair_next_count[pos])
+        return None
+
+    def _intersect(self, cols):
+        # Pacientes con todos los síntomas: se empieza por la lista más corta
+        lists = sorted((self.postings(c) for c in cols), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        diag = np.bincount(self.codes[rows], minlength=len(self.classes))
+        diag_index = np.argsort(-diag, kind='stable')[:TOP]
+        counts = np.asarray(self.X[rows].sum(axis=0)).ravel()
+        counts[cols] = 0
+        next_index = np.argsort(-counts, kind='stable')[:STORED_NEXT]
+        return len(rows), diag_index, diag[diag_index], next_index, counts[next_index]
+
+    def suggest(self, symptoms, top=TOP):
+        # symptoms: nombres en inglés (columnas del modelo); los desconocidos se ignoran.
+        # Devuelve {'support', 'diagnoses': [(diagnóstico, pacientes, proporción)],
+        #           'next': [(síntoma, pacientes, proporción)]}
+        cols = sorted({self.column[s] for s in symptoms if s in self.column})
+        if not cols:
+            return {'support': 0, 'diagnoses': [], 'next': []}
+        table = self._table(cols)
+        support, diag, diag_count, nxt, next_count = self._intersect(cols) if table is None else table
+        chosen = set(cols)
+
+        def share(count):
+            return float(count) / support if support else 0.0
+
+        diagnoses = [(self.classes[d], int(n), share(n)) for d, n in zip(diag, diag_count) if d >= 0 and n > 0]
+        following = [(self.symptoms[s], int(n), share(n)) for s, n in zip(nxt, next_count)
+                     if s >= 0 and n > 0 and s not in chosen]
+        return {'support': support, 'diagnoses': diagnoses[:top], 'next': following[:top]}
+
+
+def save_index(arrays, path=INDEX_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_index(path=INDEX_FILE):
+    # None si el índice no se ha construido (la interfaz omite las sugerencias)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        return SymptomIndex({name: f[name] for name in f.files})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye el índice síntoma -> diagnósticos para las sugerencias")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Caché tipada del dataset (preparar_dataset.py)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--min-support', type=int, default=MIN_SUPPORT, help="Pacientes mínimos por par de síntomas")
+    parser.add_argument('--output', default=INDEX_FILE)
+    args = parser.parse_args()
+
+    data = open_cache(args.dataset, args.cache_dir)
+    train_rows, _ = data.split(args.min_count, TEST_SIZE, SEED)
+    train_rows = np.sort(train_rows)
+
+    started = time.perf_counter()
+    arrays = build_index(data.matrix(train_rows), data.codes[train_rows], data.symptoms, data.classes, args.min_support)
+    save_index(arrays, args.output)
+    print(f"✅ Índice en {time.perf_counter() - started:.1f} s: {len(train_rows)} pacientes, "
+          f"{len(arrays['pair_keys'])} pares de síntomas con ≥{args.min_support} pacientes, "
+          f"{os.path.getsize(args.output) / 1e6:.1f} MB -> {args.output}")
+
+    # Latencia de consulta con los síntomas de pacientes reales, agregados uno a uno
+    index = load_index(args.output)
+    patients = data.matrix(train_rows[:200])
+    timings = {}
+    for r in range(patients.shape[0]):
+        active = [index.symptoms[c] for c in patients.indices[patients.indptr[r]:patients.indptr[r + 1]]]
+        for n in range(1, len(active) + 1):
+            started = time.perf_counter()
+            index.suggest(active[:n])
+            timings.setdefault(min(n, 3), []).append(time.perf_counter() - started)
+    for n, values in sorted(timings.items()):
+        label = f"{n} síntoma(s)" if n < 3 else "3+ síntomas"
+        print(f"Consulta con {label}: {np.mean(values) * 1e3:.3f} ms promedio ({len(values)} consultas)")
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,22 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import json
 import os
-import plotly.graph_objects as go
-from pycaret.classification import load_model, predict_model
-import plotly.express as px
-from collections import Counter
-from fpdf import FPDF
 from streamlit import column_config
+from registro_modelos import ModelRegistry
+from consenso import load_rule, min_votes_for
+from cache_predicciones import CACHE_DB, PredictionCache, prediction_key, predict_board
+from diferencial import TOP_K, validation_weights
+from destilacion import load_student
+from indice_sintomas import load_index
+from reporte_pdf import BackgroundRenderer, report_data
+from explicacion import METHODS, translated
+from codificador_sintomas import SymptomEncoder
+from vocabulario import load_vocabulary
+from tiempos import RenderTimer
+from metricas import METRICS, METRICS_FILE, FileExporter, timed
+
+# Tiempos por sección de esta ejecución del script (panel de depuración en la barra lateral)
+timer = RenderTimer()
 
 # ================================
 # CONFIGURACIÓN DE COLORES
@@ -42,6 +50,14 @@ parent_dir = os.path.dirname(current_dir)
 # Construir el path absoluto a la imagen en ../insumos/logo_hospital.jpg
 logo_path = os.path.join(parent_dir, 'insumos', 'logo_hospital.jpg')
 
+# Regla de la junta (votos mínimos y umbral de confianza): modelos/regla_junta.json,
+# generado por barrido_umbral.py; sin archivo se usa 3 de 5 con confianza > 60%
+@st.cache_resource
+def load_board_rule():
+    return load_rule()
+
+rule = load_board_rule()
+
 with st.sidebar:
     col1, col2, col3 = st.columns([1,2,1])
 
@@ -55,81 +71,124 @@ with st.sidebar:
 # Expander para info ampliada
 with st.expander("ℹ️ Información del modelo de predicción de diagnósticos hospitalarios"):
     st.markdown("En una junta médica, la votación de diagnóstico se realiza de manera colegiada, buscando integrar la experiencia y el criterio de los distintos especialistas presentes. Cada miembro expone su análisis del caso basado en la historia clínica, exámenes complementarios y evidencia científica. Posteriormente, se abre un espacio de discusión donde se contrastan los distintos puntos de vista. Una vez finalizada la deliberación, los participantes emiten su voto, que puede ser abierto o anónimo, dependiendo de los protocolos de la institución. El diagnóstico final se establece por consenso si es posible; en caso de desacuerdo, se adopta la decisión de la mayoría, procurando siempre fundamentar el resultado en criterios clínicos objetivos y en beneficio del paciente.")
-    st.markdown("""
+    st.markdown(f"""
     Esta interfaz simula un escenario de junta médica, donde a partir de la predicción dada por los 5 mejores modelos obtenidos se define un diagnóstico preliminar consensuado, siguiendo las siguientes reglas:
 
-    - ✅ Si hay consenso en **mínimo 3 de los 5 modelos** y estos tienen una **confianza sobre la predicción mayor al 60%**, se define el diagnóstico por **votación**.
+    - ✅ Si hay consenso en **mínimo {rule['min_votes']} de los {rule['board_size']} modelos** y estos tienen una **confianza sobre la predicción mayor al {rule['threshold']:.0%}**, se define el diagnóstico por **votación**.
     - 🔍 Si **no hay consenso**, se define el diagnóstico por el modelo con **mayor confianza** en la predicción.
     """)
 
 
 
-# Síntomas en inglés (para alimentar el modelo)
+# Síntomas, diagnósticos, traducciones (EN -> ES) y descripciones compilados en
+# insumos/vocabulario.bin (se recompila solo si algún insumo cambia)
 @st.cache_resource
-def load_symptoms():
-    path = os.path.join(parent_dir, 'insumos', 'lista_sintomas.txt')
-    with open(path, 'r') as f:
-        symptoms = eval(f.read())
-    return symptoms
+def load_insumos():
+    vocabulary = load_vocabulary()
+    return (
+        vocabulary.symptoms,                  # Síntomas en inglés (para alimentar el modelo)
+        vocabulary.symptom_translation(),     # Traducción de síntomas (EN -> ES)
+        vocabulary.diagnosis_translation(),   # Traducción de diagnósticos (EN -> ES)
+        vocabulary.descriptions('es'),        # Descripciones de diagnósticos
+    )
 
-symptoms_list = load_symptoms()
+symptoms_list, symptom_translation, diagnosis_translation, diagnosis_descriptions = load_insumos()
+symptom_translation_rev = {v: k for k, v in symptom_translation.items()}
 
-# Traducción de síntomas (EN -> ES)
+# Índice síntoma -> columna del modelo
 @st.cache_resource
-def load_symptom_translation():
-    path = os.path.join(parent_dir, 'insumos', 'sintomas_traducidos.json')
-    with open(path, 'r') as f:
-        return json.load(f)
+def load_encoder():
+    return SymptomEncoder(symptoms_list, symptom_translation)
 
-symptom_translation = load_symptom_translation()
-symptom_translation_rev = {v: k for k, v in symptom_translation.items()}
+encoder = load_encoder()
+
+# ================================
+# CARGAR MODELOS
+# ================================
 
-# Traducción de diagnósticos (EN -> ES)
+# Modelos PyCaret: se cargan en paralelo en segundo plano; la junta puede sesionar
+# con los especialistas que ya estén listos
 @st.cache_resource
-def load_diagnosis_translation():
-    path = os.path.join(parent_dir, 'insumos', 'diagnosticos_traducidos.json')
-    with open(path, 'r') as f:
-        return json.load(f)
+def load_registry():
+    return ModelRegistry(columns=symptoms_list).start()
 
-diagnosis_translation = load_diagnosis_translation()
+registry = load_registry()
 
-# Descripciones de diagnósticos
+# Resultados de la junta por conjunto de síntomas; con CACHE_PREDICCIONES_DB se comparten
+# en disco entre procesos y reinicios
 @st.cache_resource
-def load_descriptions():
-    path = os.path.join(parent_dir, 'insumos', 'descripcion_diagnosticos_traducidos.json')
-    with open(path, 'r') as f:
-        return json.load(f)
+def load_prediction_cache():
+    return PredictionCache(db_path=CACHE_DB)
 
-diagnosis_descriptions = load_descriptions()
+prediction_cache = load_prediction_cache()
 
-# ================================
-# CARGAR MODELOS
-# ================================
+# Plantilla del reporte (logo, encabezado, pie) preparada una vez; los PDF se generan
+# en segundo plano mientras se dibujan los resultados
+@st.cache_resource
+def load_report_renderer():
+    return BackgroundRenderer()
 
-# Modelos PyCaret
+report_renderer = load_report_renderer()
+
+# Modelo estudiante (destilacion.py): responde solo en el modo rápido y solo si su
+# confianza supera el umbral calibrado; si no, responde la junta completa
+@st.cache_resource
+def load_student_model():
+    # Solo si se destiló con los mismos artefactos y la misma regla que la junta actual
+    return load_student(models_version=registry.artifacts_version(), rule=rule, columns=symptoms_list)
+
+student = load_student_model()
+
+# Pesos de la votación ponderada del diferencial: F1 de validación cruzada de cada
+# especialista en manifiesto_entrenamiento.json (entrenar_modelos.py)
+@st.cache_resource
+def load_model_weights():
+    return validation_weights(registry.names)
+
+model_weights = load_model_weights()
+
+# Índice síntoma -> diagnósticos (indice_sintomas.py): sugerencias mientras se eligen
+# los síntomas, sin consultar los modelos
 @st.cache_resource
-def load_all_models():
-    model_paths = [
-        os.path.join(parent_dir, 'modelos', 'modelo_lr'),
-        os.path.join(parent_dir, 'modelos', 'modelo_gauss'),
-        os.path.join(parent_dir, 'modelos', 'modelo_xgboost'),
-        os.path.join(parent_dir, 'modelos', 'modelo_knn'),
-        os.path.join(parent_dir, 'modelos', 'modelo_tree')
-        ]
-    models = [load_model(path) for path in model_paths]
-    return models
-
-models = load_all_models()
-models_names = ['Regresión', 'Gaussiano', 'XGBoost', 'KNN', 'Árbol',]
+def load_symptom_index():
+    return load_index()
+
+symptom_index = load_symptom_index()
+
+# Métricas por etapa del proceso (metricas.py); con METRICAS_ARCHIVO se escriben
+# periódicamente en formato Prometheus para un recolector externo
+@st.cache_resource
+def start_metrics_exporter():
+    return FileExporter(METRICS, METRICS_FILE).start() if METRICS_FILE else None
+
+start_metrics_exporter()
+
+with st.sidebar:
+    with st.expander("⏱️ Carga de especialistas"):
+        st.caption(f"Listos: {len(registry.ready())} de {len(registry.names)}")
+        st.dataframe(pd.DataFrame(registry.stats()).T, use_container_width=True)
+    with st.expander("🗃️ Caché de predicciones"):
+        st.json(prediction_cache.stats())
 
 # ================================
 # INTERFAZ STREAMLIT
 # ================================
 
 
+timer.mark("Insumos, modelos y caché")
+
 st.markdown("##### Completa los datos y selecciona los síntomas:")
-# Formulario de paciente
-with st.form("patient_info"):
+
+
+def add_symptom(symptom_es):
+    # Callback de las sugerencias: agrega el síntoma antes de volver a dibujar la página
+    st.session_state['symptoms_es'] = [*st.session_state.get('symptoms_es', []), symptom_es]
+
+
+# Datos del paciente. No es un st.form: los síntomas deben volver a ejecutar el script
+# en cada selección para actualizar las sugerencias; el diagnóstico solo se calcula
+# al presionar el botón.
+with st.container(border=True):
     st.header("📝 Datos del paciente")
     patient_name = st.text_input("Nombre completo")
     patient_id = st.text_input("Identificación")
@@ -139,85 +198,204 @@ with st.form("patient_info"):
     st.header("💊 Síntomas")
     selected_symptoms_es = st.multiselect(
         "Selecciona los síntomas asociados a tu dolencia:",
-        options=list(symptom_translation_rev.keys())
+        options=list(symptom_translation_rev.keys()),
+        key='symptoms_es'
+    )
+
+    # Diagnósticos frecuentes y síntomas que suelen acompañar a los elegidos en los
+    # pacientes de entrenamiento (búsqueda en tablas precalculadas)
+    if symptom_index is not None and selected_symptoms_es:
+        with timer.section("Sugerencias de síntomas"):
+            hints = symptom_index.suggest([symptom_translation_rev[s] for s in selected_symptoms_es])
+            if hints['support']:
+                st.caption(f"💡 {hints['support']} pacientes de entrenamiento tienen estos síntomas.")
+                col_diagnoses, col_next = st.columns(2)
+                with col_diagnoses:
+                    st.markdown("**Diagnósticos frecuentes**")
+                    st.markdown('\n'.join(f"- {diagnosis_translation.get(d, d)} ({share:.0%})"
+                                           for d, _, share in hints['diagnoses']))
+                with col_next:
+                    st.markdown("**Síntomas que suelen acompañarlos**")
+                    for symptom, _, share in hints['next']:
+                        symptom_es = symptom_translation.get(symptom)
+                        if symptom_es in symptom_translation_rev:
+                            st.button(f"➕ {symptom_es} ({share:.0%})", key=f"hint_{symptom}",
+                                      on_click=add_symptom, args=(symptom_es,))
+            else:
+                st.caption("💡 Ningún paciente de entrenamiento tiene esta combinación de síntomas.")
+
+    # Votación suave del diagnóstico diferencial (ver diferencial.py). El promedio
+    # ponderado solo se ofrece si el manifiesto de entrenamiento trae el F1 de validación
+    # de cada especialista.
+    differential_voting = st.selectbox(
+        "Combinación de probabilidades para el diagnóstico diferencial",
+        ["mean", "weighted", "geometric"] if model_weights is not None else ["mean", "geometric"],
+        format_func={"mean": "Promedio", "weighted": "Promedio ponderado (F1 de validación)",
+                     "geometric": "Media geométrica"}.get
     )
-    submitted = st.form_submit_button("🔎 Realizar diagnóstico")
+    differential_weights = model_weights if differential_voting == "weighted" else None
+    fast_mode = student is not None and st.checkbox(
+        "⚡ Modo rápido",
+        help="Un modelo destilado de la junta responde al instante; si no está suficientemente seguro, se consulta la junta completa."
+    )
+    submitted = st.button("🔎 Realizar diagnóstico")
 
 # ================================
 # PREDICCIÓN
 # ================================
+#
+# Streamlit vuelve a ejecutar todo el script en cada interacción (incluido el clic en
+# "Descargar PDF"). El resultado del último envío queda en st.session_state y las
+# tablas y el gráfico se cachean por la clave del conjunto de síntomas, así que una
+# nueva ejecución solo vuelve a dibujar lo que ya estaba calculado.
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def results_frame(key, _board):
+    # Tabla de la junta ordenada una sola vez por confianza; sirve a la tabla y al gráfico
+    df = pd.DataFrame({
+        'Diagnóstico': [diagnosis_translation.get(p, p) for p in _board['labels']],
+        'Especialista': [f'{i}' for i in _board['names']],
+        'Confianza (%)': [round(c * 100, 0) for c in _board['scores']],
+        'Confianza_num': _board['scores']
+    })
+    return df.sort_values(by='Confianza_num', ascending=False, kind='stable').reset_index(drop=True)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+@timed('chart')
+def results_figure(key, _df_results):
+    # Plotly se importa con el primer gráfico, no antes de dibujar el formulario
+    import plotly.express as px
+    df = _df_results.copy()
+    # Convertir 'Especialista' a tipo categórico ordenado
+    df['Especialista'] = pd.Categorical(df['Especialista'], categories=df['Especialista'], ordered=True)
+    fig = px.bar(df, x='Especialista', y='Confianza_num', color='Diagnóstico',
+                 text='Confianza (%)', labels={'Confianza_num':'Confianza (%)'}, height=400)
+    # Añadir línea horizontal en el umbral de confianza de la regla
+    fig.add_hline(
+        y=rule['threshold'],
+        line_dash="dash",
+        line_color="green",
+        annotation_text=f"Umbral {rule['threshold']:.0%}",
+        annotation_position="top right"
+    )
+    return fig
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def differential_frame(key, _differential):
+    return pd.DataFrame({
+        'Diagnóstico': [diagnosis_translation.get(d, d) for d, _ in _differential],
+        'Probabilidad (%)': [round(p * 100, 1) for _, p in _differential],
+    })
+
 
 if submitted:
     if not selected_symptoms_es or not patient_name or not patient_age:
         st.warning("⚠️ Por favor completa todos los campos.")
+        st.session_state.pop('diagnosis', None)
     else:
-        selected_symptoms_en = [symptom_translation_rev[s] for s in selected_symptoms_es]
-        input_vector = [1 if symptom in selected_symptoms_en else 0 for symptom in symptoms_list]
-        input_df = pd.DataFrame([input_vector], columns=symptoms_list)
-
-        predictions = []
-        confidences = []
-
-        for i, model in enumerate(models):
-            prediction_result = predict_model(model, data=input_df)
-            label_column = 'Label' if 'Label' in prediction_result.columns else 'prediction_label'
-            score_column = 'Score' if 'Score' in prediction_result.columns else 'prediction_score'
-
-            predicted_label = prediction_result.loc[0, label_column]
-            predicted_score = prediction_result.loc[0, score_column]
-
-            predictions.append(predicted_label)
-            confidences.append(predicted_score)
-
+        with timer.section("Codificación y modo rápido"):
+            selected_symptoms_en = [symptom_translation_rev[s] for s in selected_symptoms_es]
+            symptom_ids, _ = encoder.indices(selected_symptoms_en)
+            board, partial, explanation = None, None, None
+
+            if fast_mode:
+                cache_key = prediction_key(symptom_ids, student.version, 'estudiante', TOP_K)
+                board = prediction_cache.get(cache_key)
+                if board is None:
+                    board = student.predict_board(encoder.encode_one(selected_symptoms_en), TOP_K)
+                    if board is not None:
+                        prediction_cache.put(cache_key, board)
+
+        if board is None:
+            with timer.section("Predicción de la junta"):
+                # Si aún no hay ningún especialista listo se espera al primero
+                registry.wait(any_ready=True)
+                engine = registry.engine()
+                if engine is None:
+                    st.error("❌ No fue posible cargar los modelos de la junta médica.")
+                    st.stop()
+                min_votes = min_votes_for(engine.n_models, rule['min_votes'], rule['board_size'])
+                if registry.pending():
+                    partial = (engine.n_models, len(registry.names), min_votes)
+
+                # Misma combinación de síntomas y mismos modelos: se reutiliza la decisión de la junta
+                cache_key = prediction_key(symptom_ids, engine.version, min_votes, rule['threshold'], TOP_K,
+                                           differential_voting, differential_weights)
+                board = prediction_cache.get(cache_key)
+                if board is None:
+                    board = predict_board(engine, encoder.encode_one(selected_symptoms_en), min_votes,
+                                          rule['threshold'], top_k=TOP_K, voting=differential_voting,
+                                          weights=differential_weights)
+                    prediction_cache.put(cache_key, board)
+
+                # Síntomas que pesaron en cada voto: tablas precalculadas del motor, sin volver a predecir
+                explanation = engine.explainer.explain(symptom_ids, board['labels'])
+
+        final_diagnosis = board['final']
+        description = diagnosis_descriptions.get(final_diagnosis, "Descripción no disponible.")
+        patient = {'name': patient_name, 'id': patient_id, 'age': patient_age, 'sex': patient_sex, 'urgency': urgencia}
+        st.session_state['diagnosis'] = {
+            'key': cache_key,
+            'board': board,
+            'symptoms_es': list(selected_symptoms_es),
+            'description': description,
+            'partial': partial,
+            'explanation': explanation,
+            # El PDF se arma en segundo plano mientras se dibujan tabla y gráfico; el
+            # Future queda guardado y las ejecuciones siguientes reutilizan sus bytes
+            'report': report_renderer.submit(report_data(
+                patient,
+                selected_symptoms_es,
+                diagnosis_translation.get(final_diagnosis, final_diagnosis),
+                description,
+                [(name, diagnosis_translation.get(p, p), c)
+                 for name, p, c in zip(board['names'], board['labels'], board['scores'])],
+                explanation=translated(explanation, symptom_translation, diagnosis_translation) if explanation else None,
+            )),
+        }
+
+diagnosis = st.session_state.get('diagnosis')
+if diagnosis is not None:
+    board = diagnosis['board']
+    key = diagnosis['key']
+    final_diagnosis = board['final']
+
+    if diagnosis['partial']:
+        n_models, n_total, min_votes = diagnosis['partial']
+        st.info(f"⏳ Junta parcial: {n_models} de {n_total} especialistas disponibles "
+                f"(consenso con {min_votes} votos). Los demás siguen cargando.")
+
+    with timer.section("Síntomas y diagnóstico"):
         # Mostrar síntomas seleccionados
         st.markdown("#### 🩺 De acuerdo con estos síntomas:")
-        for s in selected_symptoms_es:
-            st.markdown(f"- {s}")
+        st.markdown('\n'.join(f"- {s}" for s in diagnosis['symptoms_es']))
 
         # Votación
         st.markdown("#### 🧑‍⚕️ El diágnostico preliminar para apoyar una decisión clínica:")
-  
-        counter = Counter(predictions)
-        most_common = counter.most_common(1)[0]
-
-        # Revisar si se cumple la regla 3/5 con confianza > 50%
-        if most_common[1] >= 3:
-            # Índices de modelos que dieron ese diagnóstico
-            same_diag_indices = [i for i, p in enumerate(predictions) if p == most_common[0]]
-            # De esos, revisar cuáles tienen confianza > 0.5
-            high_conf_indices = [i for i in same_diag_indices if confidences[i] > 0.6]
-
-            if len(high_conf_indices) >= 3:
-                final_diagnosis = most_common[0]
-                st.success(f"✅ Por consenso (alta confianza): **{diagnosis_translation.get(final_diagnosis, final_diagnosis)}**")
-            else:
-                # No hay 3 con suficiente confianza
-                idx_max_conf = np.argmax(confidences)
-                final_diagnosis = predictions[idx_max_conf]
-                st.success(f"✅ Por mayor confianza: **{diagnosis_translation.get(final_diagnosis, final_diagnosis)}**")
+
+        # Regla de la junta: por defecto 3/5 con confianza > 60% (ver consenso.py)
+        if board.get('student'):
+            st.success(f"⚡ Modo rápido (modelo destilado de la junta, confianza {board['scores'][0]:.0%}): "
+                       f"**{diagnosis_translation.get(final_diagnosis, final_diagnosis)}**")
+        elif board['consensus']:
+            st.success(f"✅ Por consenso (alta confianza): **{diagnosis_translation.get(final_diagnosis, final_diagnosis)}**")
         else:
-            # No hay al menos 3 coincidencias
-            idx_max_conf = np.argmax(confidences)
-            final_diagnosis = predictions[idx_max_conf]
             st.success(f"✅ Por mayor confianza: **{diagnosis_translation.get(final_diagnosis, final_diagnosis)}**")
 
         # Descripción
-        description = diagnosis_descriptions.get(final_diagnosis, "Descripción no disponible.")
-        st.info(f"📝 **Descripción del diagnóstico:** {description}")
+        st.info(f"📝 **Descripción del diagnóstico:** {diagnosis['description']}")
 
-        # Mostrar tabla de resultados con barras visuales y orden
-        st.subheader("📊 Conclusiones de la junta médica:")
+    # Diagnóstico diferencial: probabilidades completas de la junta combinadas
+    with timer.section("Diagnóstico diferencial"):
+        with st.expander(f"🔬 Diagnóstico diferencial (top {TOP_K})"):
+            st.dataframe(differential_frame(key, board['differential']), use_container_width=True, hide_index=True)
 
-        # Armar DataFrame
-        df_results = pd.DataFrame({
-            'Diagnóstico': [diagnosis_translation.get(p, p) for p in predictions],
-            'Especialista': [f'{i}' for i in models_names],
-            'Confianza (%)': [round(c * 100, 0) for c in confidences],
-            'Confianza_num': confidences
-        })
-
-        # Ordenar por confianza
-        df_results = df_results.sort_values(by='Confianza (%)', ascending=False).reset_index(drop=True)
+    # Mostrar tabla de resultados con barras visuales y orden
+    with timer.section("Tabla de la junta"):
+        st.subheader("📊 Conclusión del modelo destilado:" if board.get('student') else "📊 Conclusiones de la junta médica:")
+        df_results = results_frame(key, board)
 
         # Mostrar con barra de progreso visual
         st.data_editor(
@@ -235,74 +413,24 @@ if submitted:
             disabled=True
         )
 
-        # Gráfico de barras
-        # Ordenar DataFrame por confianza numérica (descendente)
-        df_results_sorted = df_results.sort_values(by='Confianza_num', ascending=False)
-        # Convertir 'Especialista' a tipo categórico ordenado
-        df_results_sorted['Especialista'] = pd.Categorical(
-            df_results_sorted['Especialista'],
-            categories=df_results_sorted['Especialista'],
-            ordered=True
-        )
-
-        fig = px.bar(df_results_sorted, x='Especialista', y='Confianza_num', color='Diagnóstico',
-                     text='Confianza (%)', labels={'Confianza_num':'Confianza (%)'}, height=400)
-        # Añadir línea horizontal en 50%
-        fig.add_hline(
-            y=0.6,
-            line_dash="dash",
-            line_color="green",
-            annotation_text="Umbral 60%",
-            annotation_position="top right"
-        )
-        st.plotly_chart(fig)
-
-        
-        # Exportar PDF
-        class PDF(FPDF):
-            def header(self):
-                self.set_font("Arial", 'B', 16)
-                self.cell(0, 10, "Reporte de Diagnóstico", ln=True, align="C")
-
-            def footer(self):
-                self.set_y(-15)
-                self.set_font("Arial", 'I', 8)
-                self.cell(0, 10, f"Página {self.page_no()}", 0, 0, 'C')
-
-        pdf = PDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, f"Nombre: {patient_name}", ln=True)
-        pdf.cell(0, 10, f"ID: {patient_id}", ln=True)
-        pdf.cell(0, 10, f"Edad: {patient_age}   Sexo: {patient_sex}", ln=True)
-        pdf.cell(0, 10, f"Nivel de urgencia: {urgencia}", ln=True)
-        pdf.ln(5)
-        pdf.cell(0, 10, f"Diagnóstico final: {diagnosis_translation.get(final_diagnosis, final_diagnosis)}", ln=True)
-        pdf.multi_cell(0, 10, f"Descripción: {description}")
-        pdf.ln(5)
-        pdf.cell(0, 10, "Síntomas seleccionados:", ln=True)
-        for symptom in selected_symptoms_es:
-            pdf.cell(0, 8, f"- {symptom}", ln=True)
-        pdf.ln(5)
-
-        # Incluir tabla de resultados
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(0, 10, "Diagnósticos por Especialista:", ln=True)
-        pdf.set_font("Arial", size=12)
-
-        # Encabezado de tabla
-        pdf.set_fill_color(220, 220, 220)
-        pdf.cell(60, 10, "Especialista", border=1, fill=True)
-        pdf.cell(70, 10, "Diagnóstico", border=1, fill=True)
-        pdf.cell(40, 10, "Confianza (%)", border=1, ln=True, fill=True)
-
-        # Filas
-        for i, row in df_results.iterrows():
-            pdf.cell(60, 10, row['Especialista'], border=1)
-            pdf.cell(70, 10, row['Diagnóstico'], border=1)
-            pdf.cell(40, 10, f"{row['Confianza (%)']}%", border=1, ln=True)
-
-        pdf_bytes = bytes(pdf.output(dest='S'))
+    # Por qué votó así cada especialista (regresión, gaussiano y árbol)
+    if diagnosis['explanation']:
+        with timer.section("Explicación de los votos"):
+            with st.expander("🔍 ¿Por qué votó así cada especialista?"):
+                for entry in diagnosis['explanation']:
+                    if entry is None:
+                        continue
+                    symptoms = ', '.join(f"{symptom_translation.get(s, s)} ({w:.2f})" for s, w in entry['symptoms'])
+                    st.markdown(f"**{entry['name']}** → {diagnosis_translation.get(entry['label'], entry['label'])}: "
+                                f"{symptoms or 'ningún síntoma a favor'} · _{METHODS[entry['method']]}_")
+
+    # Gráfico de barras
+    with timer.section("Gráfico de confianza"):
+        st.plotly_chart(results_figure(key, df_results))
+
+    # Exportar PDF
+    with timer.section("Reporte PDF", cached=diagnosis['report'].done()):
+        pdf_bytes = diagnosis['report'].result()
 
         st.markdown("##### 🧑‍⚕️ Descarga el diagnóstico preliminar en PDF para la historia clínica:")
         st.download_button(
@@ -311,3 +439,11 @@ if submitted:
             file_name="diagnostico_paciente.pdf",
             mime="application/pdf"
         )
+
+# Panel de depuración: tiempo de cada sección en esta ejecución del script y
+# latencias acumuladas por etapa desde que inició el proceso
+with st.sidebar:
+    with st.expander("🐞 Tiempos de render"):
+        st.dataframe(pd.DataFrame(timer.rows()), use_container_width=True, hide_index=True)
+    with st.expander("📈 Métricas por etapa"):
+        st.dataframe(pd.DataFrame(METRICS.stages()), use_container_width=True, hide_index=True)
@@ -0,0 +1,112 @@
+import numpy as np
+from scipy import sparse
+
+from artefactos import CompactKNN, heap_argkmin
+
+# ================================
+# KNN SOBRE BITSETS E ÍNDICE INVERTIDO
+# ================================
+#
+# Con síntomas binarios la distancia euclidiana al cuadrado es la distancia de
+# Hamming: |q| + |r| - 2 |q ∩ r|. Las filas de entrenamiento se guardan como
+# bitsets uint64 (6 palabras por paciente) y, junto a ellas, un índice invertido
+# síntoma -> filas. Para una consulta con 3-8 síntomas basta sumar las filas que
+# comparten algún síntoma (|q ∩ r|); el resto queda a distancia |q| + |r| sin
+# recorrer la matriz. Los vecinos se eligen con heap_argkmin, de modo que las
+# predicciones coinciden con las de KNeighborsClassifier.
+
+try:
+    _bitwise_count = np.bitwise_count  # NumPy >= 2.0
+except AttributeError:
+    _bitwise_count = None
+
+_POPCOUNT_8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_rows(X):
+    # Matriz binaria (densa o CSR) -> bitsets uint64 de forma (filas x palabras)
+    dense = X.toarray() if sparse.issparse(X) else np.asarray(X)
+    packed = np.packbits(dense.astype(bool), axis=1)
+    pad = (-packed.shape[1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def popcount(words):
+    # Bits en 1 por fila de una matriz uint64
+    if _bitwise_count is not None:
+        return _bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT_8[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def build_postings(X):
+    # Índice invertido: filas (ordenadas) que tienen activo cada síntoma
+    csc = sparse.csc_matrix(X)
+    csc.sort_indices()
+    return csc.indptr.astype(np.int64), csc.indices.astype(np.int32)
+
+
+def hamming_arrays(fit_X):
+    # Arreglos del artefacto compacto: bitsets, índice invertido y etiquetas
+    indptr, rows = build_postings(fit_X)
+    return {'fit_bits': pack_rows(fit_X), 'postings_indptr': indptr, 'postings_rows': rows}
+
+
+def is_binary(X):
+    values = X.data if sparse.issparse(X) else np.asarray(X)
+    return bool(np.all((values == 0) | (values == 1)))
+
+
+class HammingKNN(CompactKNN):
+    accepts_sparse = True
+
+    def __init__(self, meta, arrays, method='index'):
+        super().__init__(meta, arrays)
+        self.method = method
+        self.row_norms = popcount(self.fit_bits)
+
+    @classmethod
+    def from_estimator(cls, estimator, labels, feature_names, method='index'):
+        # A partir de un KNeighborsClassifier ajustado sobre síntomas binarios
+        if estimator.effective_metric_ != 'euclidean':
+            raise ValueError(f"Métrica KNN no soportada: {estimator.effective_metric_}")
+        fit_X = np.asarray(estimator._fit_X)
+        if not is_binary(fit_X):
+            raise ValueError("La matriz de entrenamiento del KNN no es binaria")
+        meta = {'n_neighbors': int(estimator.n_neighbors), 'weights': estimator.weights,
+                'n_features': int(fit_X.shape[1]), 'labels': [str(label) for label in labels],
+                'feature_names': list(feature_names)}
+        arrays = dict(hamming_arrays(fit_X.astype(np.uint8)), y=estimator._y.astype(np.int64))
+        return cls(meta, arrays, method)
+
+    # ---- distancias ----
+
+    def distances_index(self, cols):
+        # Hamming contra todas las filas recorriendo solo las listas de los síntomas activos
+        overlap = np.zeros(len(self.row_norms), dtype=np.int64)
+        for c in cols:
+            overlap[self.postings_rows[self.postings_indptr[c]:self.postings_indptr[c + 1]]] += 1
+        return len(cols) + self.row_norms - 2 * overlap
+
+    def distances_popcount(self, query_bits):
+        # Hamming por XOR + popcount sobre los bitsets empaquetados
+        return popcount(np.bitwise_xor(self.fit_bits, query_bits))
+
+    def kneighbors(self, X):
+        X = sparse.csr_matrix(X)
+        X.eliminate_zeros()
+        if not is_binary(X):
+            raise ValueError("HammingKNN solo admite síntomas binarios")
+        k = self.meta['n_neighbors']
+        query_bits = pack_rows(X) if self.method == 'popcount' else None
+        neighbors = np.empty((X.shape[0], k), dtype=np.int64)
+        distances = np.empty((X.shape[0], k), dtype=np.float64)
+        for i in range(X.shape[0]):
+            if query_bits is not None:
+                dist = self.distances_popcount(query_bits[i])
+            else:
+                dist = self.distances_index(X.indices[X.indptr[i]:X.indptr[i + 1]])
+            neighbors[i] = heap_argkmin(dist, k)
+            distances[i] = np.sqrt(dist[neighbors[i]])
+        return distances, neighbors
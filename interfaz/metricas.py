@@ -0,0 +1,220 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+
+# ================================
+# MÉTRICAS DEL FLUJO DE DIAGNÓSTICO
+# ================================
+#
+# Latencia (histograma), conteo y errores de cada etapa del diagnóstico:
+#   encoding    -> codificación de síntomas (SymptomEncoder.encode)
+#   specialist  -> predict_proba de cada especialista (etiqueta model)
+#   voting      -> regla de la junta (consenso.board_decision)
+#   chart       -> gráfico de confianza de la interfaz
+#   pdf         -> reporte PDF (ReportTemplate.render)
+#   queue       -> espera en la cola del planificador de microlotes (microlotes.py)
+#   explanation -> síntomas que pesaron en cada voto (explicacion.py)
+# Registrar una observación cuesta un perf_counter, un bisect y un lock (~1 µs). Las
+# métricas se exponen en formato de texto de Prometheus: el servicio HTTP en
+# GET /metrics y la interfaz escribiéndolas cada cierto tiempo en METRICAS_ARCHIVO
+# (p. ej. para el textfile collector de node_exporter).
+
+METRICS_FILE = os.environ.get('METRICAS_ARCHIVO')
+EXPORT_INTERVAL_S = 15.0
+
+STAGE_SECONDS = 'diagnosis_stage_seconds'
+STAGE_ERRORS = 'diagnosis_stage_errors_total'
+
+# Límites superiores (segundos) de los buckets de latencia
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    STAGE_SECONDS: "Latencia de cada etapa del diagnóstico",
+    STAGE_ERRORS: "Errores de cada etapa del diagnóstico",
+}
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # el último es +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Aproximación por el límite superior del bucket (como histogram_quantile)
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class _StageTimer(ContextDecorator):
+    # Contexto (o decorador) que observa la duración y cuenta la excepción si ocurre
+    __slots__ = ('metrics', 'stage', 'labels', 'started')
+
+    def __init__(self, metrics, stage, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada usa su propio contexto (puede haber varios hilos)
+        return _StageTimer(self.metrics, self.stage, self.labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = (('stage', self.stage), *self.labels)
+        self.metrics.observe(STAGE_SECONDS, time.perf_counter() - self.started, labels)
+        if exc_type is not None:
+            self.metrics.inc(STAGE_ERRORS, labels)
+        return False
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}   # (nombre, etiquetas) -> Histogram
+        self._counters = {}     # (nombre, etiquetas) -> valor
+        self._gauges = {}
+        self.help = dict(HELP)
+
+    # ---- registro ----
+
+    def observe(self, name, value, labels=(), buckets=None):
+        # buckets: límites propios para histogramas que no son de latencia (p. ej. tamaños)
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets or self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=()):
+        with self._lock:
+            self._gauges[(name, tuple(labels))] = value
+
+    def timed(self, stage, **labels):
+        return _StageTimer(self, stage, tuple(sorted(labels.items())))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # ---- lectura ----
+
+    def stages(self):
+        # Resumen por etapa para paneles: conteo, errores, promedio y p50/p95 (ms)
+        with self._lock:
+            histograms = {labels: (h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+                          for (name, labels), h in self._histograms.items() if name == STAGE_SECONDS}
+            errors = {labels: n for (name, labels), n in self._counters.items() if name == STAGE_ERRORS}
+        rows = []
+        for labels, (count, total, p50, p95) in sorted(histograms.items()):
+            rows.append({
+                **dict(labels),
+                'count': count,
+                'errors': errors.get(labels, 0),
+                'mean_ms': total / count * 1e3 if count else 0.0,
+                'p50_ms': p50 * 1e3 if p50 is not None else None,
+                'p95_ms': p95 * 1e3 if p95 is not None else None,
+            })
+        return rows
+
+    def render(self):
+        # Formato de exposición de texto de Prometheus (versión 0.0.4)
+        with self._lock:
+            histograms = {key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, n in zip((*buckets, '+Inf'), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_label_text((*labels, ('le', bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {count}")
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in sorted(values.items()):
+                describe(name, kind)
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # Escritura atómica: el recolector nunca lee un archivo a medias
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class FileExporter:
+    # Escribe las métricas en `path` cada `interval` segundos desde un hilo daemon
+    def __init__(self, metrics, path, interval=EXPORT_INTERVAL_S):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='exportador-metricas', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.write(self.path)
+            except OSError:
+                pass    # carpeta no disponible: se reintenta en el siguiente intervalo
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.metrics.write(self.path)
+
+
+# Registro del proceso: lo comparten el motor, la regla, el codificador y el PDF
+METRICS = Metrics()
+timed = METRICS.timed
@@ -0,0 +1,156 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from scipy import sparse
+
+from cache_predicciones import predict_boards
+from consenso import CONFIDENCE_THRESHOLD
+from metricas import METRICS, STAGE_SECONDS
+
+# ================================
+# PLANIFICADOR DE MICROLOTES
+# ================================
+#
+# En un pico de ingresos llegan muchas solicitudes de un paciente con milisegundos de
+# diferencia, y cada una paga por separado el costo fijo de los cinco predict_proba.
+# MicroBatcher las pone en una cola; un hilo toma la más antigua y, si no hay otra en
+# la cola, la predice de inmediato. Si hay más, espera a que lleguen otras hasta juntar
+# max_batch filas o hasta que la más antigua lleve max_wait_ms en la cola. Las filas
+# del lote se apilan en una sola CSR, cada especialista predice una vez y cada
+# solicitud recibe su resultado (mismo formato que predict_board) en un Future. Solo
+# se agrupan solicitudes con el mismo motor y los mismos parámetros de la junta; si
+# no, se predicen en lotes separados dentro de la misma ronda.
+#
+# Métricas (metricas.py): profundidad de la cola, filas por lote y tiempo de espera en
+# la cola (etapa "queue").
+
+MAX_BATCH = 64
+MAX_WAIT_MS = 2.0
+
+QUEUE_DEPTH = 'microbatch_queue_depth'
+BATCH_ROWS = 'microbatch_rows'
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ('engine', 'X', 'params', 'group', 'future', 'submitted')
+
+    def __init__(self, engine, X, params):
+        self.engine = engine
+        self.X = sparse.csr_matrix(X)
+        self.params = params
+        # Parámetros hashables: los pesos pueden venir como dict
+        self.group = (id(engine), json.dumps(params, sort_keys=True, default=str))
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, metrics=METRICS):
+        if max_batch < 1 or max_wait_ms < 0:
+            raise ValueError(f"Límites de microlote inválidos: max_batch={max_batch}, max_wait_ms={max_wait_ms}")
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self.metrics = metrics
+        self.metrics.help.setdefault(QUEUE_DEPTH, "Solicitudes en la cola del planificador de microlotes")
+        self.metrics.help.setdefault(BATCH_ROWS, "Filas por microlote")
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'rows': 0, 'batches': 0, 'max_depth': 0}
+        self._thread = threading.Thread(target=self._run, name='microlotes', daemon=True)
+        self._thread.start()
+
+    # ---- solicitudes ----
+
+    def submit(self, engine, X, min_votes, threshold=CONFIDENCE_THRESHOLD, top_k=0, voting='mean', weights=None):
+        # Future con la lista de resultados de la junta, uno por fila de X
+        request = _Request(engine, X, (min_votes, threshold, top_k, voting, weights))
+        self._queue.put(request)
+        depth = self._queue.qsize()
+        with self._lock:
+            self.counters['requests'] += 1
+            self.counters['max_depth'] = max(self.counters['max_depth'], depth)
+        self.metrics.set(QUEUE_DEPTH, depth)
+        return request.future
+
+    def predict_board(self, engine, X, min_votes, threshold=CONFIDENCE_THRESHOLD, top_k=0, voting='mean', weights=None):
+        # Igual que cache_predicciones.predict_board, pero compartiendo el lote con
+        # las solicitudes concurrentes
+        return self.submit(engine, X, min_votes, threshold, top_k, voting, weights).result()[0]
+
+    # ---- hilo del planificador ----
+
+    def _collect(self, first):
+        # Una solicitud sola (cola vacía) no espera. Si hay más, se bloquea hasta juntar
+        # max_batch filas o hasta que la más antigua lleve max_wait_ms; pasado ese plazo
+        # solo se suman las que ya estén en la cola. Las que llegan durante un predict
+        # forman el siguiente lote.
+        batch, rows = [first], first.X.shape[0]
+        if self._queue.empty():
+            return batch
+        deadline = first.submitted + self.max_wait_s
+        while rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._queue.put(_STOP)      # se atiende después de este lote
+                break
+            batch.append(request)
+            rows += request.X.shape[0]
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            self.metrics.set(QUEUE_DEPTH, self._queue.qsize())
+            started = time.perf_counter()
+            for request in batch:
+                self.metrics.observe(STAGE_SECONDS, started - request.submitted, (('stage', 'queue'),))
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.group, []).append(request)
+            for requests in groups.values():
+                self._execute(requests)
+
+    def _execute(self, requests):
+        X = sparse.vstack([r.X for r in requests], format='csr') if len(requests) > 1 else requests[0].X
+        with self._lock:
+            self.counters['batches'] += 1
+            self.counters['rows'] += X.shape[0]
+        self.metrics.observe(BATCH_ROWS, X.shape[0], buckets=BATCH_BUCKETS)
+        try:
+            boards = predict_boards(requests[0].engine, X, *requests[0].params)
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        start = 0
+        for request in requests:
+            n = request.X.shape[0]
+            request.future.set_result(boards[start:start + n])
+            start += n
+
+    # ---- estado ----
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, depth=self._queue.qsize(), max_batch=self.max_batch, max_wait_ms=self.max_wait_s * 1000,
+                    mean_rows=counters['rows'] / counters['batches'] if counters['batches'] else None)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
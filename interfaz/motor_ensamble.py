@@ -0,0 +1,208 @@
+import functools
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from rutas import MODELOS_DIR
+from metricas import timed
+
+# PyCaret escribe en logs.log (directorio actual) una advertencia por cada dependencia
+# opcional ausente (cuml, ...) en cada proceso que lo importa, además de cada
+# load_model. Solo se conservan los errores; PYCARET_CUSTOM_LOGGING_LEVEL lo cambia.
+os.environ.setdefault('PYCARET_CUSTOM_LOGGING_LEVEL', 'ERROR')
+
+# Los estimadores se entrenaron con DataFrames; al recibir matrices NumPy sklearn
+# advierte en cada llamada que faltan los nombres de columnas.
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# ================================
+# MODELOS DE LA JUNTA MÉDICA
+# ================================
+
+# Archivos de los modelos PyCaret, en el orden en que se presentan en la interfaz
+MODEL_FILES = ['modelo_lr', 'modelo_gauss', 'modelo_xgboost', 'modelo_knn', 'modelo_tree']
+MODELS_NAMES = ['Regresión', 'Gaussiano', 'XGBoost', 'KNN', 'Árbol']
+
+# Paso de PyCaret que solo transforma la variable objetivo
+LABEL_STEP = 'label_encoding'
+
+# Pasos que no alteran una matriz binaria sin nulos: una matriz dispersa ya
+# codificada puede entregarse directamente a los estimadores
+PASSTHROUGH_STEPS = {'numerical_imputer', 'categorical_imputer', 'clean_column_names'}
+
+# Estimadores que predicen igual con entrada dispersa. XGBoost queda fuera porque
+# interpreta los ceros implícitos de una CSR como valores faltantes.
+SPARSE_ESTIMATORS = ('LogisticRegression', 'DecisionTreeClassifier')
+
+
+def load_all_models(models_dir=MODELOS_DIR):
+    from pycaret.classification import load_model
+    return [load_model(os.path.join(models_dir, name), verbose=False) for name in MODEL_FILES]
+
+
+def split_pipeline(pipeline):
+    # Separa un pipeline de PyCaret en (transformaciones de X, estimador, clases originales)
+    if not hasattr(pipeline, 'steps'):
+        # Modelo compacto (artefactos.py): sin preprocesamiento y con sus clases originales
+        return [], pipeline, np.asarray(pipeline.labels, dtype=object)
+    steps = pipeline.steps
+    estimator = steps[-1][1]
+    transformers = [(name, step) for name, step in steps[:-1] if name != LABEL_STEP]
+
+    label_step = dict(steps[:-1]).get(LABEL_STEP)
+    if label_step is not None:
+        classes = label_step.transformer.inverse_transform(estimator.classes_)
+    else:
+        classes = estimator.classes_
+    return transformers, estimator, np.asarray(classes, dtype=object)
+
+
+def feature_names(pipeline):
+    if not hasattr(pipeline, 'steps'):
+        return list(pipeline.feature_names)
+    # feature_names_in_ del pipeline incluye la columna objetivo
+    target = getattr(dict(pipeline.steps).get(LABEL_STEP), 'target_name_', None)
+    return [c for c in pipeline.feature_names_in_ if c != target]
+
+
+def check_columns(columns, feature_names):
+    # Las matrices dispersas y los arreglos se leen por posición: las columnas del
+    # codificador deben ser las del entrenamiento, en el mismo orden
+    columns = list(columns)
+    if columns == list(feature_names):
+        return
+    missing = sorted(set(feature_names) - set(columns))
+    extra = sorted(set(columns) - set(feature_names))
+    if missing or extra:
+        raise ValueError(f"Los síntomas del vocabulario no son las columnas de los modelos: "
+                         f"faltan {missing[:10]}, sobran {extra[:10]}")
+    moved = next(i for i, (a, b) in enumerate(zip(columns, feature_names)) if a != b)
+    raise ValueError(f"Los síntomas del vocabulario están en otro orden que las columnas de los modelos "
+                     f"(posición {moved}: {columns[moved]!r} en lugar de {feature_names[moved]!r})")
+
+
+def accepts_sparse(estimator):
+    return type(estimator).__name__ in SPARSE_ESTIMATORS or getattr(estimator, 'accepts_sparse', False)
+
+
+# ================================
+# MOTOR DE INFERENCIA FUSIONADO
+# ================================
+
+class EnsembleEngine:
+    """Predice con los cinco especialistas ejecutando el preprocesamiento una sola vez.
+
+    `predict_model` de PyCaret repite el pipeline completo, arma un DataFrame de
+    salida y llama a `gc.collect()` por cada modelo. Aquí las transformaciones
+    compartidas se aplican una vez y la matriz resultante alimenta directamente
+    a los estimadores ya ajustados.
+    """
+
+    def __init__(self, pipelines, names=MODELS_NAMES, version=None, columns=None):
+        self.names = list(names)
+        # Identificador de los artefactos cargados (ver ModelRegistry.bundle_version)
+        self.version = version
+        self.feature_names = feature_names(pipelines[0])
+        # columns: síntomas del codificador que alimentará al motor (ver check_columns)
+        if columns is not None:
+            check_columns(columns, self.feature_names)
+
+        self.estimators = []
+        self._groups = {}       # firma del preprocesamiento -> transformaciones
+        self._group_of = []     # firma usada por cada modelo
+        model_classes = []
+        for pipeline in pipelines:
+            transformers, estimator, classes = split_pipeline(pipeline)
+            signature = tuple(name for name, _ in transformers)
+            self._groups.setdefault(signature, transformers)
+            self._group_of.append(signature)
+            self.estimators.append(estimator)
+            model_classes.append(classes)
+
+        # Vocabulario global de diagnósticos y posición de las clases de cada modelo en él
+        self.classes = np.asarray(sorted(set().union(*model_classes)), dtype=object)
+        class_index = {c: i for i, c in enumerate(self.classes)}
+        self.model_classes = model_classes
+        self.class_columns = [np.array([class_index[c] for c in classes]) for classes in model_classes]
+
+    @property
+    def n_models(self):
+        return len(self.estimators)
+
+    @functools.cached_property
+    def explainer(self):
+        # Tablas de contribución de cada especialista (explicacion.py), armadas con la
+        # primera explicación que se pide a este motor
+        from explicacion import BoardExplainer
+        return BoardExplainer(self)
+
+    def transform(self, X):
+        # Aplica cada preprocesamiento distinto una sola vez. Se conserva float64: con
+        # float32 KNN desempata distinto los vecinos equidistantes y cambia su voto.
+        # Las matrices dispersas y los arreglos deben traer las columnas en el orden de
+        # feature_names; un DataFrame se reordena por nombre.
+        if sparse.issparse(X):
+            return self._transform_sparse(X)
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(np.asarray(X), columns=self.feature_names)
+        elif list(X.columns) != self.feature_names:
+            X = X[self.feature_names]
+        matrices = {}
+        for signature, transformers in self._groups.items():
+            Xt = X
+            for _, step in transformers:
+                Xt = step.transform(Xt)
+            matrices[signature] = np.asarray(Xt, dtype=np.float64)
+        return [matrices[signature] for signature in self._group_of]
+
+    def _transform_sparse(self, X):
+        unsupported = {name for signature in self._groups for name in signature} - PASSTHROUGH_STEPS
+        if unsupported:
+            raise ValueError(f"Los pasos {sorted(unsupported)} no admiten matrices dispersas")
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        return [X] * self.n_models
+
+    def predict_proba_models(self, X):
+        # Probabilidades de cada modelo sobre sus propias clases. Con entrada dispersa
+        # solo se densifica (una vez) para los estimadores que lo requieren.
+        matrices = self.transform(X)
+        dense = {}
+        probas = []
+        for name, estimator, Xt in zip(self.names, self.estimators, matrices):
+            if sparse.issparse(Xt) and not accepts_sparse(estimator):
+                if id(Xt) not in dense:
+                    dense[id(Xt)] = Xt.toarray()
+                Xt = dense[id(Xt)]
+            with timed('specialist', model=name):
+                probas.append(estimator.predict_proba(Xt))
+        return probas
+
+    def predict_proba(self, X):
+        # Tensor (modelos x filas x clases) alineado al vocabulario global `classes`
+        return self.stack_probas(self.predict_proba_models(X))
+
+    def stack_probas(self, probas):
+        n_rows = probas[0].shape[0]
+        tensor = np.zeros((self.n_models, n_rows, len(self.classes)), dtype=np.float32)
+        for k, proba in enumerate(probas):
+            tensor[k][:, self.class_columns[k]] = proba
+        return tensor
+
+    def predict(self, X):
+        # Devuelve (etiquetas, confianzas), ambos con forma (modelos x filas).
+        # La etiqueta es el argmax de predict_proba, como `predict` en estos estimadores,
+        # y la confianza se redondea a 4 decimales igual que `prediction_score`.
+        return self.labels_scores(self.predict_proba_models(X))
+
+    def labels_scores(self, probas):
+        n_rows = probas[0].shape[0]
+        rows = np.arange(n_rows)
+        labels = np.empty((self.n_models, n_rows), dtype=object)
+        scores = np.empty((self.n_models, n_rows), dtype=np.float64)
+        for k, proba in enumerate(probas):
+            best = proba.argmax(axis=1)
+            labels[k] = self.model_classes[k][best]
+            scores[k] = np.round(proba[rows, best].astype(np.float64), 4)
+        return labels, scores
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from rutas import DATASET_FILE, DATASETS_DIR
+from codificador_sintomas import TARGET_COLUMN, from_bitset, read_symptom_dataset, to_bitset
+
+# ================================
+# CACHÉ TIPADA DEL DATASET AUMENTADO
+# ================================
+#
+# Uso:
+#   python preparar_dataset.py                  # convierte el CSV y precalcula la partición
+#   python preparar_dataset.py --min-count 50   # otra partición sobre la misma caché
+#
+# El CSV (377 columnas binarias que read_csv infiere como int64) se convierte una
+# sola vez en datasets/cache/:
+#   bits.npy     -> una fila por registro con los síntomas empaquetados en bits
+#   labels.npy   -> código del diagnóstico (int16) por fila
+#   meta.json    -> huella del CSV, síntomas, diagnósticos y registros por diagnóstico
+#   split_*.npz  -> filas de entrenamiento y prueba para cada (mínimo por diagnóstico,
+#                   tamaño de prueba, semilla), mismas que el train_test_split del notebook
+# Las matrices se abren con mmap; los notebooks pueden pedir directamente el
+# DataFrame uint8 con el diagnóstico categórico (DatasetCache.frame).
+
+CACHE_DIR = os.path.join(DATASETS_DIR, 'cache')
+FORMAT_VERSION = 1
+
+MIN_COUNT = 100
+TEST_SIZE = 0.2
+SEED = 42
+
+
+def dataset_fingerprint(path):
+    stat = os.stat(path)
+    return {'file': os.path.basename(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _write_json(data, path):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def build_cache(dataset=DATASET_FILE, cache_dir=CACHE_DIR):
+    X, y, symptoms = read_symptom_dataset(dataset)
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith('split_'):
+            os.remove(os.path.join(cache_dir, name))  # particiones de un CSV anterior
+    np.save(os.path.join(cache_dir, 'bits.npy'), to_bitset(X))
+    np.save(os.path.join(cache_dir, 'labels.npy'), y.cat.codes.to_numpy(dtype=np.int16))
+    meta = {
+        'version': FORMAT_VERSION,
+        'source': dataset_fingerprint(dataset),
+        'symptoms': list(symptoms),
+        'classes': [str(c) for c in y.cat.categories],
+        'counts': np.bincount(y.cat.codes.to_numpy(), minlength=len(y.cat.categories)).tolist(),
+        'n_rows': int(X.shape[0]),
+    }
+    # meta.json se escribe al final: sin él la caché se considera incompleta
+    _write_json(meta, os.path.join(cache_dir, 'meta.json'))
+    return meta
+
+
+class DatasetCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.symptoms = self.meta['symptoms']
+        self.classes = self.meta['classes']
+        self.counts = np.asarray(self.meta['counts'])
+        self.n_rows = self.meta['n_rows']
+        self.bits = np.load(os.path.join(cache_dir, 'bits.npy'), mmap_mode='r')
+        self.codes = np.load(os.path.join(cache_dir, 'labels.npy'), mmap_mode='r')
+
+    def _rows(self, rows):
+        return slice(None) if rows is None else np.asarray(rows)
+
+    # ---- datos ----
+
+    def labels(self, rows=None):
+        # Diagnósticos categóricos (todas las categorías, en orden alfabético)
+        return pd.Categorical.from_codes(np.asarray(self.codes[self._rows(rows)]), categories=self.classes)
+
+    def dense(self, rows=None):
+        return np.unpackbits(self.bits[self._rows(rows)], axis=1, count=len(self.symptoms))
+
+    def matrix(self, rows=None):
+        return from_bitset(self.bits[self._rows(rows)], len(self.symptoms))
+
+    def frame(self, rows=None, target=TARGET_COLUMN):
+        # DataFrame uint8 con el diagnóstico categórico, con el índice de filas del CSV
+        index = np.arange(self.n_rows) if rows is None else np.asarray(rows)
+        df = pd.DataFrame(self.dense(rows), columns=self.symptoms, index=index, copy=False)
+        df[target] = pd.Series(self.labels(rows), index=index).cat.remove_unused_categories()
+        return df
+
+    # ---- filtro de diagnósticos y partición ----
+
+    def class_filter(self, min_count=MIN_COUNT):
+        # Filas de los diagnósticos con al menos min_count registros
+        valid = np.flatnonzero(self.counts >= min_count)
+        return np.flatnonzero(np.isin(self.codes, valid))
+
+    def split(self, min_count=MIN_COUNT, test_size=TEST_SIZE, seed=SEED):
+        # (filas de entrenamiento, filas de prueba); se calcula una vez por combinación
+        path = os.path.join(self.cache_dir, f'split_{min_count}_{test_size}_{seed}.npz')
+        if os.path.exists(path):
+            with np.load(path) as split:
+                return split['train'], split['test']
+        from sklearn.model_selection import train_test_split   # solo al calcular una partición nueva
+        rows = self.class_filter(min_count)
+        # Estratificar por código equivale a estratificar por texto: las categorías están
+        # en orden alfabético, igual que np.unique sobre las etiquetas
+        train, test = train_test_split(rows, test_size=test_size, random_state=seed,
+                                       stratify=np.asarray(self.codes[rows]))
+        tmp = f'{path}.tmp.npz'
+        np.savez(tmp, train=train, test=test)
+        os.replace(tmp, path)
+        return train, test
+
+
+def is_current(dataset=DATASET_FILE, cache_dir=CACHE_DIR):
+    meta_file = os.path.join(cache_dir, 'meta.json')
+    if not os.path.exists(meta_file):
+        return False
+    with open(meta_file, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        return False
+    # Sin el CSV (p. ej. en el servidor) se usa la caché tal como está
+    return not os.path.exists(dataset) or meta['source'] == dataset_fingerprint(dataset)
+
+
+def open_cache(dataset=DATASET_FILE, cache_dir=CACHE_DIR, rebuild=False):
+    # Abre la caché y la reconstruye si falta o si el CSV cambió
+    if rebuild or not is_current(dataset, cache_dir):
+        build_cache(dataset, cache_dir)
+    return DatasetCache(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte el dataset aumentado en una caché tipada")
+    parser.add_argument('--dataset', default=DATASET_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="Registros mínimos por diagnóstico")
+    parser.add_argument('--test-size', type=float, default=TEST_SIZE)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruir aunque la caché esté al día")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = open_cache(args.dataset, args.cache_dir, args.rebuild)
+    train, test = data.split(args.min_count, args.test_size, args.seed)
+    n_classes = int((data.counts >= args.min_count).sum())
+    print(f"✅ Caché lista en {time.perf_counter() - started:.1f} s: {data.n_rows} registros, "
+          f"{len(data.symptoms)} síntomas, {data.bits.nbytes / 1e6:.1f} MB en bits.")
+    print(f"Partición (≥{args.min_count} registros): {n_classes} diagnósticos, "
+          f"{len(train)} entrenamiento / {len(test)} prueba.")
+
+
+if __name__ == '__main__':
+    main()
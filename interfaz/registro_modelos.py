@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rutas import MODELOS_DIR
+from motor_ensamble import EnsembleEngine, MODEL_FILES, MODELS_NAMES
+from artefactos import compact_path, has_compact, load_compact
+
+try:
+    import psutil
+except ImportError:  # sin psutil no se reporta la RSS
+    psutil = None
+
+# ================================
+# REGISTRO DE MODELOS CON CARGA PARALELA
+# ================================
+#
+# Los cinco pipelines se cargan en paralelo en un pool de hilos. La interfaz puede
+# diagnosticar con los especialistas que ya estén listos mientras los más lentos
+# (KNN, XGBoost) terminan de cargar; la junta vota entonces con N de M modelos.
+
+LOADING, READY, FAILED = 'cargando', 'listo', 'error'
+AUTO = 'auto'
+
+
+def current_rss():
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def import_pycaret():
+    import pycaret.classification  # noqa: F401
+
+
+def load_pycaret_model(path):
+    from pycaret.classification import load_model
+    return load_model(path, verbose=False)
+
+
+def load_model_artifact(path):
+    # Usa el artefacto compacto si fue exportado (artefactos.py); si no, el pipeline de PyCaret
+    models_dir, file = os.path.split(path)
+    if has_compact(file, models_dir):
+        return load_compact(compact_path(file, models_dir))
+    return load_pycaret_model(path)
+
+
+def artifact_mb(path):
+    models_dir, file = os.path.split(path)
+    if has_compact(file, models_dir):
+        folder = compact_path(file, models_dir)
+        return sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)) / 1e6
+    if os.path.exists(f'{path}.pkl'):
+        return os.path.getsize(f'{path}.pkl') / 1e6
+    return None
+
+
+def artifact_fingerprint(path):
+    # Tamaño y fecha de modificación de los archivos del modelo: cambia si se reentrena o
+    # reexporta, y es igual en todos los procesos que leen la misma carpeta
+    models_dir, file = os.path.split(path)
+    if has_compact(file, models_dir):
+        folder = compact_path(file, models_dir)
+        files = [os.path.join(folder, f) for f in sorted(os.listdir(folder))]
+    else:
+        files = [f'{path}.pkl']
+    return [(os.path.basename(f), os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in files if os.path.exists(f)]
+
+
+class ModelRegistry:
+    def __init__(self, model_files=MODEL_FILES, names=MODELS_NAMES, models_dir=MODELOS_DIR,
+                 loader=load_model_artifact, prepare=AUTO, max_workers=None, columns=None):
+        self.model_files = list(model_files)
+        self.names = list(names)
+        self.models_dir = models_dir
+        # Síntomas del codificador de quien usa los motores; se validan contra los modelos
+        self.columns = list(columns) if columns is not None else None
+        self.loader = loader
+        if prepare == AUTO:
+            # PyCaret solo hace falta si algún modelo no tiene artefacto compacto
+            compact = loader is load_model_artifact and all(has_compact(f, models_dir) for f in self.model_files)
+            prepare = None if compact else import_pycaret
+        self.prepare = prepare
+        self.max_workers = max_workers or len(self.model_files)
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._models = {}
+        self._status = {name: LOADING for name in self.names}
+        self._stats = {name: {} for name in self.names}
+        self._fingerprints = {}
+        self._engines = {}
+        self._executor = None
+        self._prepared = threading.Event()
+        self.started_at = None
+        self.prepare_s = None
+
+    # ---- carga ----
+
+    def start(self):
+        if self._executor is not None:
+            return self
+        self.started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='carga-modelo')
+        self._executor.submit(self._prepare)
+        for name, file in zip(self.names, self.model_files):
+            self._executor.submit(self._load, name, file)
+        self._executor.shutdown(wait=False)
+        return self
+
+    def _prepare(self):
+        # La importación de PyCaret se mide aparte para no atribuirla al primer modelo
+        start = time.perf_counter()
+        try:
+            if self.prepare is not None:
+                self.prepare()
+        finally:
+            self.prepare_s = time.perf_counter() - start
+            self._prepared.set()
+
+    def _load(self, name, file):
+        self._prepared.wait()
+        path = os.path.join(self.models_dir, file)
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            model = self.loader(path)
+        except Exception as e:
+            with self._changed:
+                self._status[name] = FAILED
+                self._stats[name] = {'error': str(e)}
+                self._changed.notify_all()
+            return
+
+        elapsed = time.perf_counter() - start
+        rss_after = current_rss()
+        fingerprint = artifact_fingerprint(path)
+        with self._changed:
+            self._models[name] = model
+            self._fingerprints[name] = fingerprint
+            self._status[name] = READY
+            self._stats[name] = {
+                'load_s': elapsed,
+                'ready_after_s': time.perf_counter() - self.started_at,
+                'file_mb': artifact_mb(path),
+                # Con cargas simultáneas el delta de RSS es aproximado
+                'rss_delta_mb': (rss_after - rss_before) / 1e6 if rss_before is not None else None,
+            }
+            self._changed.notify_all()
+
+    # ---- estado ----
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def ready(self):
+        # Especialistas listos, en el orden de la junta
+        with self._lock:
+            return [name for name in self.names if self._status[name] == READY]
+
+    def pending(self):
+        with self._lock:
+            return [name for name in self.names if self._status[name] == LOADING]
+
+    def wait(self, timeout=None, any_ready=False):
+        # Espera a que termine la carga de todos los modelos (o del primero con any_ready)
+        def done():
+            if any_ready and any(s == READY for s in self._status.values()):
+                return True
+            return all(s != LOADING for s in self._status.values())
+
+        with self._changed:
+            return self._changed.wait_for(done, timeout)
+
+    def join(self):
+        # Espera la carga y a que terminen los hilos del pool (p. ej. antes de os.fork:
+        # un hilo vivo podría tener tomado el lock del registro en el proceso hijo)
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def measure_sizes(self):
+        # Tamaño serializado de cada objeto ya cargado (costoso: solo para diagnóstico)
+        with self._lock:
+            models = dict(self._models)
+        for name, model in models.items():
+            size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+            with self._lock:
+                self._stats[name]['unpickled_mb'] = size / 1e6
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(values, status=self._status[name]) for name, values in self._stats.items()}
+
+    def bundle_version(self, names=None):
+        # Hash corto de los artefactos cargados (por defecto, los listos)
+        names = self.ready() if names is None else list(names)
+        with self._lock:
+            identity = [(name, self._fingerprints.get(name)) for name in names]
+        return hashlib.blake2b(json.dumps(identity).encode('utf-8'), digest_size=8).hexdigest()
+
+    def artifacts_version(self):
+        # La bundle_version que tendrá la junta completa, leída de los archivos sin esperar la carga
+        identity = [(name, artifact_fingerprint(os.path.join(self.models_dir, file)))
+                    for name, file in zip(self.names, self.model_files)]
+        return hashlib.blake2b(json.dumps(identity).encode('utf-8'), digest_size=8).hexdigest()
+
+    # ---- inferencia ----
+
+    def engine(self):
+        # Motor con los especialistas listos; se reconstruye solo cuando cambia ese conjunto
+        ready = tuple(self.ready())
+        if not ready:
+            return None
+        engine = self._engines.get(ready)
+        if engine is None:
+            with self._lock:
+                pipelines = [self._models[name] for name in ready]
+            engine = EnsembleEngine(pipelines, ready, version=self.bundle_version(ready), columns=self.columns)
+            self._engines = {ready: engine}
+        return engine
+
+
+def format_stats(stats):
+    lines = [f"{'Modelo':<12}{'estado':<10}{'carga (s)':>10}{'listo a (s)':>12}{'archivo MB':>12}{'objeto MB':>11}{'ΔRSS MB':>10}"]
+
+    def fmt(value, width, digits=2):
+        return f"{value:>{width}.{digits}f}" if isinstance(value, (int, float)) else f"{'-':>{width}}"
+
+    for name, s in stats.items():
+        lines.append(f"{name:<12}{s['status']:<10}{fmt(s.get('load_s'), 10)}{fmt(s.get('ready_after_s'), 12)}"
+                     f"{fmt(s.get('file_mb'), 12, 1)}{fmt(s.get('unpickled_mb'), 11, 1)}{fmt(s.get('rss_delta_mb'), 10, 1)}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Carga los modelos de la junta y reporta tiempos y memoria")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos de carga (1 = secuencial, RSS exacta)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(max_workers=args.workers).start()
+    registry.wait()
+    total = time.perf_counter() - registry.started_at
+    registry.measure_sizes()
+    print(f"Importación de PyCaret: {registry.prepare_s:.2f} s")
+    print(format_stats(registry.stats()))
+    print(f"Carga total: {total:.2f} s")
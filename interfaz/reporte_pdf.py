@@ -0,0 +1,261 @@
+import functools
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from rutas import INSUMOS_DIR
+from metricas import timed
+
+# ================================
+# REPORTES PDF DEL DIAGNÓSTICO
+# ================================
+#
+# El encabezado (logo y título), el pie de página y las fuentes se preparan una sola
+# vez en ReportTemplate; cada reporte solo escribe los datos del paciente. Los
+# reportes pueden generarse en un hilo de fondo (la interfaz no espera al PDF para
+# mostrar los resultados) o en bloque, como un PDF de varias páginas o un zip con un
+# PDF por paciente para el diagnóstico por lotes. fpdf (con fontTools) se importa con
+# el primer reporte, no al importar este módulo.
+
+LOGO_FILE = os.path.join(INSUMOS_DIR, 'logo_hospital.jpg')
+TITLE = "Reporte de Diagnóstico"
+FONT = 'Helvetica'      # fuente estándar del PDF: no hay que incrustar archivos de fuentes
+MISSING = '-'
+
+# Anchos de la tabla de especialistas (mm)
+COLUMNS = (("Especialista", 60), ("Diagnóstico", 90), ("Confianza (%)", 30))
+
+
+def latin1(text):
+    # Las fuentes estándar solo cubren latin-1; el resto de caracteres se reemplaza
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+
+def report_data(patient, symptoms_es, diagnosis_es, description, specialists, consensus=None, explanation=None):
+    # patient: dict con name, id, age, sex, urgency (los que falten se muestran como '-').
+    # specialists: [(especialista, diagnóstico en español, confianza 0-1)].
+    # explanation: [(especialista, diagnóstico en español, [síntomas en español])] (explicacion.py).
+    return {
+        'patient': dict(patient),
+        'symptoms': list(symptoms_es),
+        'diagnosis': diagnosis_es,
+        'description': description,
+        'consensus': consensus,
+        'specialists': sorted(([n, d, float(c)] for n, d, c in specialists), key=lambda row: -row[2]),
+        'explanation': [[n, d, list(symptoms)] for n, d, symptoms in explanation or [] if symptoms],
+    }
+
+
+def wrap(pdf, text, width):
+    # Corte de líneas por palabras con la fuente actual. multi_cell vuelve a medir la
+    # línea completa en cada carácter y se llevaba ~80% del tiempo de cada reporte.
+    space = pdf.get_string_width(' ')
+    lines, current, current_width = [], [], 0.0
+    for word in text.split():
+        word_width = pdf.get_string_width(word)
+        if current and current_width + space + word_width > width:
+            lines.append(' '.join(current))
+            current, current_width = [], 0.0
+        current_width += word_width + (space if current else 0.0)
+        current.append(word)
+    if current:
+        lines.append(' '.join(current))
+    return lines
+
+
+@functools.lru_cache(maxsize=None)
+def report_pdf_class():
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    class ReportPDF(FPDF):
+        def __init__(self, template):
+            super().__init__()
+            self.template = template
+            self.set_auto_page_break(auto=True, margin=20)
+
+        def header(self):
+            if self.template.logo is not None:
+                self.image(self.template.logo, x=10, y=8, h=14)
+            self.set_font(FONT, 'B', 16)
+            self.cell(0, 10, self.template.title, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self.ln(6)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font(FONT, 'I', 8)
+            self.cell(0, 10, f"Página {self.page_no()}", align='C')
+
+    return ReportPDF
+
+
+class ReportTemplate:
+    def __init__(self, logo_file=LOGO_FILE, title=TITLE):
+        # El logo se lee una vez; en un PDF de varias páginas se incrusta una sola vez
+        self.logo = None
+        if logo_file and os.path.exists(logo_file):
+            with open(logo_file, 'rb') as f:
+                self.logo = io.BytesIO(f.read())
+        self.title = latin1(title)
+
+    def new_document(self):
+        pdf = report_pdf_class()(self)
+        pdf.set_title(self.title)
+        return pdf
+
+    def add_report(self, pdf, data):
+        from fpdf.enums import XPos, YPos
+        pdf.add_page()
+        patient = data['patient']
+
+        def field(key):
+            value = patient.get(key)
+            return MISSING if value in (None, '') else value
+
+        def line(text, h=8):
+            pdf.cell(0, h, latin1(text), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+        pdf.set_font(FONT, size=12)
+        line(f"Nombre: {field('name')}")
+        line(f"ID: {field('id')}")
+        line(f"Edad: {field('age')}   Sexo: {field('sex')}")
+        line(f"Nivel de urgencia: {field('urgency')}")
+        pdf.ln(4)
+
+        pdf.set_font(FONT, 'B', 12)
+        rule = {True: " (consenso)", False: " (mayor confianza)"}.get(data.get('consensus'), '')
+        line(f"Diagnóstico final: {data['diagnosis']}{rule}")
+        pdf.set_font(FONT, size=11)
+        for text in wrap(pdf, latin1(f"Descripción: {data['description']}"), pdf.epw):
+            line(text, h=7)
+        pdf.ln(4)
+
+        pdf.set_font(FONT, size=12)
+        line("Síntomas seleccionados:")
+        for symptom in data['symptoms']:
+            line(f"- {symptom}", h=7)
+        pdf.ln(4)
+
+        pdf.set_font(FONT, 'B', 12)
+        line("Diagnósticos por Especialista:")
+        pdf.set_font(FONT, size=11)
+        pdf.set_fill_color(220, 220, 220)
+        for title, width in COLUMNS:
+            pdf.cell(width, 9, latin1(title), border=1, fill=True)
+        pdf.ln()
+        for name, diagnosis, confidence in data['specialists']:
+            pdf.cell(COLUMNS[0][1], 9, latin1(name), border=1)
+            pdf.cell(COLUMNS[1][1], 9, latin1(diagnosis), border=1)
+            pdf.cell(COLUMNS[2][1], 9, f"{round(confidence * 100)}%", border=1)
+            pdf.ln()
+
+        if data.get('explanation'):
+            pdf.ln(4)
+            pdf.set_font(FONT, 'B', 12)
+            line("Síntomas que más pesaron en cada voto:")
+            pdf.set_font(FONT, size=11)
+            for name, diagnosis, symptoms in data['explanation']:
+                for text in wrap(pdf, latin1(f"- {name} ({diagnosis}): {', '.join(symptoms)}"), pdf.epw):
+                    line(text, h=7)
+
+    # ---- salida ----
+
+    @timed('pdf')
+    def render(self, data):
+        pdf = self.new_document()
+        self.add_report(pdf, data)
+        return bytes(pdf.output())
+
+    def render_many(self, reports):
+        # Un solo PDF con una página (o más) por paciente
+        pdf = self.new_document()
+        for data in reports:
+            self.add_report(pdf, data)
+        return bytes(pdf.output())
+
+
+def report_filename(data, index, used=None):
+    # used: nombres ya escritos en el zip. Un ID repetido recibe el número de fila (y un
+    # contador si aun así choca) en lugar de una entrada duplicada que se sobrescribe al extraer
+    patient_id = str(data['patient'].get('id') or index)
+    safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in patient_id)
+    name = f"diagnostico_{safe}.pdf"
+    if used is not None:
+        suffix = 0
+        while name in used:
+            name = f"diagnostico_{safe}_{index}.pdf" if not suffix else f"diagnostico_{safe}_{index}_{suffix}.pdf"
+            suffix += 1
+        used.add(name)
+    return name
+
+
+_process_template = None
+
+
+def _render_in_process(reports):
+    # Cada proceso del pool arma su plantilla una sola vez
+    global _process_template
+    if _process_template is None:
+        _process_template = ReportTemplate()
+    return [_process_template.render(data) for data in reports]
+
+
+def write_zip(reports, output, template=None, workers=1, chunk=64):
+    # Zip con un PDF por paciente; con workers > 1 se renderiza en varios procesos
+    reports = list(reports)
+    template = template or ReportTemplate()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if workers <= 1:
+            rendered = (template.render(data) for data in reports)
+        else:
+            blocks = [reports[i:i + chunk] for i in range(0, len(reports), chunk)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                rendered = [pdf for block in executor.map(_render_in_process, blocks) for pdf in block]
+        used = set()
+        for i, (data, pdf) in enumerate(zip(reports, rendered)):
+            archive.writestr(report_filename(data, i, used), pdf)
+    return output
+
+
+class ReportArchive:
+    # Acumula reportes por bloques para el diagnóstico por lotes: .zip (un PDF por
+    # paciente, escrito a medida que llegan) o .pdf (un documento de varias páginas)
+    def __init__(self, path, template=None):
+        self.path = path
+        self.template = template or ReportTemplate()
+        self.count = 0
+        self._names = set()
+        if path.endswith('.zip'):
+            self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+            self._pdf = None
+        else:
+            self._zip = None
+            self._pdf = self.template.new_document()
+
+    def add(self, reports):
+        for data in reports:
+            if self._zip is not None:
+                self._zip.writestr(report_filename(data, self.count, self._names), self.template.render(data))
+            else:
+                self.template.add_report(self._pdf, data)
+            self.count += 1
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            with open(self.path, 'wb') as f:
+                f.write(bytes(self._pdf.output()))
+
+
+class BackgroundRenderer:
+    # Genera los PDF en un hilo aparte; submit devuelve un Future con los bytes
+    def __init__(self, template=None, max_workers=1):
+        self.template = template or ReportTemplate()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reporte-pdf')
+        # fpdf se importa en el hilo de fondo mientras la interfaz dibuja el formulario
+        self.executor.submit(report_pdf_class)
+
+    def submit(self, data):
+        return self.executor.submit(self.template.render, data)
@@ -0,0 +1,18 @@
+import os
+
+# ================================
+# RUTAS DEL PROYECTO
+# ================================
+
+# Directorio de la interfaz y directorio raíz del repositorio
+INTERFAZ_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(INTERFAZ_DIR)
+
+INSUMOS_DIR = os.path.join(PARENT_DIR, 'insumos')
+DATASETS_DIR = os.path.join(PARENT_DIR, 'datasets')
+DATASET_FILE = os.path.join(DATASETS_DIR, 'Final_Augmented_dataset_Diseases_and_Symptoms.csv')
+
+# Los modelos pueden apuntarse a otra carpeta (p. ej. para benchmarks) con MODELOS_DIR
+MODELOS_DIR = os.environ.get('MODELOS_DIR', os.path.join(PARENT_DIR, 'modelos'))
+# Manifiesto que entrenar_modelos.py escribe junto a los modelos (métricas de validación)
+MANIFEST_FILE = 'manifiesto_entrenamiento.json'
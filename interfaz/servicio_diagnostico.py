@@ -0,0 +1,411 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from registro_modelos import ModelRegistry
+from consenso import board_decision, load_rule, min_votes_for
+from cache_predicciones import CACHE_DB, PredictionCache, prediction_key, predict_board
+from codificador_sintomas import SymptomEncoder
+from diferencial import VOTING_METHODS
+from vocabulario import load_vocabulary
+from metricas import METRICS
+from microlotes import MAX_BATCH as MICROBATCH_MAX, MAX_WAIT_MS, MicroBatcher
+
+# ================================
+# SERVICIO HTTP DE DIAGNÓSTICO
+# ================================
+#
+# Uso:
+#   python servicio_diagnostico.py --port 8000 --workers 4
+#   python servicio_diagnostico.py --port 8000 --processes 8   # varios procesos, modelos compartidos
+#   python servicio_diagnostico.py --max-batch 64 --max-wait-ms 2  # microlotes (por defecto desactivados)
+#
+#   GET  /health           estado de carga de los especialistas
+#   GET  /metrics          latencias, conteos y errores por etapa (texto de Prometheus)
+#   POST /diagnose         {"symptoms": ["fever", "tos", ...]}
+#                          opcional: "top_k": 5, "voting": "mean|weighted|geometric",
+#                          "weights": {"KNN": 2, ...} (diagnóstico diferencial),
+#                          "explain": true (síntomas que pesaron en cada voto, explicacion.py)
+#   POST /diagnose/batch   {"patients": [{"id": "123", "symptoms": [...]}, ...]}, opcional "explain";
+#                          un paciente sin síntomas reconocidos recibe {"id", "error", "unknown_symptoms"}
+#
+# Usa el mismo registro de modelos, regla de votación, caché y traducciones que
+# interfaz_final_2.py, sin Streamlit. El servidor es asyncio puro (HTTP/1.1 con
+# keep-alive); la evaluación de los modelos corre en un pool de hilos para que el
+# bucle de eventos siga atendiendo conexiones mientras se predice.
+#
+# Con --processes N el proceso padre carga vocabulario y modelos una sola vez, abre el
+# socket y crea N procesos con fork que aceptan conexiones del mismo socket. Los hijos
+# no vuelven a cargar nada: los arreglos de los artefactos compactos están en mmap
+# (páginas del archivo compartidas por todos) y el resto del heap del padre (booster de
+# XGBoost, librerías importadas) se comparte copy-on-write. gc.freeze() evita que el
+# recolector de basura de cada hijo toque esos objetos y copie sus páginas. Cada hijo
+# abre su propia conexión a la caché SQLite y lleva sus propias métricas.
+#
+# Con --max-batch N las solicitudes a /diagnose que no están en caché pasan por un
+# planificador de microlotes (microlotes.py): las que llegan casi al mismo tiempo se
+# predicen juntas. Un lote no puede tener más solicitudes que hilos esperándolo, así
+# que el tamaño efectivo es min(N, --workers).
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH = 10_000
+READY_TIMEOUT_S = 30.0
+
+
+class TextResponse(str):
+    # Respuesta en texto plano en lugar de JSON (p. ej. /metrics)
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_symptoms(value):
+    # Lista de síntomas o cadena separada por ';'
+    if isinstance(value, str):
+        return [s for s in value.split(';') if s.strip()]
+    if isinstance(value, list) and all(isinstance(s, str) for s in value):
+        return value
+    raise RequestError(HTTPStatus.BAD_REQUEST, "'symptoms' debe ser una lista de cadenas o una cadena separada por ';'")
+
+
+# ================================
+# LÓGICA DE DIAGNÓSTICO
+# ================================
+
+class DiagnosisService:
+    def __init__(self, registry=None, cache=None, ready_timeout=READY_TIMEOUT_S, rule=None, batch_limits=None):
+        vocabulary = load_vocabulary()
+        self.diagnosis_translation = vocabulary.diagnosis_translation()
+        self.descriptions = vocabulary.descriptions('es')
+        self.symptom_translation = vocabulary.symptom_translation()
+        self.encoder = SymptomEncoder(vocabulary.symptoms, self.symptom_translation)
+        self.registry = registry or ModelRegistry(columns=vocabulary.symptoms).start()
+        self.cache = cache or PredictionCache(db_path=CACHE_DB)
+        self.ready_timeout = ready_timeout
+        self.rule = rule or load_rule()
+        # (max_batch, max_wait_ms) del planificador de microlotes; None = un predict por solicitud.
+        # El planificador (y su hilo) se crea con la primera predicción, en el proceso que atiende.
+        self.batch_limits = batch_limits
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+    @property
+    def batcher(self):
+        if self.batch_limits is None:
+            return None
+        with self._batcher_lock:
+            if self._batcher is None:
+                self._batcher = MicroBatcher(*self.batch_limits)
+            return self._batcher
+
+    def _engine(self):
+        self.registry.wait(timeout=self.ready_timeout, any_ready=True)
+        engine = self.registry.engine()
+        if engine is None:
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, "Los modelos de la junta aún no están disponibles")
+        return engine
+
+    def _min_votes(self, engine):
+        return min_votes_for(engine.n_models, self.rule['min_votes'], self.rule['board_size'])
+
+    def _translate(self, diagnosis):
+        return self.diagnosis_translation.get(diagnosis, diagnosis)
+
+    def health(self):
+        return {
+            'status': 'ok' if not self.registry.pending() and self.registry.ready() else 'loading',
+            'models': self.registry.status(),
+            'version': self.registry.bundle_version(),
+            'cache': self.cache.stats(),
+            'rule': self.rule,
+            'batching': self._batcher.stats() if self._batcher is not None else None,
+        }
+
+    def metrics(self):
+        # Estado de la caché y de los especialistas al momento de la lectura
+        for name, value in self.cache.stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                METRICS.set('prediction_cache', value, (('field', name),))
+        METRICS.set('specialists_ready', len(self.registry.ready()))
+        return TextResponse(METRICS.render())
+
+    def _response(self, board, unknown):
+        return {
+            'specialists': [
+                {'name': name, 'diagnosis': label, 'diagnosis_es': self._translate(label), 'confidence': score}
+                for name, label, score in zip(board['names'], board['labels'], board['scores'])
+            ],
+            'diagnosis': board['final'],
+            'diagnosis_es': self._translate(board['final']),
+            'consensus': board['consensus'],
+            'description_es': self.descriptions.get(board['final'], "Descripción no disponible."),
+            'unknown_symptoms': unknown,
+        }
+
+    def _explanation(self, engine, cols, labels):
+        # Síntomas que más pesaron en el voto de cada especialista (None si no se puede explicar)
+        return [None if entry is None else {
+            'name': entry['name'],
+            'diagnosis': entry['label'],
+            'method': entry['method'],
+            'symptoms': [{'symptom': s, 'symptom_es': self.symptom_translation.get(s, s), 'weight': w}
+                         for s, w in entry['symptoms']],
+        } for entry in engine.explainer.explain(cols, labels)]
+
+    def diagnose(self, payload):
+        symptoms = parse_symptoms(payload.get('symptoms'))
+        cols, unknown = self.encoder.indices(symptoms)
+        if not cols:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Ningún síntoma reconocido")
+        top_k = payload.get('top_k', 0)
+        voting = payload.get('voting', 'mean')
+        weights = payload.get('weights')
+        explain = payload.get('explain', False)
+        if not isinstance(explain, bool):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'explain' debe ser true o false")
+        if not isinstance(top_k, int) or top_k < 0:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'top_k' debe ser un entero no negativo")
+        if voting not in VOTING_METHODS:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'voting' debe ser uno de {list(VOTING_METHODS)}")
+        engine = self._engine()
+        min_votes = self._min_votes(engine)
+        threshold = self.rule['threshold']
+
+        key = prediction_key(cols, engine.version, min_votes, threshold, top_k, voting, weights)
+        board = self.cache.get(key)
+        cached = board is not None
+        if not cached:
+            predict = predict_board if self.batcher is None else self.batcher.predict_board
+            try:
+                board = predict(engine, self.encoder.encode_one(symptoms), min_votes, threshold,
+                                top_k=top_k, voting=voting, weights=weights)
+            except ValueError as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+            self.cache.put(key, board)
+        response = dict(self._response(board, unknown), cached=cached)
+        if 'differential' in board:
+            response['differential'] = [{'diagnosis': d, 'diagnosis_es': self._translate(d), 'score': p}
+                                        for d, p in board['differential']]
+        if explain:
+            response['explanation'] = self._explanation(engine, cols, board['labels'])
+        return response
+
+    def diagnose_batch(self, payload):
+        patients = payload.get('patients')
+        if not isinstance(patients, list) or not patients:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'patients' debe ser una lista no vacía")
+        if len(patients) > MAX_BATCH:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Máximo {MAX_BATCH} pacientes por lote")
+        symptom_lists = [parse_symptoms(p.get('symptoms') if isinstance(p, dict) else None) for p in patients]
+        explain = payload.get('explain', False)
+        if not isinstance(explain, bool):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'explain' debe ser true o false")
+
+        # Igual que /diagnose, un paciente sin ningún síntoma reconocido no se predice
+        # (sería un vector de ceros): recibe una entrada de error y no entra en la votación
+        indices = [self.encoder.indices(symptoms) for symptoms in symptom_lists]
+        valid = [i for i, (cols, _) in enumerate(indices) if cols]
+        boards, engine = {}, None
+        if valid:
+            engine = self._engine()
+            # Todo el lote en una sola matriz: un predict_proba por especialista
+            X, _ = self.encoder.encode([symptom_lists[i] for i in valid])
+            labels, scores = engine.predict(X)
+            final, by_consensus = board_decision(labels, scores, self._min_votes(engine), self.rule['threshold'])
+            for j, i in enumerate(valid):
+                boards[i] = {
+                    'names': engine.names,
+                    'labels': [str(label) for label in labels[:, j]],
+                    'scores': [float(score) for score in scores[:, j]],
+                    'final': str(final[j]),
+                    'consensus': bool(by_consensus[j]),
+                }
+
+        results = []
+        for i, patient in enumerate(patients):
+            cols, unknown = indices[i]
+            if i not in boards:
+                results.append({'id': patient.get('id'), 'error': "Ningún síntoma reconocido", 'unknown_symptoms': unknown})
+                continue
+            result = dict(self._response(boards[i], unknown), id=patient.get('id'))
+            if explain:
+                result['explanation'] = self._explanation(engine, cols, boards[i]['labels'])
+            results.append(result)
+        return {'results': results}
+
+
+# ================================
+# SERVIDOR HTTP (asyncio)
+# ================================
+
+class DiagnosisServer:
+    def __init__(self, service, workers=4):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='diagnostico')
+        self.routes = {
+            ('GET', '/health'): service.health,
+            ('GET', '/metrics'): service.metrics,
+            ('POST', '/diagnose'): service.diagnose,
+            ('POST', '/diagnose/batch'): service.diagnose_batch,
+        }
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                method, path, version = lines[0].split(' ', 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Cuerpo demasiado grande"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                route = path.split('?', 1)[0]
+                status, payload = await self._dispatch(method, route, body)
+                METRICS.inc('http_requests_total', (('route', route if (method, route) in self.routes else 'otra'),
+                                                    ('status', status.value)))
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            known = any(route_path == path for _, route_path in self.routes)
+            status = HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND
+            return status, {'error': status.phrase}
+        try:
+            args = ()
+            if method == 'POST':
+                try:
+                    payload = json.loads(body or b'{}')
+                except json.JSONDecodeError:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, "JSON inválido")
+                if not isinstance(payload, dict):
+                    raise RequestError(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON")
+                args = (payload,)
+            # La predicción es CPU: se ejecuta fuera del bucle de eventos
+            loop = asyncio.get_running_loop()
+            return HTTPStatus.OK, await loop.run_in_executor(self.executor, handler, *args)
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+
+    async def _send(self, writer, status, payload, keep_alive):
+        if isinstance(payload, TextResponse):
+            body, content_type = payload.encode('utf-8'), payload.content_type
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host=None, port=None, sock=None):
+        # sock: socket ya abierto (lo comparten los procesos del modo multiproceso)
+        if sock is not None:
+            server = await asyncio.start_server(self.handle, sock=sock)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"🩺 Servicio de diagnóstico en http://{host}:{port} ({self.executor._max_workers} hilos)")
+        async with server:
+            await server.serve_forever()
+
+
+def serve_processes(service, host, port, processes, workers):
+    if not hasattr(os, 'fork'):
+        raise SystemExit("❌ --processes requiere os.fork (Linux o macOS)")
+    # Todo lo compartido se carga antes del fork, sin hilos vivos
+    service.registry.join()
+    engine = service.registry.engine()
+    if engine is None:
+        raise SystemExit("❌ No fue posible cargar los modelos de la junta médica.")
+    engine.explainer    # tablas de explicación, también compartidas con los hijos
+    sock = socket.create_server((host, port), backlog=1024)
+    gc.freeze()
+
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            # La conexión SQLite del padre no se puede usar después de fork
+            service.cache = PredictionCache(db_path=CACHE_DB)
+            try:
+                asyncio.run(DiagnosisServer(service, workers).serve(sock=sock))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    print(f"🩺 Servicio de diagnóstico en http://{host}:{port} ({processes} procesos x {workers} hilos, "
+          f"PID padre {os.getpid()})")
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de diagnóstico de la junta médica")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4, help="Hilos para evaluar los modelos")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Procesos que atienden peticiones; los modelos se cargan una vez y se comparten")
+    parser.add_argument('--max-batch', type=int, default=0,
+                        help=f"Filas máximas por microlote, p. ej. {MICROBATCH_MAX} (0 = sin microlotes)")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="Espera máxima de una solicitud antes de cerrar su microlote")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    batching = args.max_batch > 0
+    service = DiagnosisService(batch_limits=(args.max_batch, args.max_wait_ms) if batching else None)
+    if args.processes > 1:
+        serve_processes(service, args.host, args.port, args.processes, args.workers)
+        return
+    server = DiagnosisServer(service, workers=args.workers)
+    print(f"Vocabulario listo en {time.perf_counter() - started:.2f} s; los modelos cargan en segundo plano")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+# ================================
+# TIEMPOS DE RENDER POR SECCIÓN
+# ================================
+#
+# Streamlit vuelve a ejecutar el script completo en cada interacción. RenderTimer
+# mide cuánto tarda cada sección de una ejecución para mostrarlo en el panel de
+# depuración de la interfaz.
+
+
+class RenderTimer:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sections = {}
+        self.cached = {}
+
+    @contextmanager
+    def section(self, name, cached=None):
+        # cached indica si la sección se sirvió desde caché (se muestra en el panel)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + (time.perf_counter() - start) * 1000
+            if cached is not None:
+                self.cached[name] = cached
+
+    def mark(self, name, cached=None):
+        # Tiempo desde el inicio de la ejecución (p. ej. carga de recursos cacheados)
+        self.sections[name] = (time.perf_counter() - self.started_at) * 1000
+        if cached is not None:
+            self.cached[name] = cached
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def rows(self):
+        rows = [{'Sección': name, 'ms': round(ms, 2), 'Caché': self.cached.get(name, '')}
+                for name, ms in self.sections.items()]
+        rows.append({'Sección': 'Total de la ejecución', 'ms': round(self.total_ms(), 2), 'Caché': ''})
+        return rows
@@ -1,70 +1,260 @@
+import argparse
+import hashlib
 import json
-from deep_translator import GoogleTranslator
-
-# Leemos los síntomas
-with open('lista_sintomas.txt', 'r') as f:
-    symptoms_list = eval(f.read())
-
-# Leemos los diagnósticos (solo primeros 400)
-with open('diagnosticos.txt', 'r') as f:
-    diagnosis_list = eval(f.read())
-#diagnosis_list = diagnosis_list[:400]
-
-# Leemos las descripciones originales de Wikipedia (en inglés)
-with open('descripcion_diagnosticos.json', 'r') as f:
-    diagnosis_descriptions = json.load(f)
-
-# ==========================================
-# Función general de traducción controlada
-# ==========================================
-
-def translate_list(items, src='en', dest='es'):
-    translation_dict = {}
-    for item in items:
-        try:
-            translated = GoogleTranslator(source=src, target=dest).translate(item)
-            translation_dict[item] = translated.capitalize()
-        except Exception as e:
-            print(f"Error al traducir '{item}': {e}")
-            translation_dict[item] = item
-    return translation_dict
-
-# ==========================================
-# Traducción de síntomas y diagnósticos
-# ==========================================
-
-print("Traduciendo síntomas...")
-symptom_translation = translate_list(symptoms_list)
-
-print("Traduciendo diagnósticos...")
-diagnosis_translation = translate_list(diagnosis_list)
-
-# ==========================================
-# Traducción de descripciones de Wikipedia
-# ==========================================
-
-print("Traduciendo descripciones de diagnósticos...")
-diagnosis_descriptions_es = {}
-
-for diag_key, description_en in diagnosis_descriptions.items():
-    try:
-        translated_desc = GoogleTranslator(source='en', target='es').translate(description_en)
-        diagnosis_descriptions_es[diag_key] = translated_desc
-    except Exception as e:
-        print(f"Error al traducir descripción de '{diag_key}': {e}")
-        diagnosis_descriptions_es[diag_key] = description_en  # fallback al inglés
-
-# ==========================================
-# Guardado de archivos finales
-# ==========================================
-
-with open('sintomas_traducidos.json', 'w') as f:
-    json.dump(symptom_translation, f, indent=2, ensure_ascii=False)
-
-with open('diagnosticos_traducidos.json', 'w') as f:
-    json.dump(diagnosis_translation, f, indent=2, ensure_ascii=False)
-
-with open('descripcion_diagnosticos_traducidos.json', 'w') as f:
-    json.dump(diagnosis_descriptions_es, f, indent=2, ensure_ascii=False)
-
-print("✅ Traducción completa guardada.")
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rutas import INSUMOS_DIR
+from vocabulario import read_json, read_list
+from cargar_diagnosticos import FETCH_ERROR, NOT_AVAILABLE, TokenBucket
+
+# ================================
+# TRADUCCIÓN DE INSUMOS (EN -> ES)
+# ================================
+#
+# Uso:
+#   python traducciones.py                      # Google Translate (deep_translator)
+#   python traducciones.py --backend stub       # traductor local de prueba, sin red
+#
+# Traduce síntomas, diagnósticos y descripciones. Los textos se deduplican, los
+# que ya están en la memoria de traducción (JSONL en insumos, indexada por hash del
+# texto y el par de idiomas) no se vuelven a enviar, y los nuevos se agrupan en
+# lotes que se traducen en paralelo bajo un límite de tasa. Cada lote traducido se
+# anexa a la memoria, así que una ejecución interrumpida se reanuda donde quedó.
+#
+# Escribe los archivos que compila vocabulario.py (OUTPUTS). El script original
+# insumos/traducciones.py se conserva: genera symptom_translation.json y
+# diagnosis_translation.json, que este pipeline no toca.
+
+SYMPTOMS_FILE = os.path.join(INSUMOS_DIR, 'lista_sintomas.txt')
+DIAGNOSES_FILE = os.path.join(INSUMOS_DIR, 'diagnosticos.txt')
+DESCRIPTIONS_FILE = os.path.join(INSUMOS_DIR, 'descripcion_diagnosticos.json')
+MEMORY_FILE = os.path.join(INSUMOS_DIR, 'memoria_traducciones.jsonl')
+OUTPUTS = {
+    'symptoms': 'sintomas_traducidos.json',
+    'diagnoses': 'diagnosticos_traducidos.json',
+    'descriptions': 'descripcion_diagnosticos_traducidos.json',
+}
+
+WORKERS = 4
+RATE = 2.0              # lotes por segundo
+BATCH_CHARS = 4500      # límite de Google Translate: 5000 caracteres por solicitud
+BATCH_ITEMS = 60
+SEPARATOR = '\n'
+
+# Texto publicado para los diagnósticos sin página en Wikipedia
+NOT_AVAILABLE_ES = "Descripción no disponible. Por favor consultar con su médico de confianza.."
+
+
+def text_hash(text, source, target):
+    return hashlib.blake2b(f'{source}|{target}|{text}'.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ================================
+# BACKENDS
+# ================================
+# Un backend expone translate_batch(textos) -> lista de traducciones del mismo largo.
+
+class GoogleBackend:
+    def __init__(self, source='en', target='es'):
+        from deep_translator import GoogleTranslator
+        self.factory = lambda: GoogleTranslator(source=source, target=target)
+        self._local = threading.local()
+
+    def _translate(self, text):
+        # La instancia guarda estado de la última solicitud: un traductor por hilo, así
+        # los lotes de los distintos hilos se traducen en paralelo
+        translator = getattr(self._local, 'translator', None)
+        if translator is None:
+            translator = self._local.translator = self.factory()
+        return translator.translate(text)
+
+    def translate_batch(self, texts):
+        # Los textos de una línea viajan juntos separados por saltos de línea; si la
+        # respuesta no conserva las líneas, se traducen uno por uno
+        if len(texts) > 1 and not any(SEPARATOR in t for t in texts):
+            lines = (self._translate(SEPARATOR.join(texts)) or '').split(SEPARATOR)
+            if len(lines) == len(texts):
+                return [line.strip() for line in lines]
+        return [self._translate(t) for t in texts]
+
+
+class StubBackend:
+    # Traductor local para pruebas: prefija el texto y simula la latencia de la red
+    def __init__(self, latency_s=0.05, prefix='[es] '):
+        self.latency_s = latency_s
+        self.prefix = prefix
+        self.calls = 0
+
+    def translate_batch(self, texts):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        return [f'{self.prefix}{t}' for t in texts]
+
+
+BACKENDS = {'google': GoogleBackend, 'stub': StubBackend}
+
+
+# ================================
+# MEMORIA DE TRADUCCIÓN
+# ================================
+
+class TranslationMemory:
+    def __init__(self, path=MEMORY_FILE, source='en', target='es'):
+        self.path = path
+        self.source = source
+        self.target = target
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # última línea truncada por una interrupción
+                    self._entries[record['hash']] = record['translation']
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        return self._entries.get(text_hash(text, self.source, self.target))
+
+    def add(self, pairs):
+        # pairs: [(texto, traducción)]; se anexan en una sola escritura
+        lines = []
+        with self._lock:
+            for text, translation in pairs:
+                key = text_hash(text, self.source, self.target)
+                if self._entries.get(key) != translation:
+                    self._entries[key] = translation
+                    lines.append(json.dumps({'hash': key, 'source': text, 'translation': translation},
+                                            ensure_ascii=False))
+            if lines:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+
+    def seed(self, translations):
+        # Toma como traducidos los pares de un JSON de salida existente
+        self.add([(src, dst) for src, dst in translations.items() if self.get(src) is None and dst and dst != src])
+
+
+# ================================
+# PIPELINE
+# ================================
+
+def make_batches(texts, batch_chars=BATCH_CHARS, batch_items=BATCH_ITEMS):
+    batch, size = [], 0
+    for text in texts:
+        if batch and (size + len(text) + 1 > batch_chars or len(batch) >= batch_items):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        yield batch
+
+
+def translate_texts(texts, backend, memory, workers=WORKERS, rate=RATE, batch_chars=BATCH_CHARS):
+    # Devuelve {texto: traducción}. Los textos que fallan conservan el original y no
+    # se guardan en memoria, para reintentarlos en la próxima ejecución.
+    unique = list(dict.fromkeys(t for t in texts if t))
+    pending = [t for t in unique if memory.get(t) is None]
+    stats = {'unique': len(unique), 'from_memory': len(unique) - len(pending), 'translated': 0, 'failed': 0, 'batches': 0}
+    failed = set()
+
+    if pending:
+        bucket = TokenBucket(rate)
+
+        def task(batch):
+            bucket.acquire()
+            try:
+                translations = backend.translate_batch(batch)
+            except Exception as e:
+                print(f"Error al traducir un lote de {len(batch)} textos: {e}")
+                return batch, None
+            memory.add([(t, tr) for t, tr in zip(batch, translations) if tr])
+            return batch, translations
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='traduccion') as executor:
+            futures = [executor.submit(task, b) for b in make_batches(pending, batch_chars)]
+            for future in as_completed(futures):
+                batch, translations = future.result()
+                stats['batches'] += 1
+                if translations is None:
+                    failed.update(batch)
+                else:
+                    failed.update(t for t, tr in zip(batch, translations) if not tr)
+    stats['failed'] = len(failed)
+    stats['translated'] = len(pending) - len(failed)
+
+    result = {}
+    for text in unique:
+        result[text] = memory.get(text) or text
+    return result, stats
+
+
+def write_json(data, path):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def run(backend, memory, workers=WORKERS, rate=RATE, batch_chars=BATCH_CHARS, output_dir=INSUMOS_DIR):
+    symptoms = read_list(SYMPTOMS_FILE)
+    diagnoses = read_list(DIAGNOSES_FILE)
+    descriptions = read_json(DESCRIPTIONS_FILE)
+
+    # Etapa -> (clave de salida -> texto en inglés, ajuste del texto traducido).
+    # Los textos de reemplazo del recolector no se traducen.
+    stages = {
+        'symptoms': ({s: s for s in symptoms}, str.capitalize),
+        'diagnoses': ({d: d for d in diagnoses}, str.capitalize),
+        'descriptions': ({k: d for k, d in descriptions.items() if d not in (NOT_AVAILABLE, FETCH_ERROR)}, None),
+    }
+    labels = {'symptoms': "síntomas", 'diagnoses': "diagnósticos", 'descriptions': "descripciones de diagnósticos"}
+
+    outputs = {stage: os.path.join(output_dir, name) for stage, name in OUTPUTS.items()}
+
+    # Memoria vacía: se parte de las traducciones ya publicadas en los JSON de salida
+    if len(memory) == 0:
+        for stage, (sources, _) in stages.items():
+            if os.path.exists(outputs[stage]):
+                existing = read_json(outputs[stage])
+                memory.seed({text: existing[key] for key, text in sources.items() if key in existing})
+
+    for stage, (sources, adjust) in stages.items():
+        output = outputs[stage]
+        print(f"Traduciendo {labels[stage]}...")
+        translated, stats = translate_texts(list(sources.values()), backend, memory, workers, rate, batch_chars)
+        if stage == 'descriptions':
+            placeholders = {NOT_AVAILABLE: NOT_AVAILABLE_ES, FETCH_ERROR: FETCH_ERROR}
+            result = {k: placeholders[d] if d in placeholders else translated[d] for k, d in descriptions.items()}
+        else:
+            result = {key: adjust(translated[text]) for key, text in sources.items()}
+        # Cada archivo se escribe apenas termina su etapa
+        write_json(result, output)
+        print(f"  {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traduce síntomas, diagnósticos y descripciones al español")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='google')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--rate', type=float, default=RATE, help="Lotes por segundo")
+    parser.add_argument('--batch-chars', type=int, default=BATCH_CHARS)
+    parser.add_argument('--memory', default=MEMORY_FILE)
+    parser.add_argument('--output-dir', default=INSUMOS_DIR, help="Carpeta de los JSON traducidos")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    run(BACKENDS[args.backend](), TranslationMemory(args.memory), args.workers, args.rate, args.batch_chars, args.output_dir)
+    print(f"✅ Traducción completa guardada en {time.perf_counter() - started:.1f} s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import ast
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import numpy as np
+
+from rutas import INSUMOS_DIR
+
+# ================================
+# VOCABULARIO COMPILADO DE INSUMOS
+# ================================
+#
+# Compila síntomas, diagnósticos, traducciones EN -> ES y descripciones en un único
+# archivo binario con identificadores enteros. El archivo se abre con mmap y las
+# cadenas se decodifican solo al consultarlas, de modo que cada proceso nuevo lo
+# carga en milisegundos y sin eval(). Si el hash de algún insumo cambia, el archivo
+# se recompila automáticamente.
+#
+# Formato (little endian):
+#   MAGIC | uint64 largo del encabezado | encabezado JSON | tablas
+# Cada tabla de cadenas se guarda como offsets int64 (n + 1) seguidos de los bytes
+# UTF-8 concatenados. Una cadena vacía indica que el valor no está disponible.
+
+FORMAT_VERSION = 1
+MAGIC = b'PI2VOCAB'
+VOCABULARY_FILE = os.path.join(INSUMOS_DIR, 'vocabulario.bin')
+
+SOURCES = {
+    'symptoms': 'lista_sintomas.txt',
+    'diagnoses': 'diagnosticos.txt',
+    'symptom_translation': 'sintomas_traducidos.json',
+    'diagnosis_translation': 'diagnosticos_traducidos.json',
+    'descriptions_en': 'descripcion_diagnosticos.json',
+    'descriptions_es': 'descripcion_diagnosticos_traducidos.json',
+}
+
+
+def read_list(path):
+    # Las listas de insumos están escritas como literales de Python
+    with open(path, 'r') as f:
+        return list(ast.literal_eval(f.read()))
+
+
+def read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def source_hashes(insumos_dir=INSUMOS_DIR):
+    hashes = {}
+    for key, name in SOURCES.items():
+        with open(os.path.join(insumos_dir, name), 'rb') as f:
+            hashes[name] = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return hashes
+
+
+# ================================
+# COMPILACIÓN
+# ================================
+
+def compile_vocabulary(insumos_dir=INSUMOS_DIR, output=VOCABULARY_FILE):
+    def path(key):
+        return os.path.join(insumos_dir, SOURCES[key])
+
+    symptoms = read_list(path('symptoms'))
+    diagnoses = read_list(path('diagnoses'))
+    symptom_translation = read_json(path('symptom_translation'))
+    diagnosis_translation = read_json(path('diagnosis_translation'))
+    descriptions_en = read_json(path('descriptions_en'))
+    descriptions_es = read_json(path('descriptions_es'))
+
+    # Los síntomas conservan el orden de las columnas del modelo; los diagnósticos
+    # que solo aparecen en traducciones o descripciones se agregan al final
+    known = set(diagnoses)
+    for mapping in (diagnosis_translation, descriptions_en, descriptions_es):
+        for name in mapping:
+            if name not in known:
+                diagnoses.append(name)
+                known.add(name)
+
+    tables = {
+        'symptom': symptoms,
+        'symptom_es': [symptom_translation.get(s, '') for s in symptoms],
+        'diagnosis': diagnoses,
+        'diagnosis_es': [diagnosis_translation.get(d, '') for d in diagnoses],
+        'description_en': [descriptions_en.get(d, '') for d in diagnoses],
+        'description_es': [descriptions_es.get(d, '') for d in diagnoses],
+    }
+
+    header = {'version': FORMAT_VERSION, 'sources': source_hashes(insumos_dir), 'tables': {}}
+    blobs = []
+    position = 0
+    for name, values in tables.items():
+        encoded = [v.encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        data = offsets.tobytes() + b''.join(encoded)
+        header['tables'][name] = {'offset': position, 'count': len(encoded)}
+        blobs.append(data)
+        position += len(data)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    # Escritura atómica: otros procesos nunca ven un archivo a medio escribir
+    tmp = f'{output}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp, output)
+    return output
+
+
+# ================================
+# LECTURA
+# ================================
+
+class StringTable:
+    # Tabla de cadenas sobre el buffer mmap; decodifica cada valor bajo demanda
+    def __init__(self, buffer, start, count):
+        self._buffer = buffer
+        self._offsets = np.frombuffer(buffer, dtype='<i8', count=count + 1, offset=start)
+        self._data_start = start + (count + 1) * 8
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        a, b = self._offsets[i], self._offsets[i + 1]
+        return self._buffer[self._data_start + a:self._data_start + b].decode('utf-8')
+
+    def to_list(self):
+        return [self[i] for i in range(self._count)]
+
+
+class Vocabulary:
+    def __init__(self, path=VOCABULARY_FILE):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es un vocabulario compilado")
+        (header_len,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[start:start + header_len])
+        base = start + header_len
+
+        self.tables = {
+            name: StringTable(self._mmap, base + spec['offset'], spec['count'])
+            for name, spec in self.header['tables'].items()
+        }
+        self.symptoms = self.tables['symptom'].to_list()
+        self.diagnoses = self.tables['diagnosis'].to_list()
+        self.symptom_ids = {s: i for i, s in enumerate(self.symptoms)}
+        self.diagnosis_ids = {d: i for i, d in enumerate(self.diagnoses)}
+
+    @property
+    def version(self):
+        return self.header['version']
+
+    def _mapping(self, keys, table):
+        values = self.tables[table]
+        return {k: values[i] for i, k in enumerate(keys) if values[i]}
+
+    # Diccionarios EN -> ES equivalentes a los JSON de insumos
+    def symptom_translation(self):
+        return self._mapping(self.symptoms, 'symptom_es')
+
+    def diagnosis_translation(self):
+        return self._mapping(self.diagnoses, 'diagnosis_es')
+
+    def descriptions(self, language='es'):
+        return self._mapping(self.diagnoses, f'description_{language}')
+
+    def diagnosis_es(self, diagnosis):
+        i = self.diagnosis_ids.get(diagnosis)
+        return (self.tables['diagnosis_es'][i] if i is not None else '') or diagnosis
+
+    def description_es(self, diagnosis, default="Descripción no disponible."):
+        i = self.diagnosis_ids.get(diagnosis)
+        return (self.tables['description_es'][i] if i is not None else '') or default
+
+
+def is_stale(path=VOCABULARY_FILE, insumos_dir=INSUMOS_DIR):
+    if not os.path.exists(path):
+        return True
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return True
+            (header_len,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_len))
+    except (OSError, ValueError, struct.error):
+        return True
+    return header.get('version') != FORMAT_VERSION or header.get('sources') != source_hashes(insumos_dir)
+
+
+def load_vocabulary(path=VOCABULARY_FILE, insumos_dir=INSUMOS_DIR):
+    # Recompila si algún insumo cambió y abre el archivo compilado. Si la carpeta de
+    # insumos es de solo lectura (p. ej. en el despliegue) se usa el directorio temporal.
+    if is_stale(path, insumos_dir):
+        try:
+            compile_vocabulary(insumos_dir, path)
+        except OSError:
+            path = os.path.join(tempfile.gettempdir(), os.path.basename(path))
+            if is_stale(path, insumos_dir):
+                compile_vocabulary(insumos_dir, path)
+    return Vocabulary(path)
+
+
+if __name__ == '__main__':
+    output = compile_vocabulary()
+    vocabulary = Vocabulary(output)
+    print(f"✅ Vocabulario v{vocabulary.version}: {len(vocabulary.symptoms)} síntomas, "
+          f"{len(vocabulary.diagnoses)} diagnósticos -> {output}")
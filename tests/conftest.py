@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Los módulos de la interfaz se importan como scripts hermanos, igual que en Streamlit
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'interfaz'))
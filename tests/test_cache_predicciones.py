@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import cache_predicciones
+from cache_predicciones import ENTRY_OVERHEAD, PredictionCache, predict_board, prediction_key
+from registro_modelos import ModelRegistry
+
+# ================================
+# CACHÉ DE PREDICCIONES: CLAVE, LRU, TTL Y VERSIÓN DE LOS MODELOS
+# ================================
+
+SYMPTOMS = ['fever', 'cough', 'headache', 'rash']
+
+
+class StubModel:
+    # Modelo compacto falso: vota 'Gripe' si hay fiebre, si no 'Migraña'
+    feature_names = SYMPTOMS
+    labels = ['Gripe', 'Migraña']
+
+    def predict_proba(self, X):
+        fever = sparse.csr_matrix(X)[:, 0].toarray().ravel()
+        return np.column_stack([0.1 + 0.8 * fever, 0.9 - 0.8 * fever])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_predicciones.time, 'time', clock)
+    return clock
+
+
+def test_key_ignores_symptom_order_and_duplicates():
+    key = prediction_key([3, 1, 2], 'v1', 3, 0.6)
+    assert prediction_key([2, 3, 1, 3], 'v1', 3, 0.6) == key
+    assert prediction_key(np.array([1, 2, 3], dtype=np.int32), 'v1', 3, 0.6) == key
+
+
+def test_key_separates_patients_versions_and_rules():
+    key = prediction_key([1, 2, 3], 'v1', 3, 0.6)
+    assert prediction_key([1, 2], 'v1', 3, 0.6) != key
+    assert prediction_key([1, 2, 4], 'v1', 3, 0.6) != key
+    assert prediction_key([1, 2, 3], 'v2', 3, 0.6) != key
+    assert prediction_key([1, 2, 3], 'v1', 2, 0.6) != key
+    assert prediction_key([1, 2, 3], 'v1', 3, 0.7) != key
+    # Los IDs no se confunden con los parámetros
+    assert prediction_key([1, 2], 'v1', 3, 0.6) != prediction_key([1], 'v1', 2, 3, 0.6)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    value = {'final': 'x' * 50}
+    size = len(b'{"final":"' + b'x' * 50 + b'"}') + ENTRY_OVERHEAD
+    cache = PredictionCache(max_bytes=3 * size)
+    for key in 'abc':
+        cache.put(key, value)
+    assert cache.get('a') == value          # 'a' pasa a ser la más reciente
+    cache.put('d', value)
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == [value] * 3
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 3 and stats['bytes'] <= 3 * size
+
+
+def test_ttl_expires_entries(clock):
+    cache = PredictionCache(ttl_s=60)
+    cache.put('a', {'final': 'Gripe'})
+    clock.now += 59
+    assert cache.get('a') == {'final': 'Gripe'}
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 1 and cache.stats()['entries'] == 0
+
+
+def test_disk_tier_is_shared_and_expires(clock, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    PredictionCache(ttl_s=60, db_path=path).put('a', {'final': 'Gripe'})
+    other = PredictionCache(ttl_s=60, db_path=path)
+    assert other.get('a') == {'final': 'Gripe'} and other.stats()['disk_hits'] == 1
+    clock.now += 61
+    assert PredictionCache(ttl_s=60, db_path=path).get('a') is None
+
+
+def registry_for(models_dir):
+    registry = ModelRegistry(['modelo_a', 'modelo_b'], ['A', 'B'], models_dir=models_dir,
+                             loader=lambda path: StubModel(), prepare=None).start()
+    registry.wait()
+    return registry
+
+
+def test_new_model_files_invalidate_cached_boards(tmp_path):
+    for name in ('modelo_a', 'modelo_b'):
+        (tmp_path / f'{name}.pkl').write_bytes(b'v1')
+    cache = PredictionCache()
+
+    def diagnose(engine, symptom_ids):
+        key = prediction_key(symptom_ids, engine.version, 2, 0.6)
+        board = cache.get(key)
+        if board is None:
+            X = sparse.csr_matrix((np.ones(len(symptom_ids)), symptom_ids, [0, len(symptom_ids)]),
+                                  shape=(1, len(SYMPTOMS)))
+            board = predict_board(engine, X, 2, 0.6)
+            cache.put(key, board)
+        return board
+
+    engine = registry_for(str(tmp_path)).engine()
+    assert diagnose(engine, [0, 1])['final'] == 'Gripe'
+    assert diagnose(engine, [1, 0])['final'] == 'Gripe'
+    assert diagnose(engine, [1, 2])['final'] == 'Migraña'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+    # Mismos archivos: misma versión. Un modelo reentrenado cambia la versión y la clave.
+    assert registry_for(str(tmp_path)).engine().version == engine.version
+    path = tmp_path / 'modelo_b.pkl'
+    path.write_bytes(b'v2, reentrenado')
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    retrained = registry_for(str(tmp_path)).engine()
+    assert retrained.version != engine.version
+    diagnose(retrained, [0, 1])
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
@@ -0,0 +1,97 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from consenso import BOARD_SIZE, CONFIDENCE_THRESHOLD, MIN_VOTES, board_decision, min_votes_for
+
+# ================================
+# REGLA DE LA JUNTA: VERSIÓN VECTORIZADA CONTRA EL BUCLE ORIGINAL
+# ================================
+#
+# reference_decision es el bucle de interfaz_final_2.py previo a consenso.py, para un
+# paciente, con min_votes y threshold como parámetros (antes fijos en 3 y 0.6).
+
+DIAGNOSES = ['Gripe', 'Migraña', 'Alergia', 'Dengue']
+
+
+def reference_decision(predictions, confidences, min_votes=MIN_VOTES, threshold=CONFIDENCE_THRESHOLD):
+    most_common = Counter(predictions).most_common(1)[0]
+    if most_common[1] >= min_votes:
+        same_diag_indices = [i for i, p in enumerate(predictions) if p == most_common[0]]
+        high_conf_indices = [i for i in same_diag_indices if confidences[i] > threshold]
+        if len(high_conf_indices) >= min_votes:
+            return most_common[0], True
+    return predictions[int(np.argmax(confidences))], False
+
+
+def check(labels, scores, min_votes=MIN_VOTES, threshold=CONFIDENCE_THRESHOLD):
+    # labels y scores: (modelos x pacientes), como los recibe board_decision
+    final, by_consensus = board_decision(labels, scores, min_votes, threshold)
+    for r in range(len(labels[0])):
+        expected = reference_decision([row[r] for row in labels], [row[r] for row in scores], min_votes, threshold)
+        assert (final[r], bool(by_consensus[r])) == expected, f"paciente {r}"
+    return final, by_consensus
+
+
+def column(labels, scores):
+    # Un solo paciente: una fila por especialista
+    return [[label] for label in labels], [[score] for score in scores]
+
+
+def test_consensus_with_high_confidence():
+    final, by_consensus = check(*column(['Gripe', 'Gripe', 'Gripe', 'Migraña', 'Alergia'],
+                                        [0.9, 0.8, 0.7, 0.95, 0.5]))
+    assert final[0] == 'Gripe' and by_consensus[0]
+
+
+def test_majority_without_confidence_falls_back_to_best_model():
+    final, by_consensus = check(*column(['Gripe', 'Gripe', 'Gripe', 'Migraña', 'Alergia'],
+                                        [0.9, 0.8, 0.3, 0.95, 0.5]))
+    assert final[0] == 'Migraña' and not by_consensus[0]
+
+
+def test_score_exactly_at_threshold_does_not_count():
+    # La regla exige confianza mayor al umbral, no mayor o igual
+    final, by_consensus = check(*column(['Gripe', 'Gripe', 'Gripe', 'Migraña', 'Alergia'],
+                                        [0.9, 0.8, CONFIDENCE_THRESHOLD, 0.7, 0.5]))
+    assert final[0] == 'Gripe' and not by_consensus[0]
+    final, by_consensus = check(*column(['Gripe', 'Gripe', 'Gripe', 'Migraña', 'Alergia'],
+                                        [0.9, 0.8, np.nextafter(CONFIDENCE_THRESHOLD, 1.0), 0.7, 0.5]))
+    assert by_consensus[0]
+
+
+def test_tie_in_votes_goes_to_first_seen_diagnosis():
+    # 2 contra 2 con min_votes=2: Counter.most_common devuelve el que aparece primero
+    labels, scores = column(['Migraña', 'Gripe', 'Gripe', 'Migraña', 'Alergia'], [0.9, 0.9, 0.9, 0.9, 0.99])
+    final, by_consensus = check(labels, scores, min_votes=2)
+    assert final[0] == 'Migraña' and by_consensus[0]
+    # Si el primero no tiene confianza, no se prueba el segundo: gana el de mayor confianza
+    labels, scores = column(['Migraña', 'Gripe', 'Gripe', 'Migraña', 'Alergia'], [0.5, 0.9, 0.9, 0.5, 0.99])
+    final, by_consensus = check(labels, scores, min_votes=2)
+    assert final[0] == 'Alergia' and not by_consensus[0]
+
+
+def test_tie_in_confidence_goes_to_first_model():
+    final, by_consensus = check(*column(['Gripe', 'Migraña', 'Alergia', 'Dengue', 'Gripe'],
+                                        [0.4, 0.9, 0.9, 0.2, 0.1]))
+    assert final[0] == 'Migraña' and not by_consensus[0]
+
+
+@pytest.mark.parametrize('n_models', [1, 2, 3, 4])
+def test_partial_board(n_models):
+    # Junta incompleta (modelos aún cargando) con el mínimo de votos proporcional
+    min_votes = min_votes_for(n_models)
+    rng = np.random.default_rng(n_models)
+    labels = rng.choice(DIAGNOSES[:2], size=(n_models, 200)).tolist()
+    scores = rng.choice([0.3, CONFIDENCE_THRESHOLD, 0.9], size=(n_models, 200)).tolist()
+    check(labels, scores, min_votes)
+
+
+@pytest.mark.parametrize('min_votes, threshold', [(MIN_VOTES, CONFIDENCE_THRESHOLD), (2, 0.5), (4, 0.7), (5, 0.0)])
+def test_random_boards(min_votes, threshold):
+    # Pocas clases y confianzas repetidas para forzar empates y valores en el umbral
+    rng = np.random.default_rng(min_votes)
+    labels = rng.choice(DIAGNOSES, size=(BOARD_SIZE, 2000)).tolist()
+    scores = rng.choice([0.1, 0.5, threshold, 0.65, 0.9], size=(BOARD_SIZE, 2000)).tolist()
+    check(labels, scores, min_votes, threshold)
@@ -0,0 +1,45 @@
+import numpy as np
+from scipy import sparse
+
+from diagnostico_lote import NO_SYMPTOMS, diagnose_matrix
+
+# ================================
+# DIAGNÓSTICO POR LOTES: PACIENTES SIN SÍNTOMAS RECONOCIDOS
+# ================================
+
+RULE = {'min_votes': 3, 'threshold': 0.6, 'board_size': 5}
+
+
+class StubEngine:
+    # Junta falsa: cada especialista vota por el primer síntoma activo de la fila
+    names = ['Regresión', 'Gaussiano', 'XGBoost', 'KNN', 'Árbol']
+    n_models = 5
+
+    def __init__(self):
+        self.rows = []
+
+    def predict(self, X):
+        self.rows.append(X.shape[0])
+        first = [f'sintoma_{X.indices[X.indptr[i]]}' for i in range(X.shape[0])]
+        labels = np.array([first] * self.n_models, dtype=object)
+        return labels, np.full(labels.shape, 0.9)
+
+
+def test_rows_without_symptoms_are_not_scored():
+    X = sparse.csr_matrix(np.array([[0, 1, 0], [0, 0, 0], [1, 0, 1], [0, 0, 0]]))
+    engine = StubEngine()
+    result = diagnose_matrix(engine, X, {'sintoma_1': 'Síntoma 1'}, RULE)
+    assert engine.rows == [2]
+    assert result['diagnostico_final'].tolist() == ['sintoma_1', '', 'sintoma_0', '']
+    assert result['diagnostico_final_es'].tolist() == ['Síntoma 1', '', 'sintoma_0', '']
+    assert result['consenso'].tolist() == [True, False, True, False]
+    assert result['error'].tolist() == ['', NO_SYMPTOMS, '', NO_SYMPTOMS]
+    assert result['confianza_KNN'].isna().tolist() == [False, True, False, True]
+
+
+def test_chunk_without_any_symptoms_skips_the_board():
+    engine = StubEngine()
+    result = diagnose_matrix(engine, sparse.csr_matrix((2, 3)), rule=RULE)
+    assert engine.rows == []
+    assert result['error'].tolist() == [NO_SYMPTOMS, NO_SYMPTOMS]
+    assert list(result.columns) == list(diagnose_matrix(engine, sparse.csr_matrix(np.eye(3)), rule=RULE).columns)
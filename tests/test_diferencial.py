@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+
+from diferencial import differential_from_tensor, validation_weights
+from rutas import MANIFEST_FILE
+
+# ================================
+# DIFERENCIAL PONDERADO CON LAS MÉTRICAS DE VALIDACIÓN
+# ================================
+
+NAMES = ['Regresión', 'KNN']
+CLASSES = ['Dengue', 'Gripe', 'Migraña']
+
+
+def write_manifest(folder, scores):
+    models = [{'file': f'modelo_{i}', 'name': name, 'cv': {'F1': f1, 'Accuracy': 0.5}}
+              for i, (name, f1) in enumerate(scores.items())]
+    (folder / MANIFEST_FILE).write_text(json.dumps({'models': models}), encoding='utf-8')
+
+
+def test_weights_come_from_the_cross_validation_metric(tmp_path):
+    write_manifest(tmp_path, {'Regresión': 0.9, 'KNN': 0.3, 'Árbol': 0.8})
+    assert validation_weights(NAMES, str(tmp_path)) == {'Regresión': 0.9, 'KNN': 0.3}
+    assert validation_weights(NAMES, str(tmp_path), metric='Accuracy') == {'Regresión': 0.5, 'KNN': 0.5}
+
+
+def test_no_weights_without_a_complete_manifest(tmp_path):
+    assert validation_weights(NAMES, str(tmp_path)) is None
+    write_manifest(tmp_path, {'Regresión': 0.9})
+    assert validation_weights(NAMES, str(tmp_path)) is None
+    write_manifest(tmp_path, {'Regresión': 0.9, 'KNN': 0.0})
+    assert validation_weights(NAMES, str(tmp_path)) is None
+
+
+def test_weighted_vote_follows_the_better_specialist(tmp_path):
+    write_manifest(tmp_path, {'Regresión': 0.9, 'KNN': 0.3})
+    weights = validation_weights(NAMES, str(tmp_path))
+    tensor = np.array([[[0.1, 0.6, 0.3]], [[0.1, 0.2, 0.7]]], dtype=np.float32)
+    labels, scores = differential_from_tensor(tensor, CLASSES, NAMES, 3, 'mean')
+    assert labels[0, 0] == 'Migraña'
+    labels, scores = differential_from_tensor(tensor, CLASSES, NAMES, 3, 'weighted', weights)
+    assert list(labels[0]) == ['Gripe', 'Migraña', 'Dengue']
+    np.testing.assert_allclose(scores[0], [0.75 * 0.6 + 0.25 * 0.2, 0.75 * 0.3 + 0.25 * 0.7, 0.1], rtol=1e-6)
@@ -0,0 +1,86 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from indice_sintomas import TOP, build_index, load_index, save_index
+
+# ================================
+# ÍNDICE SÍNTOMA -> DIAGNÓSTICOS CONTRA EL RECORRIDO COMPLETO
+# ================================
+
+N_ROWS, N_SYMPTOMS = 600, 12
+SYMPTOMS = [f'sintoma_{i}' for i in range(N_SYMPTOMS)]
+CLASSES = ['Alergia', 'Dengue', 'Gripe', 'Migraña', 'Varicela', 'Zika', 'Otitis']
+NEVER = 'sintoma_11'        # ningún paciente lo tiene
+
+
+def brute_force(X, codes, selected, top=TOP):
+    # Recorre todos los pacientes: los que tienen todos los síntomas elegidos, sus
+    # diagnósticos y los demás síntomas que tienen; empates por orden de columna
+    column = {s: i for i, s in enumerate(SYMPTOMS)}
+    cols = sorted({column[s] for s in selected if s in column})
+    if not cols:
+        return {'support': 0, 'diagnoses': [], 'next': []}
+    rows = np.flatnonzero((X[:, cols] == 1).all(axis=1))
+    support = len(rows)
+    diag = np.bincount(codes[rows], minlength=len(CLASSES))
+    counts = X[rows].sum(axis=0)
+    counts[cols] = 0
+
+    def ranked(values, names):
+        order = sorted(range(len(values)), key=lambda j: (-values[j], j))
+        return [(names[j], int(values[j]), float(values[j]) / support) for j in order if values[j] > 0][:top]
+
+    return {'support': support, 'diagnoses': ranked(diag, CLASSES), 'next': ranked(counts, SYMPTOMS)}
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    rng = np.random.default_rng(3)
+    # Pocos síntomas frecuentes: muchos pares superan min_support y hay empates de conteo
+    weights = np.r_[np.linspace(3, 1, N_SYMPTOMS - 1), 0]
+    X = np.zeros((N_ROWS, N_SYMPTOMS), dtype=np.int64)
+    for row in X:
+        row[rng.choice(N_SYMPTOMS, size=rng.integers(1, 6), replace=False, p=weights / weights.sum())] = 1
+    codes = rng.integers(0, len(CLASSES), size=N_ROWS)
+    return X, codes
+
+
+@pytest.fixture(scope='module')
+def index(dataset, tmp_path_factory):
+    # Ida y vuelta por el .npz, como lo usa la interfaz
+    X, codes = dataset
+    path = str(tmp_path_factory.mktemp('indice') / 'indice_sintomas.npz')
+    save_index(build_index(sparse.csr_matrix(X), codes, SYMPTOMS, CLASSES, min_support=15), path)
+    return load_index(path)
+
+
+def test_pairs_above_and_below_min_support(index):
+    assert 0 < len(index.pair_keys) < N_SYMPTOMS * (N_SYMPTOMS - 1) // 2
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 4])
+def test_matches_brute_force(dataset, index, size):
+    X, codes = dataset
+    for selected in combinations(SYMPTOMS, size):
+        for top in (TOP, 2):
+            assert index.suggest(list(selected), top) == brute_force(X, codes, selected, top), selected
+
+
+def test_selection_order_and_duplicates_do_not_matter(index):
+    assert index.suggest(['sintoma_3', 'sintoma_0', 'sintoma_3']) == index.suggest(['sintoma_0', 'sintoma_3'])
+
+
+def test_empty_selection(index):
+    assert index.suggest([]) == {'support': 0, 'diagnoses': [], 'next': []}
+    assert index.suggest(['no es un síntoma']) == {'support': 0, 'diagnoses': [], 'next': []}
+    assert index.suggest(['sintoma_2', 'no es un síntoma']) == index.suggest(['sintoma_2'])
+
+
+def test_symptom_without_patients(dataset, index):
+    X, codes = dataset
+    assert index.suggest([NEVER]) == {'support': 0, 'diagnoses': [], 'next': []}
+    assert index.suggest(['sintoma_0', NEVER]) == brute_force(X, codes, ['sintoma_0', NEVER])
+    assert index.suggest(['sintoma_0', 'sintoma_1', NEVER])['support'] == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.neighbors import KNeighborsClassifier
+
+from knn_hamming import HammingKNN
+
+# ================================
+# KNN SOBRE BITSETS CONTRA KNEIGHBORSCLASSIFIER
+# ================================
+#
+# Con pocos síntomas por paciente y filas de entrenamiento repetidas muchos vecinos
+# quedan a la misma distancia: el voto depende de cómo se desempata cuáles entran
+# entre los k primeros.
+
+N_SYMPTOMS = 70             # más de 64: los bitsets ocupan dos palabras
+LABELS = np.array(['Alergia', 'Dengue', 'Gripe', 'Migraña'], dtype=object)
+
+
+def binary_rows(rng, n, active=(1, 4)):
+    X = np.zeros((n, N_SYMPTOMS))
+    for row in X:
+        # Los síntomas activos se concentran en unos pocos para forzar coincidencias
+        row[rng.choice(12, size=rng.integers(*active), replace=False)] = 1
+    return X
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(7)
+    X_train = binary_rows(rng, 400)
+    X_train = np.vstack([X_train, X_train[:100]])       # filas duplicadas: distancias idénticas
+    y_train = rng.integers(0, len(LABELS), size=len(X_train))
+    X_test = np.vstack([binary_rows(rng, 300), X_train[:20], np.zeros((1, N_SYMPTOMS))])
+    return X_train, y_train, X_test
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+@pytest.mark.parametrize('method', ['index', 'popcount'])
+def test_same_probabilities_as_sklearn(data, weights, method):
+    X_train, y_train, X_test = data
+    knn = KNeighborsClassifier(n_neighbors=7, weights=weights).fit(X_train, y_train)
+    model = HammingKNN.from_estimator(knn, LABELS[knn.classes_], [f's{i}' for i in range(N_SYMPTOMS)], method)
+
+    # La prueba solo tiene sentido si hay empates en el límite del k-ésimo vecino
+    distances, _ = knn.kneighbors(X_test, n_neighbors=8)
+    assert (distances[:, 6] == distances[:, 7]).mean() > 0.5
+
+    np.testing.assert_array_equal(model.predict_proba(sparse.csr_matrix(X_test)), knn.predict_proba(X_test))
+    # Mismos k vecinos (sklearn los devuelve ordenados por distancia)
+    np.testing.assert_array_equal(np.sort(model.kneighbors(sparse.csr_matrix(X_test))[1], axis=1),
+                                  np.sort(knn.kneighbors(X_test)[1], axis=1))
+
+
+def test_rejects_non_binary_input(data):
+    X_train, y_train, _ = data
+    knn = KNeighborsClassifier(n_neighbors=3).fit(X_train, y_train)
+    model = HammingKNN.from_estimator(knn, LABELS[knn.classes_], [f's{i}' for i in range(N_SYMPTOMS)])
+    with pytest.raises(ValueError):
+        model.predict_proba(sparse.csr_matrix(np.full((1, N_SYMPTOMS), 2.0)))
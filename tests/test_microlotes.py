@@ -0,0 +1,85 @@
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from metricas import Metrics
+from microlotes import MicroBatcher
+
+# ================================
+# MICROLOTES: CUÁNDO SE CIERRA UN LOTE
+# ================================
+
+
+class StubEngine:
+    # Junta falsa que anota las filas de cada predict y puede quedar bloqueada en él
+    names = ['LR', 'NB', 'DT']
+
+    def __init__(self):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict_proba_models(self, X):
+        self.entered.set()
+        self.release.wait()
+        self.batches.append(X.shape[0])
+        return X
+
+    def labels_scores(self, X):
+        n = X.shape[0]
+        return np.full((len(self.names), n), 'Gripe', dtype=object), np.full((len(self.names), n), 0.9)
+
+
+def patient():
+    return sparse.csr_matrix(np.ones((1, 4)))
+
+
+def busy_batcher(engine, max_batch, max_wait_ms):
+    # Planificador ocupado en un primer predict: las siguientes solicitudes quedan en la cola
+    batcher = MicroBatcher(max_batch, max_wait_ms, metrics=Metrics())
+    engine.release.clear()
+    first = batcher.submit(engine, patient(), 2)
+    assert engine.entered.wait(5)
+    return batcher, first
+
+
+def test_lone_request_does_not_wait():
+    engine = StubEngine()
+    batcher = MicroBatcher(64, 5000, metrics=Metrics())
+    start = time.perf_counter()
+    board = batcher.predict_board(engine, patient(), 2)
+    assert time.perf_counter() - start < 1.0
+    assert board['final'] == 'Gripe' and board['consensus']
+    batcher.close()
+    assert engine.batches == [1]
+
+
+def test_requests_within_the_window_share_a_batch():
+    engine = StubEngine()
+    batcher, first = busy_batcher(engine, max_batch=3, max_wait_ms=5000)
+    queued = [batcher.submit(engine, patient(), 2) for _ in range(2)]
+    engine.release.set()
+    first.result(5)
+    # Llega después de que el planificador tomó las dos en cola, dentro de la espera
+    time.sleep(0.05)
+    late = batcher.submit(engine, patient(), 2)
+    for future in queued + [late]:
+        assert future.result(5)[0]['final'] == 'Gripe'
+    batcher.close()
+    assert engine.batches == [1, 3]
+
+
+def test_deadline_closes_a_partial_batch():
+    engine = StubEngine()
+    batcher, first = busy_batcher(engine, max_batch=64, max_wait_ms=200)
+    queued = [batcher.submit(engine, patient(), 2) for _ in range(2)]
+    engine.release.set()
+    start = time.perf_counter()
+    for future in queued:
+        future.result(5)
+    assert time.perf_counter() - start < 2.0
+    batcher.close()
+    assert engine.batches == [1, 2]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from motor_ensamble import EnsembleEngine, check_columns
+from registro_modelos import ModelRegistry
+
+# ================================
+# MOTOR: ORDEN DE LAS COLUMNAS DE SÍNTOMAS
+# ================================
+
+FEATURES = ['fever', 'cough', 'headache']
+
+
+class StubModel:
+    # Modelo compacto falso: la probabilidad de 'Gripe' es la primera columna de X
+    feature_names = FEATURES
+    labels = ['Gripe', 'Migraña']
+
+    def predict_proba(self, X):
+        X = X.toarray() if sparse.issparse(X) else np.asarray(X, dtype=np.float64)
+        first = (X[:, 0] + 0.1) / (X.sum(axis=1) + 0.2)
+        return np.column_stack([first, 1 - first])
+
+
+def test_same_columns_pass():
+    check_columns(list(FEATURES), FEATURES)
+    engine = EnsembleEngine([StubModel()], ['LR'], columns=FEATURES)
+    assert engine.feature_names == FEATURES
+
+
+def test_reordered_columns_are_rejected():
+    with pytest.raises(ValueError, match="otro orden"):
+        EnsembleEngine([StubModel()], ['LR'], columns=['cough', 'fever', 'headache'])
+
+
+def test_different_symptoms_are_rejected():
+    with pytest.raises(ValueError, match="faltan \\['headache'\\], sobran \\['rash'\\]"):
+        check_columns(['fever', 'cough', 'rash'], FEATURES)
+
+
+def test_registry_checks_columns_when_building_the_engine():
+    registry = ModelRegistry(['a'], ['LR'], models_dir='.', loader=lambda path: StubModel(), prepare=None,
+                             columns=['headache', 'cough', 'fever']).start()
+    registry.wait()
+    with pytest.raises(ValueError, match="otro orden"):
+        registry.engine()
+
+
+def test_dataframe_columns_are_matched_by_name():
+    engine = EnsembleEngine([StubModel()], ['LR'])
+    X = np.array([[1, 0, 0], [0, 1, 1]])
+    shuffled = pd.DataFrame(X, columns=FEATURES)[['headache', 'fever', 'cough']]
+    np.testing.assert_array_equal(engine.predict_proba(shuffled), engine.predict_proba(X))
+    np.testing.assert_array_equal(engine.predict_proba(sparse.csr_matrix(X)), engine.predict_proba(X))
@@ -0,0 +1,96 @@
+import json
+
+from traducciones import StubBackend, TranslationMemory, make_batches, text_hash, translate_texts
+
+# ================================
+# MEMORIA DE TRADUCCIÓN Y LOTES
+# ================================
+
+
+class FailingBackend(StubBackend):
+    # Falla en los lotes que contienen `bad`
+    def __init__(self, bad):
+        super().__init__(latency_s=0)
+        self.bad = bad
+
+    def translate_batch(self, texts):
+        if self.bad in texts:
+            raise RuntimeError("sin conexión")
+        return super().translate_batch(texts)
+
+
+def test_make_batches_respects_limits_and_order():
+    texts = [f'texto {i}' * (i % 5 + 1) for i in range(100)]
+    batches = list(make_batches(texts, batch_chars=120, batch_items=7))
+    assert [t for batch in batches for t in batch] == texts
+    for batch in batches:
+        assert len(batch) <= 7
+        assert sum(len(t) + 1 for t in batch) <= 120
+
+
+def test_make_batches_oversized_text_travels_alone():
+    batches = list(make_batches(['a', 'b' * 500, 'c'], batch_chars=100, batch_items=10))
+    assert batches == [['a'], ['b' * 500], ['c']]
+    assert list(make_batches([])) == []
+
+
+def test_memory_appends_and_reloads(tmp_path):
+    path = str(tmp_path / 'memoria.jsonl')
+    memory = TranslationMemory(path)
+    memory.add([('fever', 'fiebre'), ('cough', 'tos')])
+    memory.add([('fever', 'fiebre')])                   # sin cambios: no se vuelve a escribir
+    memory.add([('cough', 'tos seca')])                 # corrección: gana la última
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['source'] for r in records] == ['fever', 'cough', 'cough']
+    assert records[0]['hash'] == text_hash('fever', 'en', 'es')
+
+    reloaded = TranslationMemory(path)
+    assert len(reloaded) == 2
+    assert reloaded.get('fever') == 'fiebre' and reloaded.get('cough') == 'tos seca'
+    # Otro par de idiomas no comparte entradas
+    assert TranslationMemory(path, target='fr').get('fever') is None
+
+
+def test_memory_skips_a_truncated_last_line(tmp_path):
+    path = tmp_path / 'memoria.jsonl'
+    TranslationMemory(str(path)).add([('fever', 'fiebre')])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"hash": "abc", "transl')
+    memory = TranslationMemory(str(path))
+    assert len(memory) == 1 and memory.get('fever') == 'fiebre'
+
+
+def test_seed_ignores_untranslated_pairs(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memoria.jsonl'))
+    memory.seed({'fever': 'fiebre', 'cough': 'cough', 'rash': ''})
+    assert memory.get('fever') == 'fiebre'
+    assert memory.get('cough') is None and memory.get('rash') is None
+
+
+def test_translate_texts_dedupes_and_reuses_memory(tmp_path):
+    path = str(tmp_path / 'memoria.jsonl')
+    backend = StubBackend(latency_s=0)
+    texts = ['fever', 'cough', 'fever', '', 'rash']
+    result, stats = translate_texts(texts, backend, TranslationMemory(path), workers=2, rate=1000)
+    assert result == {'fever': '[es] fever', 'cough': '[es] cough', 'rash': '[es] rash'}
+    assert stats['unique'] == 3 and stats['translated'] == 3 and stats['from_memory'] == 0
+
+    # Otra ejecución con la memoria recargada no llama al backend
+    backend = StubBackend(latency_s=0)
+    result, stats = translate_texts(texts + ['rash'], backend, TranslationMemory(path), rate=1000)
+    assert backend.calls == 0 and stats['from_memory'] == 3
+    assert result['rash'] == '[es] rash'
+
+
+def test_failed_batches_keep_the_original_and_are_retried(tmp_path):
+    path = str(tmp_path / 'memoria.jsonl')
+    texts = ['fever', 'cough', 'rash']
+    result, stats = translate_texts(texts, FailingBackend('cough'), TranslationMemory(path),
+                                    rate=1000, batch_chars=8)
+    assert result == {'fever': '[es] fever', 'cough': 'cough', 'rash': '[es] rash'}
+    assert stats['failed'] == 1 and stats['translated'] == 2
+
+    backend = StubBackend(latency_s=0)
+    result, stats = translate_texts(texts, backend, TranslationMemory(path), rate=1000)
+    assert result['cough'] == '[es] cough' and backend.calls == 1 and stats['from_memory'] == 2
@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from rutas import INSUMOS_DIR
+from vocabulario import SOURCES, is_stale, load_vocabulary, read_json, read_list
+
+# ================================
+# VOCABULARIO COMPILADO CONTRA LOS INSUMOS
+# ================================
+
+
+@pytest.fixture
+def insumos(tmp_path):
+    # Copia de los insumos del repositorio: las pruebas los modifican
+    for name in SOURCES.values():
+        shutil.copy(os.path.join(INSUMOS_DIR, name), tmp_path / name)
+    return tmp_path
+
+
+def non_empty(mapping):
+    # El vocabulario representa "sin valor" con la cadena vacía
+    return {k: v for k, v in mapping.items() if v}
+
+
+def test_round_trip_matches_sources(insumos):
+    path = str(insumos / 'vocabulario.bin')
+    vocabulary = load_vocabulary(path, str(insumos))
+
+    def source(key):
+        return str(insumos / SOURCES[key])
+
+    symptoms = read_list(source('symptoms'))
+    assert vocabulary.symptoms == symptoms
+    assert vocabulary.symptom_translation() == non_empty(read_json(source('symptom_translation')))
+    assert vocabulary.diagnosis_translation() == non_empty(read_json(source('diagnosis_translation')))
+    assert vocabulary.descriptions('en') == non_empty(read_json(source('descriptions_en')))
+    assert vocabulary.descriptions('es') == non_empty(read_json(source('descriptions_es')))
+
+    # Los diagnósticos de la lista van primero y en su orden; el resto se agrega al final
+    diagnoses = read_list(source('diagnoses'))
+    assert vocabulary.diagnoses[:len(diagnoses)] == diagnoses
+    assert len(set(vocabulary.diagnoses)) == len(vocabulary.diagnoses)
+    assert not is_stale(path, str(insumos))
+
+
+def test_changed_source_triggers_rebuild(insumos):
+    path = str(insumos / 'vocabulario.bin')
+    vocabulary = load_vocabulary(path, str(insumos))
+    symptom = vocabulary.symptoms[0]
+
+    translation_file = insumos / SOURCES['symptom_translation']
+    translations = json.loads(translation_file.read_text(encoding='utf-8'))
+    translations[symptom] = 'síntoma editado'
+    translation_file.write_text(json.dumps(translations, ensure_ascii=False), encoding='utf-8')
+    assert is_stale(path, str(insumos))
+
+    rebuilt = load_vocabulary(path, str(insumos))
+    assert rebuilt.symptom_translation()[symptom] == 'síntoma editado'
+    assert rebuilt.header['sources'] != vocabulary.header['sources']
+    assert not is_stale(path, str(insumos))
+
+
+def test_corrupt_artifact_is_rebuilt(insumos):
+    path = insumos / 'vocabulario.bin'
+    path.write_bytes(b'basura')
+    assert is_stale(str(path), str(insumos))
+    assert load_vocabulary(str(path), str(insumos)).symptoms == read_list(str(insumos / SOURCES['symptoms']))